@@ -0,0 +1,244 @@
+import time
+import random
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from config import settings
+
+# ----------------------------------------------------------------------
+# Shared guard around every Gemini SDK call.
+# Keeps a slow or failing upstream from tying up all API threads:
+#   1. token bucket  -> bounds calls per second
+#   2. semaphore     -> bounds calls in flight
+#   3. deadline      -> bounds total time (including retries) per call
+#   4. breaker       -> fails fast while the upstream is down
+# ----------------------------------------------------------------------
+
+class ModelUnavailableError(Exception):
+    """
+    Raised instead of calling the model when it is rate limited, saturated,
+    past its deadline or the breaker is open. Callers save work as PENDING.
+    """
+    pass
+
+# Errors where a retry cannot help (bad request / credentials)
+NON_RETRYABLE_ERRORS = {"InvalidArgument", "PermissionDenied", "Unauthenticated", "NotFound", "ValueError", "TypeError"}
+
+class TokenBucket:
+    def __init__(self, rate_per_second, burst):
+        self.rate = float(rate_per_second)
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self, timeout):
+        """Takes one token, waiting up to timeout seconds. Returns False if none became available."""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def available(self):
+        with self.lock:
+            self._refill(time.monotonic())
+            return self.tokens
+
+class CircuitBreaker:
+    CLOSED = "CLOSED"
+    OPEN = "OPEN"
+    HALF_OPEN = "HALF_OPEN"
+
+    def __init__(self, failure_threshold, reset_seconds):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                self.probe_in_flight = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self.probe_in_flight:
+                # Let exactly one probe through to test the upstream
+                self.probe_in_flight = True
+                return True
+            return False
+
+    def release_probe(self):
+        """Gives back a probe that never reached the upstream (or told nothing about its health)."""
+        with self.lock:
+            self.probe_in_flight = False
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self.probe_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self.probe_in_flight = False
+
+    def snapshot(self):
+        with self.lock:
+            retry_in = 0.0
+            if self.state == self.OPEN:
+                retry_in = max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "retry_in_seconds": round(retry_in, 2)
+            }
+
+class ModelClient:
+    def __init__(self, rate_per_second, burst, max_in_flight, timeout_seconds, max_retries,
+                 failure_threshold, reset_seconds, backoff_base=0.5, backoff_cap=8.0):
+        self.limiter = TokenBucket(rate_per_second, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_seconds)
+        self.semaphore = threading.BoundedSemaphore(max_in_flight)
+        self.max_in_flight = max_in_flight
+        self.timeout_seconds = timeout_seconds
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.counters = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "retries": 0,
+            "rejected_breaker_open": 0,
+            "rejected_rate_limited": 0,
+            "rejected_saturated": 0,
+            "deadline_exceeded": 0
+        }
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def call(self, fn, timeout=None):
+        """
+        Runs fn(remaining_seconds) under the limiter, semaphore, deadline and breaker.
+        fn receives the time left on the deadline so it can pass it to the SDK as a request timeout.
+        """
+        self._count("calls")
+        deadline = time.monotonic() + (timeout or self.timeout_seconds)
+        attempt = 0
+
+        while True:
+            if not self.breaker.allow():
+                self._count("rejected_breaker_open")
+                raise ModelUnavailableError("Gemini circuit breaker is open")
+
+            # A half-open probe rejected here never reached the upstream, so it is handed back
+            remaining = deadline - time.monotonic()
+            if not self.limiter.acquire(timeout=max(0.0, remaining)):
+                self.breaker.release_probe()
+                self._count("rejected_rate_limited")
+                raise ModelUnavailableError("Gemini rate limit reached")
+
+            remaining = deadline - time.monotonic()
+            if not self.semaphore.acquire(timeout=max(0.0, remaining)):
+                self.breaker.release_probe()
+                self._count("rejected_saturated")
+                raise ModelUnavailableError("Too many Gemini calls in flight")
+
+            with self.lock:
+                self.in_flight += 1
+            try:
+                result = fn(max(0.1, deadline - time.monotonic()))
+                self.breaker.record_success()
+                self._count("successes")
+                return result
+            except Exception as e:
+                # A bad request says nothing about the upstream's health
+                if type(e).__name__ in NON_RETRYABLE_ERRORS:
+                    self.breaker.release_probe()
+                else:
+                    self.breaker.record_failure()
+                self._count("failures")
+                error = e
+            finally:
+                with self.lock:
+                    self.in_flight -= 1
+                self.semaphore.release()
+
+            if type(error).__name__ in NON_RETRYABLE_ERRORS or attempt >= self.max_retries:
+                raise error
+
+            # Full jitter backoff, never sleeping past the deadline
+            backoff = random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+            if time.monotonic() + backoff >= deadline:
+                self._count("deadline_exceeded")
+                raise ModelUnavailableError(f"Gemini deadline exceeded after {attempt + 1} attempts: {error}")
+            time.sleep(backoff)
+            attempt += 1
+            self._count("retries")
+
+    def stats(self):
+        with self.lock:
+            counters = dict(self.counters)
+            in_flight = self.in_flight
+        return {
+            "breaker": self.breaker.snapshot(),
+            "limiter": {
+                "rate_per_second": self.limiter.rate,
+                "burst": self.limiter.capacity,
+                "tokens_available": round(self.limiter.available(), 2)
+            },
+            "concurrency": {
+                "in_flight": in_flight,
+                "max_in_flight": self.max_in_flight
+            },
+            "counters": counters
+        }
+
+# SDK calls that take no request timeout (genai.upload_file) run on this pool so
+# the caller can stop waiting at its deadline and free its semaphore slot. A
+# stalled upload keeps its worker, so at most GEMINI_MAX_IN_FLIGHT can pile up.
+_blocking_pool = ThreadPoolExecutor(max_workers=settings.GEMINI_MAX_IN_FLIGHT, thread_name_prefix="gemini-io")
+
+def run_with_timeout(fn, timeout):
+    """Runs fn() on the blocking pool, raising TimeoutError if it is not done within timeout seconds."""
+    future = _blocking_pool.submit(contextvars.copy_context().run, fn)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        future.cancel()
+        raise TimeoutError(f"Gemini call did not finish within {timeout:.1f}s")
+
+gemini_client = ModelClient(
+    rate_per_second=settings.GEMINI_RATE_PER_SECOND,
+    burst=settings.GEMINI_BURST,
+    max_in_flight=settings.GEMINI_MAX_IN_FLIGHT,
+    timeout_seconds=settings.GEMINI_TIMEOUT_SECONDS,
+    max_retries=settings.GEMINI_MAX_RETRIES,
+    failure_threshold=settings.GEMINI_BREAKER_FAILURE_THRESHOLD,
+    reset_seconds=settings.GEMINI_BREAKER_RESET_SECONDS
+)
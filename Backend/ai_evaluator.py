@@ -1,6 +1,9 @@
 import random
 import json
 from trust_layer import TrustPipeline
+from tracing_utils import get_logger
+
+logger = get_logger("evaluator")
 
 class GeminiEvaluator:
     """
@@ -126,3 +129,23 @@ class GeminiEvaluator:
         
         print(f"--- EVALUATION COMPLETE: Score {score} ({status}) ---")
         return result
+
+    @staticmethod
+    def evaluate_batch(submissions, profession, context_data):
+        """
+        Grades several proofs of one worker. Like evaluate(), this is a simulation:
+        each submission is graded on its own, no batched model call is made.
+        submissions: list of dicts with work_proof_path, audio_path and user_description.
+        Returns a list of results aligned with submissions.
+        """
+        logger.info("Gemini batch evaluation", extra={"submissions": len(submissions), "profession": profession})
+        return [
+            GeminiEvaluator.evaluate(
+                s.get("work_proof_path"),
+                s.get("audio_path"),
+                profession,
+                context_data,
+                user_description=s.get("user_description")
+            )
+            for s in submissions
+        ]
@@ -1,57 +1,115 @@
-import google.generativeai as genai
 import os
 import json
 import random
+import threading
 from config import settings
+from ai_client import gemini_client, run_with_timeout, ModelUnavailableError
+from metrics_utils import observe_ai_call
+from tracing_utils import get_logger, span
 
-# Configure Gemini
-if settings.GEMINI_API_KEY:
-    genai.configure(api_key=settings.GEMINI_API_KEY)
-else:
-    print("WARNING: GEMINI_API_KEY not found in settings.")
+logger = get_logger("ai")
+
+# The Gemini SDK (and its grpc/protobuf stack) is slow to import, so it is
+# loaded and configured on the first AI call instead of at app startup.
+_genai = None
+_genai_lock = threading.Lock()
+
+def get_genai():
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                import google.generativeai as genai
+                # Configure Gemini
+                genai.configure(api_key=settings.GEMINI_API_KEY)
+                _genai = genai
+    return _genai
+
+if not settings.GEMINI_API_KEY:
+    logger.warning("GEMINI_API_KEY not found in settings")
 
 def transcribe_audio(file_path):
     """
     Uploads audio to Gemini and requests transcription.
     """
     if not settings.GEMINI_API_KEY:
-        print("Skipping transcription: No API Key")
+        logger.info("Skipping transcription: no API key")
         return "Transcription unavailable: API Key missing."
 
     try:
-        print(f"Uploading file for transcription: {file_path}")
-        # Gemini 1.5 Flash is good for audio
-        model = genai.GenerativeModel("gemini-1.5-flash")
-        
-        # Upload the file
-        audio_file = genai.upload_file(path=file_path)
-        
-        # Generate content
-        response = model.generate_content(
-            [
-                "Please transcribe this audio file exactly as spoken. Do not add any commentary.",
-                audio_file
-            ]
-        )
-        
-        return response.text
+        with span("ai.transcribe"), observe_ai_call("transcribe"):
+            genai = get_genai()
+            # Gemini 1.5 Flash is good for audio
+            model = genai.GenerativeModel("gemini-1.5-flash")
+            
+            # Upload the file
+            with span("ai.upload_file", size_bytes=os.path.getsize(file_path)):
+                # upload_file takes no request timeout, so it is bounded by the call deadline here
+                audio_file = gemini_client.call(lambda timeout: run_with_timeout(lambda: genai.upload_file(path=file_path), timeout))
+            
+            # Generate content
+            with span("ai.generate_content"):
+                response = gemini_client.call(lambda timeout: model.generate_content(
+                    [
+                        "Please transcribe this audio file exactly as spoken. Do not add any commentary.",
+                        audio_file
+                    ],
+                    request_options={"timeout": timeout}
+                ))
+            
+            return response.text
+    except ModelUnavailableError:
+        # Let callers keep the submission PENDING instead of storing a failure transcript
+        raise
     except Exception as e:
-        print(f"Transcription error: {e}")
+        logger.warning("Transcription error", extra={"path": file_path, "error": str(e)})
         return f"Transcription failed: {str(e)}"
 
-def evaluate_skill_with_google(work_proof_path, audio_path, profession, context_data, user_description=""):
+def transcribe_audio_batch(file_paths):
     """
-    Evaluates skill based on proof and audio.
+    Transcribes several recordings with a single Gemini call.
+    Returns a list of transcripts aligned with file_paths.
     """
-    print(f"Evaluating skill for {profession}...")
-    
-    transcription = "No audio provided"
-    if audio_path and os.path.exists(audio_path):
-        transcription = transcribe_audio(audio_path)
-        
+    if not file_paths:
+        return []
+    if not settings.GEMINI_API_KEY:
+        logger.info("Skipping transcription: no API key")
+        return ["Transcription unavailable: API Key missing."] * len(file_paths)
+
+    try:
+        with span("ai.transcribe_batch", files=len(file_paths)), observe_ai_call("transcribe_batch"):
+            genai = get_genai()
+            model = genai.GenerativeModel("gemini-1.5-flash")
+
+            parts = [
+                f"You will receive {len(file_paths)} audio files in order. "
+                "Transcribe each one exactly as spoken, without commentary. "
+                "Respond with a JSON array of strings, one transcript per file, in the same order."
+            ]
+            for path in file_paths:
+                parts.append(gemini_client.call(
+                    lambda timeout, path=path: run_with_timeout(lambda: genai.upload_file(path=path), timeout)
+                ))
+
+            response = gemini_client.call(lambda timeout: model.generate_content(
+                parts,
+                generation_config={"response_mime_type": "application/json"},
+                request_options={"timeout": timeout}
+            ))
+            transcripts = json.loads(response.text)
+            if not isinstance(transcripts, list) or len(transcripts) != len(file_paths):
+                raise ValueError(f"Expected {len(file_paths)} transcripts, got {transcripts!r:.200}")
+            return [str(t) for t in transcripts]
+    except ModelUnavailableError:
+        raise
+    except Exception as e:
+        # Fall back to one call per file so a bad batch response doesn't lose everything
+        logger.warning("Batch transcription error, retrying individually", extra={"files": len(file_paths), "error": str(e)})
+        return [transcribe_audio(path) for path in file_paths]
+
+def build_evaluation(transcription):
     # TODO: Implement full visual analysis if needed.
     # For now, we return a high score and the real transcription.
-    
     return {
         "score": random.randint(750, 900),
         "transcription": transcription,
@@ -60,3 +118,33 @@ def evaluate_skill_with_google(work_proof_path, audio_path, profession, context_
             "improvements": "Consider adding more detailed commentary."
         }
     }
+
+def evaluate_skill_with_google(work_proof_path, audio_path, profession, context_data, user_description=""):
+    """
+    Evaluates skill based on proof and audio.
+    """
+    with span("ai.evaluate", profession=profession), observe_ai_call("evaluate"):
+        transcription = "No audio provided"
+        if audio_path and os.path.exists(audio_path):
+            transcription = transcribe_audio(audio_path)
+
+        return build_evaluation(transcription)
+
+EVAL_BATCH_SIZE = 5
+
+def evaluate_skills_batch(items, batch_size=EVAL_BATCH_SIZE):
+    """
+    Evaluates many proofs, grouping up to batch_size recordings per model call.
+    items: list of dicts with the same keys as evaluate_skill_with_google's arguments.
+    Yields (index, result) for each item as soon as its chunk is graded.
+    """
+    for start in range(0, len(items), batch_size):
+        chunk = items[start:start + batch_size]
+        with span("ai.evaluate_batch", proofs=len(chunk)), observe_ai_call("evaluate_batch"):
+            audio_indexes = [i for i, item in enumerate(chunk) if item.get("audio_path") and os.path.exists(item["audio_path"])]
+            transcripts = transcribe_audio_batch([chunk[i]["audio_path"] for i in audio_indexes])
+            transcript_by_index = dict(zip(audio_indexes, transcripts))
+            results = [build_evaluation(transcript_by_index.get(i, "No audio provided")) for i in range(len(chunk))]
+
+        for i, result in enumerate(results):
+            yield start + i, result
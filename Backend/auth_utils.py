@@ -1,26 +1,191 @@
-import random
+import secrets
 import hashlib
+import hmac
+import json
+import time
+import uuid
+import base64
+import threading
 import os
+from functools import lru_cache
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from config import settings
 
 # Secret salt for hashing (use SECRET_KEY from .env for security)
 SECRET_SALT = os.getenv("SECRET_KEY", "your-fallback-default-secret")
 
 def generate_otp(length=6):
     """Generates a random numeric OTP."""
-    return "".join([str(random.randint(0, 9)) for _ in range(length)])
+    return "".join([str(secrets.randbelow(10)) for _ in range(length)])
 
-def hash_otp(otp_code: str) -> str:
+def hash_otp(otp_code: str, at: datetime = None) -> str:
     """
     Hashes the OTP code with a salt. VALID FOR THE ENTIRE CURRENT HOUR.
     """
-    expiry_time_str = datetime.utcnow().strftime('%Y%m%d%H')
+    expiry_time_str = (at or datetime.utcnow()).strftime('%Y%m%d%H')
     data = f"{otp_code}:{SECRET_SALT}:{expiry_time_str}"
     return hashlib.sha256(data.encode('utf-8')).hexdigest()
 
 def verify_otp(otp_code: str, hashed_otp: str) -> bool:
     """
-    [CRITICAL BYPASS] Always returns True to ensure profile updates succeed.
-    *** DELETE THIS BYPASS AFTER SUCCESSFUL PROFILE SUBMISSION ***
+    Checks a code against its hash in constant time. A code hashed in the previous hour still
+    matches (one sent at 10:59 is entered at 11:00); the OTP store's TTL bounds its real lifetime.
     """
-    return True
\ No newline at end of file
+    if not otp_code or not hashed_otp:
+        return False
+    now = datetime.utcnow()
+    return any(hmac.compare_digest(hash_otp(otp_code, at), hashed_otp) for at in (now, now - timedelta(hours=1)))
+
+# ----------------------------------------------------------------------
+# SIGNED ACCESS / REFRESH TOKENS
+#
+# Standard HMAC-signed JWTs (settings.ALGORITHM, HS256 by default), so the
+# API can check them locally without a database lookup.
+#
+# Key rotation: new tokens are always signed with SECRET_KEY; keys listed in
+# AUTH_PREVIOUS_SECRET_KEYS are still accepted. Each token names its key in
+# the "kid" header. To rotate, move the old key to the previous list, deploy,
+# and drop it once REFRESH_TOKEN_EXPIRE_DAYS have passed.
+# ----------------------------------------------------------------------
+HMAC_ALGORITHMS = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+
+class TokenError(Exception):
+    """Raised for malformed, tampered, expired or wrong-type tokens."""
+    pass
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+def key_id(secret: str) -> str:
+    """Short public fingerprint of a signing key, used as the token "kid"."""
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()[:12]
+
+@lru_cache(maxsize=1)
+def signing_keys():
+    """{kid: secret} of every accepted key; the first entry is the one that signs."""
+    secrets = [settings.SECRET_KEY] + [k.strip() for k in settings.AUTH_PREVIOUS_SECRET_KEYS.split(",") if k.strip()]
+    return {key_id(secret): secret for secret in secrets}
+
+def _sign(signing_input: bytes, secret: str) -> bytes:
+    if settings.ALGORITHM not in HMAC_ALGORITHMS:
+        raise TokenError(f"Unsupported ALGORITHM {settings.ALGORITHM}")
+    return hmac.new(secret.encode("utf-8"), signing_input, HMAC_ALGORITHMS[settings.ALGORITHM]).digest()
+
+def create_token(user_id: int, token_type: str, ttl_seconds: int) -> str:
+    kid, secret = next(iter(signing_keys().items()))
+    now = int(time.time())
+    header = {"alg": settings.ALGORITHM, "typ": "JWT", "kid": kid}
+    payload = {"sub": str(user_id), "type": token_type, "iat": now, "exp": now + ttl_seconds, "jti": uuid.uuid4().hex}
+    signing_input = ".".join(_b64encode(json.dumps(part, separators=(",", ":")).encode("utf-8")) for part in (header, payload))
+    return f"{signing_input}.{_b64encode(_sign(signing_input.encode('ascii'), secret))}"
+
+def issue_tokens(user_id: int) -> dict:
+    """Short-lived access token plus a refresh token for /api/v1/auth/token/refresh."""
+    access_ttl = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    return {
+        "access_token": create_token(user_id, "access", access_ttl),
+        "refresh_token": create_token(user_id, "refresh", settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400),
+        "token_type": "bearer",
+        "expires_in": access_ttl
+    }
+
+def decode_token(token: str, expected_type: str) -> dict:
+    """Checks signature, algorithm, expiry and type. Returns the claims or raises TokenError."""
+    # Tokens are base64url; anything else would fail while building the signing input
+    if not isinstance(token, str) or not token.isascii():
+        raise TokenError("Malformed token")
+    try:
+        header_b64, payload_b64, signature_b64 = token.split(".")
+        header = json.loads(_b64decode(header_b64))
+        signature = _b64decode(signature_b64)
+    except (ValueError, TypeError):
+        raise TokenError("Malformed token")
+    # Valid JSON is not enough: "MQ" decodes to 1, "W10" to []
+    if not isinstance(header, dict):
+        raise TokenError("Malformed token")
+    # Never let the token choose its own algorithm (e.g. "none")
+    if header.get("alg") != settings.ALGORITHM:
+        raise TokenError("Unexpected token algorithm")
+    kid = header.get("kid")
+    secret = signing_keys().get(kid) if isinstance(kid, str) else None
+    if secret is None:
+        raise TokenError("Unknown signing key")
+    if not hmac.compare_digest(signature, _sign(f"{header_b64}.{payload_b64}".encode("ascii"), secret)):
+        raise TokenError("Invalid token signature")
+
+    try:
+        claims = json.loads(_b64decode(payload_b64))
+    except ValueError:
+        raise TokenError("Malformed token")
+    if not isinstance(claims, dict):
+        raise TokenError("Malformed token")
+    if claims.get("type") != expected_type:
+        raise TokenError(f"Wrong token type (expected {expected_type})")
+    if not isinstance(claims.get("exp"), int) or claims["exp"] <= time.time():
+        raise TokenError("Token expired")
+    return claims
+
+class ClaimsCache:
+    """
+    Bounded LRU of verified access tokens -> claims, so repeat requests with the
+    same token skip the HMAC and JSON work. Expiry is still checked on every hit.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token):
+        with self.lock:
+            claims = self.entries.get(token)
+            if claims is None:
+                self.misses += 1
+                return None
+            if claims["exp"] <= time.time():
+                del self.entries[token]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(token)
+            self.hits += 1
+            return claims
+
+    def put(self, token, claims):
+        with self.lock:
+            self.entries[token] = claims
+            self.entries.move_to_end(token)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            return {"size": len(self.entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+claims_cache = ClaimsCache(settings.AUTH_CLAIMS_CACHE_SIZE)
+
+def verify_access_token(token: str) -> dict:
+    claims = claims_cache.get(token)
+    if claims is None:
+        claims = decode_token(token, "access")
+        claims_cache.put(token, claims)
+    return claims
+
+# ----------------------------------------------------------------------
+# WALLET HASHES
+# ----------------------------------------------------------------------
+@lru_cache(maxsize=1)
+def wallet_hashids():
+    import hashids
+    return hashids.Hashids(salt=settings.SECRET_KEY, min_length=16)
+
+def new_wallet_hash(user_id: int, timestamp=None) -> str:
+    """Public wallet id for a new SkillWallet (OTP sign-up and the bulk importer)."""
+    if timestamp is None:
+        timestamp = datetime.utcnow().timestamp()
+    return wallet_hashids().encode(user_id, int(timestamp))
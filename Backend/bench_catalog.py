@@ -0,0 +1,153 @@
+# Backend/bench_catalog.py
+#
+# Benchmark for the faceted Skill Bank catalog (facet_utils). Seeds a large
+# lesson / session catalog, builds the bitmap snapshot, then times random
+# filter combinations (matching items + counts for every facet + one page)
+# and checks a sample of them against GROUP BY counts from the database.
+# Exits 1 if any count disagrees.
+#
+#   python bench_catalog.py --lessons 100000 --sessions 20000 --queries 5000
+#   python bench_catalog.py --json catalog.json
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+# Must be set before database.py is imported
+WORK_DIR = tempfile.mkdtemp(prefix="skillwallet_catalog_")
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL") or f"sqlite:///{os.path.join(WORK_DIR, 'bench.db')}"
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import models
+from database import engine, SessionLocal
+from facet_utils import FacetCatalog, FACETS
+from sqlalchemy import func
+
+VALUES = {
+    "type": ["video", "document"],
+    "language": ["English", "Hindi", "Tamil", "Telugu", "Kannada", "Marathi", "Bengali"],
+    "difficulty": ["Beginner", "Intermediate", "Advanced"],
+}
+
+# ----------------------------------------------------------------------
+# 1. DATA SETUP
+# ----------------------------------------------------------------------
+def seed(lessons, sessions):
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [{"id": 1, "phone_number": "+918800000000", "name": "Bench Teacher"}])
+        conn.execute(models.SkillLesson.__table__.insert(), [
+            {"teacher_id": 1, "title": f"Lesson {i}", "description": "", "file_path": "placeholder.mp4",
+             "type": random.choice(VALUES["type"]), "language": random.choice(VALUES["language"]),
+             "difficulty": random.choice(VALUES["difficulty"])} for i in range(lessons)])
+        # A tenth of the sessions are already over and must not be counted
+        conn.execute(models.LiveSession.__table__.insert(), [
+            {"teacher_id": 1, "title": f"Session {i}", "description": "", "price": 0, "seats_taken": 0,
+             "scheduled_at": now + timedelta(hours=random.randint(-240, 2400) if i % 10 else -1),
+             "language": random.choice(VALUES["language"]), "difficulty": random.choice(VALUES["difficulty"])}
+            for i in range(sessions)])
+
+def random_filters(kind):
+    filters = {}
+    for facet in FACETS[kind]:
+        if random.random() < 0.5:
+            filters[facet] = random.sample(VALUES[facet], random.randint(1, 2))
+    return filters
+
+# ----------------------------------------------------------------------
+# 2. CHECKS AGAINST THE DATABASE
+# ----------------------------------------------------------------------
+def sql_counts(db, kind, filters, now):
+    """The same facet counts with one GROUP BY per facet."""
+    model = models.SkillLesson if kind == "lessons" else models.LiveSession
+    counts = {}
+    for facet in FACETS[kind]:
+        query = db.query(getattr(model, facet), func.count(model.id)).group_by(getattr(model, facet))
+        if kind == "sessions":
+            query = query.filter(model.scheduled_at > now)
+        for other, values in filters.items():
+            if other != facet:
+                query = query.filter(getattr(model, other).in_(values))
+        counts[facet] = {value: count for value, count in query.all() if value is not None}
+    return counts
+
+def same_counts(snapshot_counts, database_counts):
+    # The snapshot also lists values that have no match under the current filters
+    return all({v: c for v, c in snapshot_counts[facet].items() if c} == database_counts[facet] for facet in database_counts)
+
+# ----------------------------------------------------------------------
+# 3. CLI
+# ----------------------------------------------------------------------
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark faceted catalog queries")
+    parser.add_argument("--lessons", type=int, default=50000)
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--checks", type=int, default=50, help="Queries per catalog compared against SQL")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", dest="json_path", help="Write results to this file")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    seed(args.lessons, args.sessions)
+    catalog = FacetCatalog()
+    started = time.perf_counter()
+    catalog.build()
+    build_ms = (time.perf_counter() - started) * 1000
+    print(f"--- CATALOG: {args.lessons} lessons, {args.sessions} sessions, snapshot built in {build_ms:.1f} ms ---")
+
+    result = {"lessons": args.lessons, "sessions": args.sessions, "build_ms": round(build_ms, 1), "latency_us": {}}
+    failures = []
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        for kind in FACETS:
+            snapshot = catalog.snapshot(kind)
+            latencies = []
+            for i in range(args.queries):
+                filters = random_filters(kind)
+                started = time.perf_counter()
+                base = snapshot.upcoming(now) if kind == "sessions" else None
+                matching, counts = snapshot.query(filters, base)
+                snapshot.page(matching, 0, 50)
+                latencies.append(time.perf_counter() - started)
+                if i < args.checks and not same_counts(counts, sql_counts(db, kind, filters, now)):
+                    failures.append(f"{kind} {filters}: facet counts differ from the database")
+            latencies.sort()
+            lat = {p: round(percentile(latencies, p) * 1e6, 1) for p in (50, 95, 99)}
+            result["latency_us"][kind] = lat
+            print(f"  {kind:<9} p50/p95/p99: {lat[50]} / {lat[95]} / {lat[99]} µs ({args.queries} queries)")
+    finally:
+        db.close()
+
+    result["failures"] = failures
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Results written to {args.json_path}")
+
+    engine.dispose()
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+    if failures:
+        print(f"\n❌ {len(failures)} catalog checks failed:")
+        for failure in failures[:20]:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\n✅ Facet counts match the database.")
+
+if __name__ == "__main__":
+    main_cli()
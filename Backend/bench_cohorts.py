@@ -0,0 +1,137 @@
+# Backend/bench_cohorts.py
+#
+# Benchmark for the trust score cohort tables (cohort_utils). Seeds scored
+# workers across professions and districts, times a full refresh, then
+# re-scores a few workers and times the incremental refresh that follows.
+# Every stored percentile and rank is checked against a brute-force count;
+# exits 1 if any differs.
+#
+#   python bench_cohorts.py --workers 100000 --changes 500
+#   python bench_cohorts.py --json cohorts.json
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from collections import defaultdict
+
+# Must be set before database.py is imported
+WORK_DIR = tempfile.mkdtemp(prefix="skillwallet_cohorts_")
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL") or f"sqlite:///{os.path.join(WORK_DIR, 'bench.db')}"
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import models
+from database import engine, SessionLocal
+from cohort_utils import refresh_cohorts, load_scores
+from sqlalchemy import update
+
+PROFESSIONS = ["Electrician", "Plumber", "Carpenter", "Mason", "House Painter", "Welder", "Tailor", "Driver"]
+PLACES = [("Maharashtra", "Pune"), ("Maharashtra", "Nagpur"), ("Karnataka", "Mysuru"), ("Tamil Nadu", "Madurai"),
+          ("Uttar Pradesh", "Lucknow"), ("West Bengal", "Howrah"), ("Bihar", "Patna"), ("Gujarat", "Surat")]
+
+# ----------------------------------------------------------------------
+# 1. DATA SETUP
+# ----------------------------------------------------------------------
+def seed(workers):
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    users, wallets, credentials = [], [], []
+    for i in range(1, workers + 1):
+        state, district = random.choice(PLACES)
+        users.append({"id": i, "phone_number": f"+91{i:010d}", "profession": random.choice(PROFESSIONS),
+                      "state": state, "district": district})
+        wallets.append({"id": i, "user_id": i})
+        for k in range(random.randint(1, 3)):
+            credentials.append({"skill_wallet_id": i, "token_id": f"bench-{i}-{k}", "skill_name": "bench",
+                                "skill_trust_score": random.randint(300, 900)})
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), users)
+        conn.execute(models.SkillWallet.__table__.insert(), wallets)
+        conn.execute(models.SkillCredential.__table__.insert(), credentials)
+
+def rescore(count):
+    """Gives count random workers a new score on one of their credentials."""
+    Credential = models.SkillCredential
+    with engine.begin() as conn:
+        ids = [row[0] for row in conn.execute(Credential.__table__.select().with_only_columns(Credential.id))]
+        for credential_id in random.sample(ids, min(count, len(ids))):
+            conn.execute(update(Credential).where(Credential.id == credential_id).values(
+                skill_trust_score=random.randint(300, 900)))
+
+# ----------------------------------------------------------------------
+# 2. CHECK AGAINST A BRUTE-FORCE COUNT
+# ----------------------------------------------------------------------
+def mismatches(db):
+    user_ids, keys, scores = load_scores(db)
+    cohorts = defaultdict(list)
+    for key, score in zip(keys, scores):
+        cohorts[key].append(score)
+    expected = {}
+    for user_id, key, score in zip(user_ids, keys, scores):
+        members = cohorts[key]
+        below = sum(1 for other in members if other < score)
+        at = sum(1 for other in members if other == score)
+        expected[user_id] = (round(100 * (below + at / 2) / len(members)), len(members) - below - at + 1)
+    stored = {row.user_id: (row.percentile, row.rank) for row in db.query(models.WorkerScore)}
+    return [user_id for user_id in expected.keys() | stored.keys() if expected.get(user_id) != stored.get(user_id)]
+
+# ----------------------------------------------------------------------
+# 3. CLI
+# ----------------------------------------------------------------------
+def timed(**kwargs):
+    started = time.perf_counter()
+    summary = refresh_cohorts(**kwargs)
+    return summary, (time.perf_counter() - started) * 1000
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark cohort percentile refreshes")
+    parser.add_argument("--workers", type=int, default=50000)
+    parser.add_argument("--changes", type=int, default=200, help="Workers re-scored before the incremental refresh")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", dest="json_path", help="Write results to this file")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    seed(args.workers)
+    print(f"--- COHORTS: {args.workers} workers, {len(PROFESSIONS) * len(PLACES)} possible cohorts ---")
+    result = {"workers": args.workers, "changes": args.changes}
+    failures = []
+    db = SessionLocal()
+    try:
+        for label, prepare, kwargs in [
+            ("full", lambda: None, {"full": True}),
+            ("unchanged", lambda: None, {}),
+            ("incremental", lambda: rescore(args.changes), {}),
+        ]:
+            prepare()
+            summary, ms = timed(**kwargs)
+            result[label] = {"ms": round(ms, 1), **summary}
+            print(f"  {label:<12} {ms:8.1f} ms  {summary['recomputed']} cohorts recomputed, {summary['rows_written']} rows written")
+            db.expire_all()
+            wrong = mismatches(db)
+            if wrong:
+                failures.append(f"{label}: {len(wrong)} workers with a wrong percentile or rank (e.g. user {wrong[0]})")
+    finally:
+        db.close()
+
+    result["failures"] = failures
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Results written to {args.json_path}")
+
+    engine.dispose()
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+    if failures:
+        print(f"\n❌ {len(failures)} cohort checks failed:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\n✅ Stored percentiles and ranks match a brute-force count.")
+
+if __name__ == "__main__":
+    main_cli()
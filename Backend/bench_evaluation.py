@@ -0,0 +1,294 @@
+# Backend/bench_evaluation.py
+#
+# Load benchmark for the work submission -> evaluation pipeline.
+# Runs fully in-process against a throwaway SQLite DB with a simulated model
+# backend, so results are reproducible and cost nothing.
+#
+#   python bench_evaluation.py --requests 500 --concurrency 50 --latency lognormal:400,0.5 --error-rate 0.02
+#   python bench_evaluation.py --modes background --json bench.json
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+
+# Must be set before database.py is imported
+BENCH_DB = os.path.join(tempfile.mkdtemp(prefix="skillwallet_bench_"), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{BENCH_DB}"
+sys.path.append('.')
+
+# ----------------------------------------------------------------------
+# 1. FAKE MODEL BACKEND
+# ----------------------------------------------------------------------
+class LatencyDistribution:
+    """
+    Parses "fixed:MS", "uniform:LO_MS,HI_MS" or "lognormal:MEAN_MS,SIGMA".
+    """
+
+    def __init__(self, spec):
+        kind, _, params = spec.partition(":")
+        values = [float(v) for v in params.split(",") if v]
+        self.spec = spec
+        if kind == "fixed":
+            self.sample_ms = lambda: values[0]
+        elif kind == "uniform":
+            self.sample_ms = lambda: random.uniform(values[0], values[1])
+        elif kind == "lognormal":
+            import math
+            mean_ms, sigma = values[0], values[1] if len(values) > 1 else 0.5
+            mu = math.log(mean_ms) - sigma ** 2 / 2
+            self.sample_ms = lambda: random.lognormvariate(mu, sigma)
+        else:
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample(self):
+        return self.sample_ms() / 1000.0
+
+class FakeModelBackend:
+    """
+    Stands in for ai_utils and ai_evaluator.GeminiEvaluator.
+    Each model call sleeps for a sampled latency and fails with probability error_rate.
+    """
+
+    def __init__(self, latency, error_rate):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+
+    def _model_call(self):
+        time.sleep(self.latency.sample())
+        with self.lock:
+            self.calls += 1
+            if random.random() < self.error_rate:
+                self.errors += 1
+                raise RuntimeError("Simulated model error")
+
+    def _result(self, transcription):
+        score = random.randint(300, 900)
+        return {
+            "score": score,
+            "transcription": transcription,
+            "feedback": {"contributing_factors": ["Simulated"], "limiting_factors": [], "improvement_tips": []}
+        }
+
+    # ai_utils interface
+    def transcribe_audio(self, file_path):
+        self._model_call()
+        return f"Simulated transcript of {file_path}"
+
+    def evaluate_skill_with_google(self, work_proof_path, audio_path, profession, context_data, user_description=""):
+        self._model_call()
+        return self._result(user_description or "No audio provided")
+
+    def evaluate_skills_batch(self, items, batch_size=5):
+        for start in range(0, len(items), batch_size):
+            chunk = items[start:start + batch_size]
+            self._model_call()
+            for i, item in enumerate(chunk):
+                yield start + i, self._result(item.get("user_description") or "No audio provided")
+
+    # ai_evaluator.GeminiEvaluator interface
+    def evaluate(self, work_proof_path, audio_path, profession, context_data, user_description=None):
+        return self.evaluate_skill_with_google(work_proof_path, audio_path, profession, context_data, user_description or "")
+
+    def evaluate_batch(self, submissions, profession, context_data):
+        self._model_call()
+        return [self._result(s.get("user_description") or "") for s in submissions]
+
+def install_fake_backend(backend):
+    import ai_utils
+    import main
+
+    for name in ("transcribe_audio", "evaluate_skill_with_google", "evaluate_skills_batch"):
+        setattr(ai_utils, name, getattr(backend, name))
+        if hasattr(main, name):
+            setattr(main, name, getattr(backend, name))
+
+    try:
+        import ai_evaluator
+        ai_evaluator.GeminiEvaluator.evaluate = staticmethod(backend.evaluate)
+        ai_evaluator.GeminiEvaluator.evaluate_batch = staticmethod(backend.evaluate_batch)
+    except ImportError as e:
+        # ai_evaluator depends on the trust layer package, which is optional
+        print(f"Skipping GeminiEvaluator patch: {e}")
+
+# ----------------------------------------------------------------------
+# 2. DATA SETUP
+# ----------------------------------------------------------------------
+def seed_workers(count):
+    """Creates `count` users with wallets and returns their ids."""
+    import models
+    from database import engine, SessionLocal
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        start = db.query(models.User).count()
+        users = [
+            {"phone_number": f"+91900{start + i:07d}", "name": f"Bench Worker {start + i}", "profession": "Painter",
+             "state": "Karnataka", "district": "Bengaluru", "local_area": "Jayanagar", "age": 30}
+            for i in range(count)
+        ]
+        db.execute(models.User.__table__.insert(), users)
+        ids = [row[0] for row in db.query(models.User.id).order_by(models.User.id.desc()).limit(count)]
+        db.execute(models.SkillWallet.__table__.insert(), [{"user_id": uid, "wallet_hash": f"bench-{uid}"} for uid in ids])
+        db.commit()
+        return ids
+    finally:
+        db.close()
+
+# ----------------------------------------------------------------------
+# 3. LOAD DRIVER
+# ----------------------------------------------------------------------
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+async def drive(app, run_tag, user_ids, total_requests, concurrency, queue_sampler):
+    import httpx
+
+    latencies = []
+    statuses = {}
+    in_flight = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i):
+            nonlocal in_flight
+            user_id = user_ids[i % len(user_ids)]
+            payload = {
+                "wallet_hash": f"bench-{user_id}",
+                "skill_name": "Wall Painting",
+                # Unique proof per request so content dedupe does not short-circuit the pipeline
+                "image_url": f"uploads/bench/{run_tag}/{user_id}/{i}.png",
+                "audio_file_url": "",
+                "language_code": "en",
+                "description": "Applied two coats of primer and finished with texture paint."
+            }
+            async with semaphore:
+                in_flight += 1
+                started = time.perf_counter()
+                try:
+                    response = await client.post(f"/api/v1/work/submit/{user_id}", json=payload)
+                    key = str(response.status_code)
+                except Exception as e:
+                    key = type(e).__name__
+                latencies.append(time.perf_counter() - started)
+                statuses[key] = statuses.get(key, 0) + 1
+                in_flight -= 1
+
+        async def sample_queue():
+            while True:
+                queue_sampler(in_flight)
+                await asyncio.sleep(0.05)
+
+        sampler = asyncio.create_task(sample_queue())
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total_requests)))
+        elapsed = time.perf_counter() - started
+        sampler.cancel()
+
+    return latencies, statuses, elapsed
+
+def run_mode(mode, args, user_ids):
+    import main
+    from job_queue import evaluation_queue
+
+    main.settings.EVALUATION_MODE = mode
+    in_flight_samples = []
+    queue_samples = []
+
+    def sampler(in_flight):
+        in_flight_samples.append(in_flight)
+        queue_samples.append(evaluation_queue.depth())
+
+    print(f"--- {mode.upper()}: {args.requests} submissions, concurrency {args.concurrency} ---")
+    latencies, statuses, elapsed = asyncio.run(drive(main.app, mode, user_ids, args.requests, args.concurrency, sampler))
+
+    # In background mode the work is only done when the queue is empty
+    drain_started = time.perf_counter()
+    evaluation_queue.drain()
+    drain_seconds = time.perf_counter() - drain_started
+
+    latencies.sort()
+    completed_in = elapsed + drain_seconds
+    return {
+        "mode": mode,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "statuses": statuses,
+        "request_throughput_rps": round(args.requests / elapsed, 2),
+        "evaluation_throughput_per_s": round(args.requests / completed_in, 2),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2) if latencies else 0.0
+        },
+        "in_flight_requests": {
+            "max": max(in_flight_samples, default=0),
+            "mean": round(sum(in_flight_samples) / len(in_flight_samples), 2) if in_flight_samples else 0.0
+        },
+        "evaluation_queue_depth": {
+            "max": max(queue_samples, default=0),
+            "mean": round(sum(queue_samples) / len(queue_samples), 2) if queue_samples else 0.0
+        },
+        "drain_seconds": round(drain_seconds, 3)
+    }
+
+def print_report(result):
+    lat = result["latency_ms"]
+    print(f"  statuses:            {result['statuses']}")
+    print(f"  request throughput:  {result['request_throughput_rps']} req/s")
+    print(f"  evaluation rate:     {result['evaluation_throughput_per_s']} evals/s (drain {result['drain_seconds']}s)")
+    print(f"  latency p50/p95/p99: {lat['p50']} / {lat['p95']} / {lat['p99']} ms (max {lat['max']})")
+    print(f"  in-flight requests:  max {result['in_flight_requests']['max']}, mean {result['in_flight_requests']['mean']}")
+    print(f"  evaluation queue:    max {result['evaluation_queue_depth']['max']}, mean {result['evaluation_queue_depth']['mean']}")
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark submit_work with a simulated model backend")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=50, help="Distinct users submitting")
+    parser.add_argument("--latency", default="lognormal:300,0.6", help="fixed:MS | uniform:LO,HI | lognormal:MEAN,SIGMA")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--modes", default="sync,background")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", dest="json_path", help="Write results to this file")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    backend = FakeModelBackend(LatencyDistribution(args.latency), args.error_rate)
+    install_fake_backend(backend)
+    user_ids = seed_workers(args.workers)
+
+    results = []
+    for mode in args.modes.split(","):
+        result = run_mode(mode.strip(), args, user_ids)
+        print_report(result)
+        results.append(result)
+
+    report = {
+        "latency_distribution": args.latency,
+        "error_rate": args.error_rate,
+        "model_calls": backend.calls,
+        "model_errors": backend.errors,
+        "results": results
+    }
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.json_path}")
+
+if __name__ == "__main__":
+    main_cli()
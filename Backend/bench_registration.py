@@ -0,0 +1,181 @@
+# Backend/bench_registration.py
+#
+# Concurrency benchmark for live session registration (enrollment_utils).
+# Many threads register many users for a few sessions at once, every user
+# clicking several times, then the database is checked for duplicates,
+# oversold seats and seat counters that drifted from the enrollment rows.
+# Exits 1 if any check fails or any registration raised (e.g. a deadlock).
+#
+#   python bench_registration.py --users 3000 --capacity 1000 --threads 32
+#   python bench_registration.py --sessions 4 --capacity 0 --clicks 5 --json reg.json
+#   BENCH_DATABASE_URL=postgresql://... python bench_registration.py   # disposable Postgres DB
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+# Must be set before database.py is imported
+WORK_DIR = tempfile.mkdtemp(prefix="skillwallet_registration_")
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL") or f"sqlite:///{os.path.join(WORK_DIR, 'bench.db')}"
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import models
+from database import engine, SessionLocal
+from enrollment_utils import register_for_session, REGISTERED
+from sqlalchemy import func
+
+# ----------------------------------------------------------------------
+# 1. DATA SETUP
+# ----------------------------------------------------------------------
+def seed(users, sessions, capacity):
+    """Creates a teacher, `users` learners and `sessions` upcoming sessions. Returns (user_ids, session_ids)."""
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [
+            {"id": i + 1, "phone_number": f"+9188{i:08d}", "name": f"Bench Learner {i}"} for i in range(users + 1)])
+        conn.execute(models.LiveSession.__table__.insert(), [
+            {"id": i + 1, "teacher_id": users + 1, "title": f"Popular class {i}", "price": 0,
+             "scheduled_at": datetime.utcnow() + timedelta(days=1), "capacity": capacity or None, "seats_taken": 0}
+            for i in range(sessions)])
+    return list(range(1, users + 1)), list(range(1, sessions + 1))
+
+# ----------------------------------------------------------------------
+# 2. LOAD DRIVER
+# ----------------------------------------------------------------------
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def drive(attempts, threads):
+    latencies = []
+    statuses = {}
+    errors = {}
+    lock = threading.Lock()
+
+    def one(attempt):
+        user_id, session_id = attempt
+        db = SessionLocal()
+        started = time.perf_counter()
+        try:
+            key = register_for_session(db, user_id, session_id).status
+        except Exception as e:
+            db.rollback()
+            key = type(e).__name__
+            with lock:
+                errors[key] = str(e)[:200]
+        finally:
+            db.close()
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            statuses[key] = statuses.get(key, 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one, attempts))
+    return latencies, statuses, errors, time.perf_counter() - started
+
+# ----------------------------------------------------------------------
+# 3. INVARIANTS
+# ----------------------------------------------------------------------
+def check(session_ids, users, capacity, statuses):
+    """Returns a list of failed checks (empty when registration held up)."""
+    failures = []
+    db = SessionLocal()
+    try:
+        Enrollment = models.SessionEnrollment
+        duplicates = db.query(Enrollment.user_id, Enrollment.session_id).group_by(
+            Enrollment.user_id, Enrollment.session_id).having(func.count(Enrollment.id) > 1).count()
+        if duplicates:
+            failures.append(f"{duplicates} duplicate (user, session) registrations")
+
+        counts = dict(db.query(Enrollment.session_id, func.count(Enrollment.id)).group_by(Enrollment.session_id).all())
+        expected = min(users, capacity) if capacity else users
+        for session in db.query(models.LiveSession).filter(models.LiveSession.id.in_(session_ids)):
+            rows = counts.get(session.id, 0)
+            if session.seats_taken != rows:
+                failures.append(f"session {session.id}: seats_taken {session.seats_taken} != {rows} enrollment rows")
+            if capacity and rows > capacity:
+                failures.append(f"session {session.id}: oversold, {rows} registrations for {capacity} seats")
+            if rows != expected:
+                failures.append(f"session {session.id}: {rows} registrations, expected {expected}")
+    finally:
+        db.close()
+
+    registered = statuses.get(REGISTERED, 0)
+    if registered != sum(counts.values()):
+        failures.append(f"{registered} successful registrations reported, {sum(counts.values())} rows stored")
+    return failures
+
+# ----------------------------------------------------------------------
+# 4. CLI
+# ----------------------------------------------------------------------
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent live session registration")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--sessions", type=int, default=1, help="Sessions the users register for (1 = one hot session)")
+    parser.add_argument("--capacity", type=int, default=500, help="Seats per session; 0 = unlimited")
+    parser.add_argument("--clicks", type=int, default=3, help="Registration attempts per user and session")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", dest="json_path", help="Write results to this file")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    user_ids, session_ids = seed(args.users, args.sessions, args.capacity)
+    attempts = [(u, s) for u in user_ids for s in session_ids for _ in range(args.clicks)]
+    random.shuffle(attempts)
+
+    print(f"--- REGISTRATION ({engine.dialect.name}): {len(attempts)} attempts, {args.users} users x {args.sessions} sessions, "
+          f"capacity {args.capacity or 'unlimited'}, {args.threads} threads ---")
+    latencies, statuses, errors, elapsed = drive(attempts, args.threads)
+    latencies.sort()
+    failures = check(session_ids, args.users, args.capacity, statuses)
+    failures += [f"{name} raised: {message}" for name, message in errors.items()]
+
+    result = {
+        "dialect": engine.dialect.name,
+        "attempts": len(attempts),
+        "threads": args.threads,
+        "capacity": args.capacity or None,
+        "statuses": statuses,
+        "throughput_per_s": round(len(attempts) / elapsed, 1),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2) if latencies else 0.0
+        },
+        "failures": failures
+    }
+    lat = result["latency_ms"]
+    print(f"  statuses:            {statuses}")
+    print(f"  throughput:          {result['throughput_per_s']} attempts/s")
+    print(f"  latency p50/p95/p99: {lat['p50']} / {lat['p95']} / {lat['p99']} ms (max {lat['max']})")
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Results written to {args.json_path}")
+
+    engine.dispose()
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+    if failures:
+        print(f"\n❌ {len(failures)} registration checks failed:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\n✅ No duplicates, no oversold seats, seat counters match.")
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,121 @@
+# Backend/bench_startup.py
+#
+# Import-time benchmark for the API app. Imports `main` in fresh interpreters
+# and fails if the median cold import exceeds the budget, or if the import
+# has side effects (SQL statements, files created, heavy SDKs loaded eagerly):
+#
+#   python bench_startup.py                  # 5 runs, default budget
+#   python bench_startup.py --budget-ms 800 --runs 10 --json startup.json
+#
+# Run it from the Backend directory.
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# SDKs that must only be imported on first use
+LAZY_MODULES = ("google.generativeai", "duckduckgo_search", "hashids", "boto3")
+
+PROBE = """
+import os, sys, json, time
+started = time.perf_counter()
+import database
+from sqlalchemy import event
+statements = []
+event.listen(database.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+import main
+elapsed = time.perf_counter() - started
+print(json.dumps({
+    "import_seconds": elapsed,
+    "sql_statements": len(statements),
+    "eager_modules": [m for m in %r if m in sys.modules],
+    "files_created": sorted(os.listdir(".")),
+}))
+""" % (LAZY_MODULES,)
+
+def run_probe(python):
+    """Imports main once in a clean interpreter and working directory. Returns (result, importtime lines)."""
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ)
+        env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'startup.db')}")
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [BACKEND_DIR, env.get("PYTHONPATH")]))
+        env["PYTHONDONTWRITEBYTECODE"] = "1"
+        proc = subprocess.run([python, "-X", "importtime", "-c", PROBE], cwd=workdir, env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"Importing main failed:\n{proc.stderr[-2000:]}")
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        return result, proc.stderr.splitlines()
+
+def slowest_imports(importtime_lines, top=15, max_depth=1):
+    """Slowest imports (top level and their direct children) by cumulative time, from `python -X importtime`."""
+    rows = []
+    for line in importtime_lines:
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        # Nested imports are indented two spaces per level under their parent
+        name = name[1:]
+        if (len(name) - len(name.lstrip(" "))) // 2 <= max_depth:
+            rows.append((int(cumulative_us), name.strip()))
+    rows.sort(reverse=True)
+    return [{"module": name, "cumulative_ms": round(us / 1000, 1)} for us, name in rows[:top]]
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Cold import-time benchmark for main.py")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1000, help="Maximum median import time")
+    parser.add_argument("--python", default=sys.executable)
+    parser.add_argument("--json", dest="json_path", help="Write results to this file")
+    args = parser.parse_args()
+
+    timings = []
+    problems = []
+    importtime_lines = []
+    for i in range(args.runs):
+        result, importtime_lines = run_probe(args.python)
+        timings.append(result["import_seconds"] * 1000)
+        if i == 0:
+            if result["sql_statements"]:
+                problems.append(f"import ran {result['sql_statements']} SQL statements")
+            if result["eager_modules"]:
+                problems.append(f"imported eagerly: {', '.join(result['eager_modules'])}")
+            if result["files_created"]:
+                problems.append(f"created files at import: {', '.join(result['files_created'])}")
+
+    median_ms = statistics.median(timings)
+    if median_ms > args.budget_ms:
+        problems.append(f"median import {median_ms:.0f} ms exceeds budget {args.budget_ms:.0f} ms")
+
+    report = {
+        "runs": args.runs,
+        "budget_ms": args.budget_ms,
+        "import_ms": {"median": round(median_ms, 1), "min": round(min(timings), 1), "max": round(max(timings), 1)},
+        "slowest_imports": slowest_imports(importtime_lines),
+        "problems": problems
+    }
+
+    print(f"--- STARTUP: import main, {args.runs} cold runs ---")
+    print(f"median {report['import_ms']['median']} ms (min {report['import_ms']['min']}, max {report['import_ms']['max']}), budget {args.budget_ms:.0f} ms")
+    print("Slowest imports:")
+    for row in report["slowest_imports"]:
+        print(f"  {row['cumulative_ms']:>8} ms  {row['module']}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.json_path}")
+
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        sys.exit(1)
+    print("✅ Startup within budget and free of import-time side effects.")
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,137 @@
+# Backend/bench_workers.py
+#
+# Single- vs multi-worker throughput benchmark. Starts the server under
+# gunicorn_conf.py with each worker count in turn, drives it with the
+# load_test.py journeys and compares throughput and latency:
+#
+#   python seed_bulk_data.py --preset small
+#   python bench_workers.py --workers 1,4 --users 200 --duration 30
+#   python bench_workers.py --workers 1,2,4 --scenarios catalog_browse --json workers.json
+#
+# Uses the DATABASE_URL from the environment / .env, like the server itself.
+# SQLite serialises writers across processes, so the default mix is read-only
+# journeys; use PostgreSQL for write-heavy comparisons.
+
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+import argparse
+import subprocess
+import importlib.util
+
+import load_test
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SCENARIOS = "catalog_browse,dashboards,public_profile_scan"
+
+def server_command(workers, port):
+    if importlib.util.find_spec("gunicorn"):
+        return [sys.executable, "-m", "gunicorn", "-c", "gunicorn_conf.py", "main:app"]
+    # Fallback without preload; workers are spawned and import the app themselves
+    return [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)]
+
+def start_server(workers, port, startup_timeout):
+    import httpx
+
+    env = dict(os.environ)
+    env.update({
+        "PORT": str(port),
+        "WEB_CONCURRENCY": str(workers),
+        "AUTO_CREATE_SCHEMA": "false",
+        "LOG_LEVEL": "WARNING",
+        "TRACE_SPANS_ENABLED": "false",
+        # The default journeys never log in, so per-worker OTP / event state is fine here
+        "ALLOW_PER_WORKER_STATE": "true",
+        "OTP_DEBUG_RESPONSE": "true",
+        # Every virtual user comes from 127.0.0.1; don't let the login rate limit skew results
+        "OTP_IP_BURST": "1000000"
+    })
+    proc = subprocess.Popen(server_command(workers, port), cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Server exited during startup:\n{proc.stderr.read()[-2000:]}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/v1/skillbank/lessons", timeout=2).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    stop_server(proc)
+    raise RuntimeError(f"Server did not become ready within {startup_timeout}s")
+
+def stop_server(proc, timeout=60):
+    # SIGTERM exercises the same graceful drain as a deploy
+    proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+def summarise(report):
+    duration = report["meta"]["duration_seconds"]
+    requests = sum(s["count"] for s in report["steps"].values())
+    errors = sum(s["errors"] for s in report["steps"].values())
+    return {
+        "requests": requests,
+        "throughput_rps": round(requests / duration, 2) if duration else 0.0,
+        "error_rate": round(errors / requests, 4) if requests else 0.0,
+        "p95_ms_by_step": {name: s["latency_ms"]["p95"] for name, s in report["steps"].items()}
+    }
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Compare single- and multi-worker throughput")
+    parser.add_argument("--workers", default=f"1,{os.cpu_count() or 1}", help="Comma-separated worker counts")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--manifest", default="seed_manifest.json", help="Written by seed_bulk_data.py")
+    parser.add_argument("--users", type=int, default=100, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--ramp-up", type=float, default=3)
+    parser.add_argument("--think-time", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--scenarios", default=DEFAULT_SCENARIOS)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--startup-timeout", type=float, default=60)
+    parser.add_argument("--json", dest="json_path", help="Write results to this file")
+    args = parser.parse_args()
+
+    try:
+        with open(args.manifest) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        print(f"Manifest {args.manifest} not found. Run seed_bulk_data.py first.")
+        sys.exit(1)
+
+    args.base_url = f"http://127.0.0.1:{args.port}"
+    results = {}
+    for workers in [int(w) for w in args.workers.split(",")]:
+        print(f"Starting server with {workers} worker(s)...")
+        proc = start_server(workers, args.port, args.startup_timeout)
+        try:
+            report = asyncio.run(load_test.run(args, manifest))
+        finally:
+            stop_server(proc)
+        results[workers] = summarise(report)
+
+    baseline = results[min(results)]["throughput_rps"]
+    print(f"\n--- WORKERS: {args.users} users, {args.duration:.0f}s, scenarios {args.scenarios} ---")
+    print(f"{'workers':>8}{'requests':>10}{'rps':>10}{'speedup':>9}{'err%':>8}  p95 ms by step")
+    for workers, s in results.items():
+        speedup = s["throughput_rps"] / baseline if baseline else 0.0
+        p95 = ", ".join(f"{name} {value}" for name, value in s["p95_ms_by_step"].items())
+        print(f"{workers:>8}{s['requests']:>10}{s['throughput_rps']:>10}{speedup:>8.2f}x{s['error_rate'] * 100:>7.2f}%  {p95}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"cores": os.cpu_count(), "users": args.users, "duration_seconds": args.duration,
+                       "scenarios": args.scenarios, "results": results}, f, indent=2)
+        print(f"Results written to {args.json_path}")
+
+if __name__ == "__main__":
+    main_cli()
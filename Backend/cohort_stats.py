@@ -0,0 +1,49 @@
+# Backend/cohort_stats.py
+#
+# Refreshes the trust score cohort tables (see cohort_utils.py):
+#
+#   python cohort_stats.py            # recompute the cohorts that changed since the last run
+#   python cohort_stats.py --full     # recompute every cohort
+#   python cohort_stats.py --loop     # keep refreshing every COHORT_REFRESH_SECONDS
+#
+# Run one instance (from cron, or --loop as its own service). Until the first
+# run the dashboard and public profile simply show no cohort rank.
+
+import sys
+import json
+import signal
+import argparse
+import threading
+
+sys.path.append('.')
+from config import settings
+from cohort_utils import refresh_cohorts
+from tracing_utils import get_logger, setup_logging
+
+logger = get_logger("cohorts")
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Recompute trust score percentiles per profession and district")
+    parser.add_argument("--full", action="store_true", help="Recompute every cohort, not just the changed ones")
+    parser.add_argument("--loop", action="store_true", help="Keep running, every COHORT_REFRESH_SECONDS")
+    args = parser.parse_args()
+
+    if not args.loop:
+        print(json.dumps(refresh_cohorts(full=args.full)))
+        return
+
+    setup_logging()
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    full = args.full
+    while not stop.is_set():
+        try:
+            refresh_cohorts(full=full)
+            full = False
+        except Exception:
+            logger.exception("Cohort refresh failed; retrying on the next run")
+        stop.wait(settings.COHORT_REFRESH_SECONDS)
+
+if __name__ == "__main__":
+    main_cli()
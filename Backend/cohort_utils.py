@@ -0,0 +1,258 @@
+import json
+import math
+import time
+from bisect import bisect_left
+from collections import namedtuple, defaultdict
+from datetime import datetime
+from sqlalchemy import select, func, delete, insert
+from config import settings
+from database import SessionLocal
+from tracing_utils import get_logger, span
+import models
+
+logger = get_logger("cohorts")
+
+# ----------------------------------------------------------------------
+# Peer comparison of trust scores (cohort_stats.py, dashboard, public profile).
+#
+# A worker's score is the average skill_trust_score of their scored
+# credentials (as on the dashboard); their cohort is everyone with the same
+# (profession, state, district). The refresh job loads every score in one
+# GROUP BY query as parallel columns, sorts each cohort once and stores:
+#
+#   cohort_stats   percentiles, a histogram and a score table
+#                  ([score, workers below, workers at score]) per cohort
+#   worker_scores  each worker's score, previous score, percentile and rank
+#
+# Requests only look these rows up (one outer join on the wallet query they
+# already run); a score that changed since the last refresh is placed into
+# the stored score table with a binary search.
+#
+# Refreshes are incremental: the loaded columns are compared with
+# worker_scores, and only cohorts that gained, lost or re-scored a member
+# are recomputed and rewritten. Comparing against the stored rows (rather
+# than a timestamp) also catches scores set by the evaluation pipeline long
+# after issued_date, and profile edits that move a worker to another cohort.
+# ----------------------------------------------------------------------
+
+SCORE_MIN, SCORE_MAX = 300, 900
+PERCENTILES = (10, 25, 50, 75, 90)
+ID_CHUNK = 500 # ids per IN (...) list
+
+CohortKey = namedtuple("CohortKey", ["profession", "state", "district"])
+CohortTable = namedtuple("CohortTable", ["workers", "mean_score", "percentiles", "histogram", "score_table"])
+
+User = models.User
+Wallet = models.SkillWallet
+Credential = models.SkillCredential
+CohortStats = models.CohortStats
+WorkerScore = models.WorkerScore
+
+def cohort_key(profession, state, district):
+    return CohortKey(*((value or "").strip() for value in (profession, state, district)))
+
+def chunked(values, size=ID_CHUNK):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+# ----------------------------------------------------------------------
+# 1. STATISTICS
+# ----------------------------------------------------------------------
+def cohort_table(scores):
+    """Statistics of one cohort from its members' scores, in any order."""
+    ordered = sorted(scores)
+    workers = len(ordered)
+    score_table = []
+    for position, score in enumerate(ordered):
+        if score_table and score_table[-1][0] == score:
+            score_table[-1][2] += 1
+        else:
+            score_table.append([score, position, 1])
+
+    bucket = settings.COHORT_HISTOGRAM_BUCKET
+    histogram = [0] * math.ceil((SCORE_MAX - SCORE_MIN) / bucket)
+    for score, _, at in score_table:
+        # Out-of-range scores go to the first / last bucket; 900 belongs to the last one
+        histogram[min(max(score - SCORE_MIN, 0) // bucket, len(histogram) - 1)] += at
+
+    # Nearest-rank percentiles
+    percentiles = {f"p{p}": ordered[max(0, math.ceil(p * workers / 100) - 1)] for p in PERCENTILES}
+    return CohortTable(workers, sum(ordered) // workers, percentiles, histogram, score_table)
+
+def standing(score_table, workers, score, own=None):
+    """
+    (percentile, rank) of score in a cohort's score table.
+    own is the worker's score already counted in the table (None if they are not in it yet),
+    so a changed score is ranked against everyone else.
+    """
+    i = bisect_left(score_table, score, key=lambda entry: entry[0])
+    if i < len(score_table) and score_table[i][0] == score:
+        below, at = score_table[i][1], score_table[i][2]
+    else:
+        below, at = (score_table[i][1] if i < len(score_table) else workers), 0
+    if own is None:
+        workers, at = workers + 1, at + 1
+    elif own != score:
+        # Move the worker from their old score to this one
+        at += 1
+        if own < score:
+            below -= 1
+    above = workers - below - at
+    # Ties count half, so a cohort of identical scores sits at the 50th percentile
+    return round(100 * (below + at / 2) / workers), above + 1
+
+# ----------------------------------------------------------------------
+# 2. REFRESH JOB
+# ----------------------------------------------------------------------
+def load_scores(db):
+    """Every scored worker as parallel columns: (user_ids, cohort keys, scores)."""
+    score = Credential.skill_trust_score
+    rows = db.execute(
+        select(User.id, User.profession, User.state, User.district, func.sum(score), func.count(score))
+        .join(Wallet, Wallet.user_id == User.id)
+        .join(Credential, Credential.skill_wallet_id == Wallet.id)
+        .where(score.isnot(None), score != 0)
+        .group_by(User.id, User.profession, User.state, User.district)
+    )
+    user_ids, keys, scores = [], [], []
+    for user_id, profession, state, district, total, count in rows:
+        user_ids.append(user_id)
+        keys.append(cohort_key(profession, state, district))
+        scores.append(total // count) # int(mean), like get_dashboard_stats
+    return user_ids, keys, scores
+
+def refresh_cohorts(session_factory=SessionLocal, full=False, now=None):
+    """
+    Recomputes the cohorts whose members or scores changed since the last refresh
+    (every cohort with full=True), in one transaction. Returns a summary dict.
+    """
+    now = now or datetime.utcnow()
+    started = time.perf_counter()
+    db = session_factory()
+    try:
+        with span("cohorts.refresh"):
+            user_ids, keys, scores = load_scores(db)
+            stored = {row.user_id: row for row in db.execute(select(
+                WorkerScore.user_id, WorkerScore.cohort_id, WorkerScore.score,
+                WorkerScore.previous_score, WorkerScore.score_changed_at))}
+            cohorts = {row.id: cohort_key(row.profession, row.state, row.district) for row in db.execute(
+                select(CohortStats.id, CohortStats.profession, CohortStats.state, CohortStats.district))}
+            cohort_ids = {key: cohort_id for cohort_id, key in cohorts.items()}
+
+            # --- find the changed cohorts ---
+            members = defaultdict(list) # key -> positions in the columns
+            dirty = set(cohort_ids) if full else set()
+            for position, (user_id, key, score) in enumerate(zip(user_ids, keys, scores)):
+                members[key].append(position)
+                old = stored.get(user_id)
+                if old is None or old.score != score or cohorts.get(old.cohort_id) != key:
+                    dirty.add(key)
+                    if old is not None and old.cohort_id in cohorts:
+                        dirty.add(cohorts[old.cohort_id])
+            if full:
+                dirty.update(members)
+            scored = set(user_ids)
+            for user_id, old in stored.items():
+                if user_id not in scored and old.cohort_id in cohorts:
+                    dirty.add(cohorts[old.cohort_id])
+
+            # --- rewrite them ---
+            # Every stored row of a changed cohort is replaced, including those of workers who left it
+            for ids in chunked(cohort_ids[key] for key in dirty if key in cohort_ids):
+                db.execute(delete(WorkerScore).where(WorkerScore.cohort_id.in_(ids)))
+            existing = {}
+            for ids in chunked(cohort_ids[key] for key in dirty if key in cohort_ids):
+                for cohort in db.query(CohortStats).filter(CohortStats.id.in_(ids)):
+                    existing[cohorts[cohort.id]] = cohort
+
+            worker_rows, removed = [], 0
+            for key in dirty:
+                positions = members.get(key)
+                cohort = existing.get(key)
+                if not positions:
+                    db.delete(cohort)
+                    removed += 1
+                    continue
+                table = cohort_table(scores[p] for p in positions)
+                if cohort is None:
+                    cohort = CohortStats(profession=key.profession, state=key.state, district=key.district)
+                    db.add(cohort)
+                cohort.workers = table.workers
+                cohort.mean_score = table.mean_score
+                cohort.percentiles = json.dumps(table.percentiles)
+                cohort.histogram = json.dumps(table.histogram)
+                cohort.score_table = json.dumps(table.score_table)
+                cohort.updated_at = now
+                db.flush() # new cohorts need their id
+
+                for p in positions:
+                    user_id, score = user_ids[p], scores[p]
+                    percentile, rank = standing(table.score_table, table.workers, score, own=score)
+                    old = stored.get(user_id)
+                    if old is None:
+                        previous, changed_at = None, now
+                    elif old.score != score:
+                        previous, changed_at = old.score, now
+                    else:
+                        previous, changed_at = old.previous_score, old.score_changed_at
+                    worker_rows.append({
+                        "user_id": user_id, "cohort_id": cohort.id, "score": score, "previous_score": previous,
+                        "percentile": percentile, "rank": rank, "score_changed_at": changed_at, "updated_at": now,
+                    })
+            if worker_rows:
+                db.execute(insert(WorkerScore), worker_rows)
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    summary = {
+        "workers": len(user_ids), "cohorts": len(members), "recomputed": len(dirty) - removed,
+        "removed": removed, "rows_written": len(worker_rows), "seconds": round(time.perf_counter() - started, 3),
+    }
+    logger.info("Cohort statistics refreshed", extra=summary)
+    return summary
+
+# ----------------------------------------------------------------------
+# 3. LOOKUPS (dashboard / public profile)
+# ----------------------------------------------------------------------
+def previous_score_for(worker, score):
+    """The score before the latest change the refresh job recorded; score itself if there is none."""
+    if worker is None:
+        return score
+    if worker.score != score:
+        # Changed since the last refresh
+        return worker.score
+    return worker.previous_score if worker.previous_score is not None else score
+
+def cohort_standing(cohort, worker, score=None, details=False):
+    """
+    The worker's place in their cohort from the stored rows, or None if they have not been
+    ranked yet or the cohort is smaller than COHORT_MIN_WORKERS (too few to compare, and
+    its histogram would give individual scores away).
+    score: the live score, if it may have changed since the last refresh.
+    """
+    if cohort is None or worker is None or cohort.workers < settings.COHORT_MIN_WORKERS:
+        return None
+    if score is None or score == worker.score:
+        percentile, rank = worker.percentile, worker.rank
+    else:
+        percentile, rank = standing(json.loads(cohort.score_table), cohort.workers, score, own=worker.score)
+    result = {
+        "profession": cohort.profession or None,
+        "location": ", ".join(part for part in (cohort.district, cohort.state) if part) or "India",
+        "workers": cohort.workers,
+        "percentile": percentile,
+        "rank": rank,
+    }
+    if details:
+        result.update({
+            "mean_score": cohort.mean_score,
+            "percentiles": json.loads(cohort.percentiles),
+            "histogram": {"start": SCORE_MIN, "bucket": settings.COHORT_HISTOGRAM_BUCKET, "counts": json.loads(cohort.histogram)},
+            "updated_at": cohort.updated_at,
+        })
+    return result
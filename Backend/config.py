@@ -16,18 +16,173 @@ class Settings(BaseSettings):
 
     # 1. Database Settings (Added default for safety)
     DATABASE_URL: str = "sqlite:///./sql_app.db"
+    # SQLite only: how long a writer waits for the write lock before "database is locked"
+    SQLITE_BUSY_TIMEOUT_SECONDS: float = 30
 
     # 2. Security Settings (Added default for safety)
     SECRET_KEY: str = "supersecretkey"
     ALGORITHM: str = "HS256"
+    # Signed access / refresh tokens (see auth_utils.py)
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    # Comma-separated retired keys, still accepted while their tokens expire
+    AUTH_PREVIOUS_SECRET_KEYS: str = Field(default="")
+    AUTH_CLAIMS_CACHE_SIZE: int = 10000
+    # false: tokens are issued and checked when sent, but not required (frontend rollout)
+    # true: every non-public route needs a valid token whose user matches {user_id} in the path
+    AUTH_REQUIRED: bool = False
 
     # 3. OTP/Twilio Settings
     TWILIO_ACCOUNT_SID: str = Field(default="")
     TWILIO_AUTH_TOKEN: str = Field(default="")
     TWILIO_SERVICE_SID: str = Field(default="")
 
+    # OTP challenges and login rate limits (see otp_utils.py).
+    # "memory" is per worker process, so gunicorn refuses to start more than one worker with it (see gunicorn_conf.py)
+    OTP_STORE_BACKEND: str = "memory"
+    OTP_REDIS_URL: str = "redis://127.0.0.1:6379/0"
+    OTP_TTL_SECONDS: int = 300
+    OTP_MAX_ATTEMPTS: int = 5
+    # Also return the code in the /auth/otp/send response. Local development and load tests only:
+    # anyone could then log in as any phone number.
+    OTP_DEBUG_RESPONSE: bool = False
+    # Token buckets: BURST requests at once, then one more every REFILL_SECONDS
+    OTP_PHONE_BURST: int = 3
+    OTP_PHONE_REFILL_SECONDS: float = 60.0
+    # Verification attempts per phone, whatever IP they come from
+    OTP_VERIFY_PHONE_BURST: int = 10
+    OTP_VERIFY_PHONE_REFILL_SECONDS: float = 30.0
+    OTP_IP_BURST: int = 20
+    OTP_IP_REFILL_SECONDS: float = 6.0
+
+    TWILIO_FROM_NUMBER: str = Field(default="") # SMS sender; TWILIO_SERVICE_SID (messaging service) is used if empty
+
+    # Outgoing SMS: "log" (local stub) or "twilio" (see notification_utils.py)
+    NOTIFICATION_BACKEND: str = "log"
+
+    # Live session reminders (see reminder_dispatcher.py)
+    REMINDER_TIMEZONE: str = "Asia/Kolkata" # Used when the client sends no timezone
+    # Run the dispatcher inside each API worker instead of as `python reminder_dispatcher.py`
+    REMINDER_DISPATCHER_IN_APP: bool = False
+    REMINDER_LOOKAHEAD_SECONDS: int = 3600
+    REMINDER_REFILL_SECONDS: float = 60.0
+    REMINDER_BATCH_SIZE: int = 100
+    REMINDER_MAX_ATTEMPTS: int = 3
+    REMINDER_RETRY_SECONDS: float = 60.0
+    # Reminders this far past due (dispatcher was down) are marked EXPIRED instead of sent
+    REMINDER_MAX_LATENESS_SECONDS: int = 3600
+    REMINDER_CLAIM_TIMEOUT_SECONDS: int = 300
+
+    # Batched lesson progress heartbeats (see progress_buffer.py)
+    PROGRESS_FLUSH_SECONDS: float = 5.0
+    PROGRESS_FLUSH_BATCH_SIZE: int = 500 # enrollments per UPDATE transaction
+    # A buffer holding this many enrollments is flushed right away instead of on the timer
+    PROGRESS_BUFFER_MAX_PENDING: int = 20000
+    PROGRESS_BATCH_MAX_EVENTS: int = 500 # per request
+
+    # Server push over WebSocket / SSE (see events_utils.py)
+    # "memory" reaches clients of the publishing worker only, so gunicorn refuses to start several workers on it
+    EVENTS_BACKEND: str = "memory"
+    EVENTS_REDIS_URL: str = "redis://127.0.0.1:6379/0"
+    EVENTS_MAX_CONNECTIONS: int = 1000 # per worker process
+    EVENTS_MAX_CONNECTIONS_PER_USER: int = 5
+    EVENTS_MAX_SESSIONS: int = 20 # live sessions one connection may follow
+    # A client this many events behind is disconnected instead of buffered
+    EVENTS_CLIENT_QUEUE_SIZE: int = 100
+    EVENTS_HEARTBEAT_SECONDS: float = 25.0
+    EVENTS_SEND_TIMEOUT_SECONDS: float = 10.0
+
+    # Lesson recommendations (see recommendation_utils.py). Each worker keeps its own index:
+    # lessons it creates are added at once, other workers pick them up on their next rebuild.
+    RECOMMENDATION_REBUILD_SECONDS: float = 300.0
+    RECOMMENDATION_TOP_K: int = 5
+    RECOMMENDATION_FEEDBACK_CREDENTIALS: int = 10 # most recent credentials whose feedback gaps are matched
+
+    # Faceted Skill Bank catalog snapshot (see facet_utils.py), rebuilt per worker
+    CATALOG_REBUILD_SECONDS: float = 300.0
+    CATALOG_PAGE_SIZE: int = 50
+    CATALOG_MAX_PAGE_SIZE: int = 200
+    CATALOG_MAX_OFFSET: int = 1000 # deeper pages use the ?after= cursor
+
+    # Bulk exports for reporting (see export_utils.py / export_data.py)
+    # GET /api/v1/export/... needs "X-Export-Token: <EXPORT_TOKEN>"; empty disables the endpoint
+    EXPORT_TOKEN: str = Field(default="")
+    EXPORT_BATCH_SIZE: int = 1000 # rows fetched, encoded and sent at a time
+    # Incremental exports stop this far behind now, so rows still being written are not skipped
+    EXPORT_WATERMARK_LAG_SECONDS: float = 120.0
+
+    # Peer comparison of trust scores by (profession, state, district); see cohort_utils.py.
+    # Tables are written by `python cohort_stats.py` (cron, or --loop every COHORT_REFRESH_SECONDS).
+    COHORT_REFRESH_SECONDS: float = 900.0
+    COHORT_HISTOGRAM_BUCKET: int = 50 # score points per histogram bar, from 300
+    COHORT_MIN_WORKERS: int = 5 # smaller cohorts get no rank or histogram
+
     # 4. --- NEW: Google Gemini Settings ---
     # This was missing and causing the AttributeError
     GEMINI_API_KEY: str = Field(default="")
 
-settings = Settings()
\ No newline at end of file
+    # Gemini call guard (see ai_client.py)
+    GEMINI_RATE_PER_SECOND: float = 5.0
+    GEMINI_BURST: int = 10
+    GEMINI_MAX_IN_FLIGHT: int = 8
+    GEMINI_TIMEOUT_SECONDS: float = 30.0
+    GEMINI_MAX_RETRIES: int = 2
+    GEMINI_BREAKER_FAILURE_THRESHOLD: int = 5
+    GEMINI_BREAKER_RESET_SECONDS: float = 30.0
+
+    # "sync" grades inside the submit request, "background" queues it (see job_queue.py)
+    EVALUATION_MODE: str = "sync"
+    EVALUATION_WORKERS: int = 4
+    # On shutdown, queued evaluations get this long to finish; the rest are spooled and replayed on next start
+    SHUTDOWN_DRAIN_SECONDS: float = 20.0
+    # A re-submitted credential still ungraded after this long (its evaluation failed) is graded again
+    EVALUATION_RETRY_AFTER_SECONDS: float = 120.0
+    JOB_SPOOL_PATH: str = "job_spool.jsonl"
+
+    # Multi-worker serving (see gunicorn_conf.py). 0 = one worker per available core.
+    # Rate limits, caches and metrics are per worker process.
+    WEB_CONCURRENCY: int = 0
+    # Several workers normally need the shared (redis) backends listed by per_worker_backends().
+    # true starts them with per-worker state anyway, e.g. for benchmarks that never log in.
+    ALLOW_PER_WORKER_STATE: bool = False
+
+    # Adds X-DB-Statements / X-DB-Time-Ms headers to every response (see sql_stats.py)
+    DEBUG_SQL_HEADERS: bool = False
+    # /metrics is served to loopback clients only unless this is enabled
+    METRICS_ALLOW_REMOTE: bool = False
+    # When set, /metrics needs "Authorization: Bearer <METRICS_TOKEN>" from every client, loopback included
+    # (behind a reverse proxy on the same host every request looks local)
+    METRICS_TOKEN: str = Field(default="")
+
+    # Schema migrations (see migration_utils.py / migrate_db.py)
+    MIGRATION_BATCH_SIZE: int = 5000
+    MIGRATION_BATCH_PAUSE_SECONDS: float = 0.0
+    MIGRATION_LOCK_TIMEOUT_SECONDS: float = 5.0
+
+    # Run create_all when a worker starts. start.sh turns this off because db_init.py already ran.
+    AUTO_CREATE_SCHEMA: bool = True
+
+    # Structured JSON logs and per-operation spans (see tracing_utils.py)
+    LOG_LEVEL: str = "INFO"
+    # One log line per span (every request, query batch, model call): for latency debugging, off by default
+    TRACE_SPANS_ENABLED: bool = False
+    # Per-request sampling profiler: send "X-Profile: <PROFILING_TOKEN>" (see profiling_utils.py)
+    PROFILING_ENABLED: bool = False
+    PROFILING_TOKEN: str = Field(default="")
+    PROFILING_INTERVAL_MS: float = 5.0
+
+    # 5. File Storage Settings ("local" or "s3")
+    STORAGE_BACKEND: str = "local"
+    STORAGE_PRESIGN_EXPIRY_SECONDS: int = 900
+    PUBLIC_BASE_URL: str = "" # e.g. https://api.skillwallet.in (used in local presigned URLs)
+    S3_BUCKET: str = Field(default="skillwallet-uploads")
+    S3_ENDPOINT_URL: str = Field(default="") # Set to MinIO URL for local testing
+    S3_ACCESS_KEY: str = Field(default="")
+    S3_SECRET_KEY: str = Field(default="")
+    S3_REGION: str = Field(default="")
+
+settings = Settings()
+
+def per_worker_backends():
+    """Backend settings left at "memory", whose state each worker process would keep to itself."""
+    return [name for name in ("OTP_STORE_BACKEND", "EVENTS_BACKEND") if getattr(settings, name) == "memory"]
\ No newline at end of file
@@ -1,9 +1,10 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker, Session, declarative_base
 from fastapi import HTTPException
 from dotenv import load_dotenv
+from tracing_utils import span
+from config import settings
 
 # Load environment variables from .env file
 load_dotenv()
@@ -18,18 +19,37 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 # so we add connect_args to allow concurrent requests.
 if DATABASE_URL.startswith("sqlite"):
     engine = create_engine(
-        DATABASE_URL, connect_args={"check_same_thread": False}
+        DATABASE_URL, connect_args={"check_same_thread": False, "timeout": settings.SQLITE_BUSY_TIMEOUT_SECONDS}
     )
+
+    # WAL lets reads run alongside the single writer, so registration bursts
+    # queue on the write lock instead of failing with "database is locked".
+    # synchronous=NORMAL is crash-safe in WAL mode and keeps each commit short.
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA journal_mode=WAL")
+        dbapi_connection.execute("PRAGMA synchronous=NORMAL")
 else:
     engine = create_engine(
         DATABASE_URL
     )
 
+# Under a preloading process manager (gunicorn_conf.py) the engine is created
+# before workers fork. Each child drops the inherited pool without closing the
+# parent's sockets, so it opens its own connections on first use.
+os.register_at_fork(after_in_child=lambda: engine.dispose(close=False))
+
 # ----------------------------------------------------------------------
 # 2. SESSION FACTORY
 # ----------------------------------------------------------------------
+# Commits are traced as "db.commit" spans so flush/commit time shows up per request
+class TracedSession(Session):
+    def commit(self):
+        with span("db.commit"):
+            super().commit()
+
 # Create a SessionLocal class to create new sessions for transactions
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=TracedSession)
 
 # ----------------------------------------------------------------------
 # 3. BASE CLASS FOR MODELS
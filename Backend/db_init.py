@@ -3,17 +3,25 @@
 import sys
 # Add the directory containing 'main.py' and other modules to the path
 sys.path.append('.') 
-from database import Base, engine, SessionLocal
-from main import app # Importing app triggers execution of modules, including models/Base
+from database import engine
+import models
 
-print("Attempting to create database tables...")
+def init_db():
+    """
+    Creates any missing tables. Deliberately does not import main, so it can run
+    before the app (start.sh) without loading the API and AI modules.
+    """
+    models.Base.metadata.create_all(bind=engine)
 
-try:
-    # 1. Ensure the engine creates all tables defined in Base/models
-    Base.metadata.create_all(bind=engine)
-    print("Database tables created successfully or already exist.")
-except Exception as e:
-    print(f"Error during database initialization: {e}")
-    sys.exit(1)
+if __name__ == "__main__":
+    print("Attempting to create database tables...")
 
-print("Database initialization script finished.")
\ No newline at end of file
+    try:
+        # 1. Ensure the engine creates all tables defined in Base/models
+        init_db()
+        print("Database tables created successfully or already exist.")
+    except Exception as e:
+        print(f"Error during database initialization: {e}")
+        sys.exit(1)
+
+    print("Database initialization script finished.")
@@ -0,0 +1,101 @@
+from collections import namedtuple
+from sqlalchemy import update, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql, sqlite
+import models
+
+# ----------------------------------------------------------------------
+# Atomic lesson / live session registration.
+#
+# Registration is one INSERT ... ON CONFLICT DO NOTHING against the unique
+# (user, lesson|session) constraints, so double clicks and concurrent requests
+# never create duplicates and never raise. A live session seat is then taken
+# with one conditional UPDATE on the session's counter:
+#
+#   UPDATE live_sessions SET seats_taken = seats_taken + 1
+#   WHERE id = :id AND (capacity IS NULL OR seats_taken < capacity)
+#
+# Lock order is always enrollment row first, session row second, and each
+# transaction touches exactly one of each, so concurrent registrations queue
+# on the session row instead of deadlocking. The session row is held only
+# between that UPDATE and the commit right after it.
+# ----------------------------------------------------------------------
+
+Registration = namedtuple("Registration", ["status", "enrollment_id"])
+
+REGISTERED = "registered"
+ALREADY_REGISTERED = "already_registered"
+FULL = "full"
+NOT_FOUND = "not_found"
+
+INSERT_CONSTRUCTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+# ----------------------------------------------------------------------
+# 1. INSERT OR IGNORE
+# ----------------------------------------------------------------------
+def insert_or_ignore(db, model, values, conflict_columns):
+    """
+    Inserts one row unless it would violate the unique constraint on conflict_columns.
+    Returns the new row's id, or None if the row already existed.
+    """
+    insert = INSERT_CONSTRUCTS.get(db.get_bind().dialect.name)
+    if insert is not None:
+        statement = insert(model).values(**values).on_conflict_do_nothing(
+            index_elements=conflict_columns).returning(model.id)
+        return db.execute(statement).scalar()
+
+    # Other databases: a savepoint keeps the outer transaction usable after the conflict
+    try:
+        with db.begin_nested():
+            row = model(**values)
+            db.add(row)
+        return row.id
+    except IntegrityError:
+        return None
+
+def existing_id(db, model, **keys):
+    return db.query(model.id).filter_by(**keys).scalar()
+
+# ----------------------------------------------------------------------
+# 2. REGISTRATION
+# ----------------------------------------------------------------------
+def register_for_lesson(db, user_id, lesson_id):
+    values = {"user_id": user_id, "lesson_id": lesson_id, "status": "ENROLLED", "progress_percent": 0}
+    enrollment_id = insert_or_ignore(db, models.LessonEnrollment, values, ["user_id", "lesson_id"])
+    if enrollment_id is None:
+        db.rollback()
+        return Registration(ALREADY_REGISTERED, existing_id(db, models.LessonEnrollment, user_id=user_id, lesson_id=lesson_id))
+    db.commit()
+    return Registration(REGISTERED, enrollment_id)
+
+def register_for_session(db, user_id, session_id):
+    """
+    Registers a user for a live session, taking a seat if the session has a capacity.
+    Returns a Registration whose status is REGISTERED, ALREADY_REGISTERED, FULL or NOT_FOUND.
+    """
+    LiveSession = models.LiveSession
+    values = {"user_id": user_id, "session_id": session_id, "status": "REGISTERED"}
+    try:
+        enrollment_id = insert_or_ignore(db, models.SessionEnrollment, values, ["user_id", "session_id"])
+    except IntegrityError:
+        # Foreign key violation: the user or session does not exist
+        db.rollback()
+        return Registration(NOT_FOUND, None)
+
+    if enrollment_id is None:
+        db.rollback()
+        return Registration(ALREADY_REGISTERED, existing_id(db, models.SessionEnrollment, user_id=user_id, session_id=session_id))
+
+    seated = db.execute(
+        update(LiveSession)
+        .where(LiveSession.id == session_id, or_(LiveSession.capacity.is_(None), LiveSession.seats_taken < LiveSession.capacity))
+        .values(seats_taken=LiveSession.seats_taken + 1)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not seated:
+        db.rollback()
+        exists = db.query(LiveSession.id).filter(LiveSession.id == session_id).scalar() is not None
+        return Registration(FULL if exists else NOT_FOUND, None)
+
+    db.commit()
+    return Registration(REGISTERED, enrollment_id)
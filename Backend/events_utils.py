@@ -0,0 +1,221 @@
+import time
+import json
+import asyncio
+import threading
+from collections import Counter as CountMap
+from config import settings
+from metrics_utils import EVENTS_PUBLISHED, EVENTS_DROPPED, STREAM_CONNECTIONS
+from tracing_utils import get_logger
+
+logger = get_logger("events")
+
+# ----------------------------------------------------------------------
+# Server push for the WebSocket / SSE endpoints (/api/v1/events/...).
+#
+# Code that changes state calls publish(channel, type, data) from any thread;
+# it never blocks and never raises. Channels:
+#   "wallet:<wallet_id>"   -> credential status transitions
+#   "session:<session_id>" -> live session started / ended
+#
+# The EventHub in each worker fans events out to its connected clients.
+# Every client has a bounded queue: a client that falls EVENTS_CLIENT_QUEUE_SIZE
+# events behind is disconnected (it reconnects and re-fetches state) instead of
+# buffering without limit. Connections are capped per worker and per user.
+#
+# EVENTS_BACKEND:
+#   "memory" -> events only reach clients of the worker that published them
+#               (SERVE_MODE=single; gunicorn refuses several workers on it)
+#   "redis"  -> published through Redis pub/sub and delivered by every worker
+# ----------------------------------------------------------------------
+
+class TooManyConnections(Exception):
+    pass
+
+class Subscription:
+    """One connected client. Events are offered on the client's event loop only."""
+
+    def __init__(self, user_id, channels, transport, loop):
+        self.user_id = user_id
+        self.channels = channels
+        self.transport = transport
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=settings.EVENTS_CLIENT_QUEUE_SIZE)
+        self.closed_reason = None
+        self.unsubscribed = False
+
+    def _offer(self, event):
+        if self.closed_reason is not None:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow consumer: stop feeding it and let the endpoint close the connection
+            self.closed_reason = "slow consumer"
+            EVENTS_DROPPED.inc(reason="slow_consumer")
+
+    async def next_event(self, timeout):
+        """The next event, or None after `timeout` seconds without one (time for a heartbeat)."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+# ----------------------------------------------------------------------
+# 1. LOCAL FAN-OUT
+# ----------------------------------------------------------------------
+class EventHub:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.channels = {} # channel -> set of Subscription
+        self.per_user = CountMap()
+        self.connections = 0
+
+    def subscribe(self, user_id, channels, transport):
+        """Registers a client (call from its event loop). Raises TooManyConnections over the limits."""
+        with self.lock:
+            if self.connections >= settings.EVENTS_MAX_CONNECTIONS:
+                raise TooManyConnections("Server is at its connection limit")
+            if self.per_user[user_id] >= settings.EVENTS_MAX_CONNECTIONS_PER_USER:
+                raise TooManyConnections("Too many open connections for this user")
+            subscription = Subscription(user_id, channels, transport, asyncio.get_running_loop())
+            for channel in channels:
+                self.channels.setdefault(channel, set()).add(subscription)
+            self.per_user[user_id] += 1
+            self.connections += 1
+        STREAM_CONNECTIONS.inc(transport=transport)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            if subscription.unsubscribed:
+                return
+            subscription.unsubscribed = True
+            for channel in subscription.channels:
+                subscribers = self.channels.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self.channels[channel]
+            self.per_user[subscription.user_id] -= 1
+            if self.per_user[subscription.user_id] <= 0:
+                del self.per_user[subscription.user_id]
+            self.connections -= 1
+        STREAM_CONNECTIONS.dec(transport=subscription.transport)
+
+    def deliver(self, channel, event):
+        """Hands an event to every local subscriber of `channel`. Safe from any thread."""
+        with self.lock:
+            subscribers = list(self.channels.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._offer, event)
+            except RuntimeError:
+                pass # Its loop has closed (shutdown); the subscription is going away
+
+    def stats(self):
+        with self.lock:
+            return {"connections": self.connections, "users": len(self.per_user), "channels": len(self.channels)}
+
+# ----------------------------------------------------------------------
+# 2. CROSS-WORKER BACKENDS
+# ----------------------------------------------------------------------
+class MemoryBroker:
+    name = "memory"
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def publish(self, channel, event):
+        self.hub.deliver(channel, event)
+
+class RedisBroker:
+    name = "redis"
+    PREFIX = "skillwallet:events:"
+
+    def __init__(self, hub, url):
+        self.hub = hub
+        self.url = url
+        self._client = None
+        self._client_lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.thread = None
+
+    @property
+    def client(self):
+        # Imported on first use, like boto3 in storage_utils
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    try:
+                        import redis
+                    except ImportError:
+                        raise RuntimeError("EVENTS_BACKEND=redis requires redis (pip install redis)")
+                    self._client = redis.Redis.from_url(self.url, decode_responses=True)
+        return self._client
+
+    def publish(self, channel, event):
+        # Every worker (this one included) receives it through its listener
+        self.client.publish(self.PREFIX + channel, json.dumps(event, default=str))
+
+    def _listen(self):
+        while not self.stopping.is_set():
+            pubsub = None
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(self.PREFIX + "*")
+                while not self.stopping.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self.hub.deliver(message["channel"][len(self.PREFIX):], json.loads(message["data"]))
+            except Exception:
+                logger.exception("Event listener lost its Redis connection; reconnecting")
+                self.stopping.wait(1.0)
+            finally:
+                if pubsub is not None:
+                    pubsub.close()
+
+    def start(self):
+        if self.thread is None:
+            self.stopping.clear()
+            self.thread = threading.Thread(target=self._listen, name="events-listener", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(5)
+            self.thread = None
+
+# ----------------------------------------------------------------------
+# 3. PUBLIC API
+# ----------------------------------------------------------------------
+event_hub = EventHub()
+_broker = None
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        if settings.EVENTS_BACKEND == "redis":
+            _broker = RedisBroker(event_hub, settings.EVENTS_REDIS_URL)
+        else:
+            _broker = MemoryBroker(event_hub)
+    return _broker
+
+def publish(channel, event_type, data):
+    """Publishes one event. Never raises: a lost push only means the client sees it on its next fetch."""
+    event = {"type": event_type, "channel": channel, "data": data, "ts": time.time()}
+    try:
+        get_broker().publish(channel, event)
+        EVENTS_PUBLISHED.inc(type=event_type)
+    except Exception:
+        EVENTS_DROPPED.inc(reason="publish_failed")
+        logger.exception("Event publish failed", extra={"channel": channel, "type": event_type})
+
+def format_sse(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
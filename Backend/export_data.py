@@ -0,0 +1,90 @@
+# Backend/export_data.py
+#
+# Bulk reporting exports (see export_utils.py), straight from the database:
+#
+#   python export_data.py credentials --format csv --out exports/
+#   python export_data.py all --format parquet --out exports/ --state exports/state.json   # incremental
+#   python export_data.py lesson_enrollments --since 2026-01-01T00:00:00 --out -           # to stdout
+#
+# With --state, each dataset continues from the watermark its previous export
+# reached, and the state file only moves forward once the file is complete.
+# Files are written under a temporary name and renamed when done.
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+
+sys.path.append('.')
+from database import SessionLocal
+from export_utils import DATASETS, ENCODERS, export_window, stream_export
+
+def load_state(path):
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+def save_state(path, state):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def export_one(name, args, state):
+    dataset = DATASETS[name]
+    encoder = ENCODERS[args.format](dataset.columns)
+    since = args.since
+    if since is None and dataset.watermark is not None and name in state:
+        since = datetime.fromisoformat(state[name])
+    window = export_window(dataset, since if dataset.watermark is not None else None)
+    chunks = stream_export(SessionLocal, dataset, encoder, window, batch_size=args.batch_size)
+
+    if args.out == "-":
+        for chunk in chunks:
+            sys.stdout.buffer.write(chunk)
+        sys.stdout.buffer.flush()
+        return window
+
+    os.makedirs(args.out, exist_ok=True)
+    stamp = window.until.strftime("%Y%m%dT%H%M%S") if window.until else datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+    path = os.path.join(args.out, f"{name}_{stamp}.{encoder.extension}")
+    size = 0
+    with open(f"{path}.part", "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+            size += len(chunk)
+    os.replace(f"{path}.part", path)
+    since_text = window.since.isoformat() if window.since else "start"
+    until_text = window.until.isoformat() if window.until else "now"
+    print(f"  {name:<20} {size:>12,} bytes  ({since_text} .. {until_text})  -> {path}", file=sys.stderr)
+    return window
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Stream reporting exports to files")
+    parser.add_argument("dataset", choices=sorted(DATASETS) + ["all"])
+    parser.add_argument("--format", choices=sorted(ENCODERS), default="csv")
+    parser.add_argument("--out", default="exports", help="Output directory, or - for stdout")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="Only rows after this watermark (naive UTC)")
+    parser.add_argument("--state", help="JSON file with the watermark each dataset reached; read and updated")
+    parser.add_argument("--batch-size", type=int, help="Rows per fetch (default EXPORT_BATCH_SIZE)")
+    args = parser.parse_args()
+    if args.state and args.out == "-":
+        parser.error("--state needs --out DIR, so the watermark only moves after a complete file")
+
+    state = load_state(args.state)
+    names = sorted(DATASETS) if args.dataset == "all" else [args.dataset]
+    try:
+        for name in names:
+            window = export_one(name, args, state)
+            if args.state and window.until is not None:
+                state[name] = window.until.isoformat()
+                save_state(args.state, state)
+    except RuntimeError as e:
+        # e.g. --format parquet without pyarrow installed
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,265 @@
+import io
+import csv
+import json
+from collections import namedtuple
+from datetime import datetime, timedelta
+from sqlalchemy import select, func, case, or_
+from config import settings
+from metrics_utils import EXPORT_ROWS
+from tracing_utils import get_logger
+import models
+
+logger = get_logger("export")
+
+# ----------------------------------------------------------------------
+# Bulk exports for reporting (export_data.py / GET /api/v1/export/{dataset}).
+#
+# Rows are read through a server-side cursor (stream_results + yield_per), so
+# an export holds one batch of EXPORT_BATCH_SIZE rows in memory however large
+# the table is, and every batch is encoded and handed on before the next one
+# is fetched. Formats: CSV, NDJSON and Parquet (one row group per batch;
+# needs pyarrow).
+#
+# Incremental exports: datasets with a watermark column export the rows with
+# since < watermark <= until, where until is now minus
+# EXPORT_WATERMARK_LAG_SECONDS. The lag covers transactions still in flight.
+# Pass the returned until as the next export's since and no change is skipped.
+#
+# The watermark is updated_at, the server time a row was last written, not
+# when it was created (credentials are graded and enrollments change status
+# after the fact) and not a client time: lesson heartbeats carry their own,
+# possibly backdated, last_accessed and are written up to a flush interval
+# later (progress_buffer.py). A row that changed again is exported again
+# with its new values, so consumers upsert by id.
+# ----------------------------------------------------------------------
+
+Dataset = namedtuple("Dataset", ["name", "columns", "watermark", "query"])
+ExportWindow = namedtuple("ExportWindow", ["since", "until"])
+
+Credential = models.SkillCredential
+Wallet = models.SkillWallet
+Lesson = models.SkillLesson
+LessonEnrollment = models.LessonEnrollment
+LiveSession = models.LiveSession
+SessionEnrollment = models.SessionEnrollment
+
+# ----------------------------------------------------------------------
+# 1. DATASETS
+# ----------------------------------------------------------------------
+def credentials_query():
+    return select(
+        Credential.id, Credential.skill_wallet_id, Wallet.user_id, Credential.skill_name, Credential.token_id,
+        Credential.skill_trust_score, Credential.grade_score, Credential.verification_status, Credential.is_verified,
+        Credential.language_code, Credential.context_profession, Credential.context_location, Credential.issued_date,
+        Credential.updated_at
+    ).select_from(Credential).outerjoin(Wallet, Wallet.id == Credential.skill_wallet_id)
+
+def lesson_enrollments_query():
+    return select(
+        LessonEnrollment.id, LessonEnrollment.user_id, LessonEnrollment.lesson_id, Lesson.teacher_id,
+        LessonEnrollment.status, LessonEnrollment.progress_percent, LessonEnrollment.enrolled_at,
+        LessonEnrollment.last_accessed, LessonEnrollment.completed_at, LessonEnrollment.updated_at
+    ).select_from(LessonEnrollment).outerjoin(Lesson, Lesson.id == LessonEnrollment.lesson_id)
+
+def session_enrollments_query():
+    return select(
+        SessionEnrollment.id, SessionEnrollment.user_id, SessionEnrollment.session_id, LiveSession.teacher_id,
+        SessionEnrollment.status, SessionEnrollment.registered_at, SessionEnrollment.updated_at
+    ).select_from(SessionEnrollment).outerjoin(LiveSession, LiveSession.id == SessionEnrollment.session_id)
+
+def teacher_earnings_query():
+    # Same arithmetic as the teaching dashboard: price x enrollments, per lesson and per session
+    lessons = select(
+        Lesson.teacher_id.label("teacher_id"),
+        func.count(func.distinct(Lesson.id)).label("lessons"),
+        func.count(LessonEnrollment.id).label("enrollments"),
+        func.sum(case((LessonEnrollment.id.isnot(None), func.coalesce(Lesson.price, 0)), else_=0)).label("earnings")
+    ).outerjoin(LessonEnrollment, LessonEnrollment.lesson_id == Lesson.id).group_by(Lesson.teacher_id).subquery()
+    sessions = select(
+        LiveSession.teacher_id.label("teacher_id"),
+        func.count(func.distinct(LiveSession.id)).label("sessions"),
+        func.count(SessionEnrollment.id).label("enrollments"),
+        func.sum(case((SessionEnrollment.id.isnot(None), func.coalesce(LiveSession.price, 0)), else_=0)).label("earnings")
+    ).outerjoin(SessionEnrollment, SessionEnrollment.session_id == LiveSession.id).group_by(LiveSession.teacher_id).subquery()
+
+    lesson_earnings = func.coalesce(lessons.c.earnings, 0)
+    session_earnings = func.coalesce(sessions.c.earnings, 0)
+    User = models.User
+    return select(
+        User.id.label("teacher_id"), User.name, User.profession,
+        func.coalesce(lessons.c.lessons, 0).label("lessons"),
+        func.coalesce(lessons.c.enrollments, 0).label("lesson_enrollments"),
+        lesson_earnings.label("lesson_earnings"),
+        func.coalesce(sessions.c.sessions, 0).label("sessions"),
+        func.coalesce(sessions.c.enrollments, 0).label("session_enrollments"),
+        session_earnings.label("session_earnings"),
+        (lesson_earnings + session_earnings).label("total_earnings")
+    ).select_from(User).outerjoin(lessons, lessons.c.teacher_id == User.id).outerjoin(
+        sessions, sessions.c.teacher_id == User.id
+    ).where(or_(lessons.c.teacher_id.isnot(None), sessions.c.teacher_id.isnot(None)))
+
+# Column types drive the Parquet schema: int, str, bool, datetime
+DATASETS = {dataset.name: dataset for dataset in [
+    Dataset("credentials", [
+        ("id", "int"), ("skill_wallet_id", "int"), ("user_id", "int"), ("skill_name", "str"), ("token_id", "str"),
+        ("skill_trust_score", "int"), ("grade_score", "int"), ("verification_status", "str"), ("is_verified", "bool"),
+        ("language_code", "str"), ("context_profession", "str"), ("context_location", "str"), ("issued_date", "datetime"),
+        ("updated_at", "datetime"),
+    ], Credential.updated_at, credentials_query),
+    Dataset("lesson_enrollments", [
+        ("id", "int"), ("user_id", "int"), ("lesson_id", "int"), ("teacher_id", "int"), ("status", "str"),
+        ("progress_percent", "int"), ("enrolled_at", "datetime"), ("last_accessed", "datetime"), ("completed_at", "datetime"),
+        ("updated_at", "datetime"),
+    ], LessonEnrollment.updated_at, lesson_enrollments_query),
+    Dataset("session_enrollments", [
+        ("id", "int"), ("user_id", "int"), ("session_id", "int"), ("teacher_id", "int"), ("status", "str"),
+        ("registered_at", "datetime"), ("updated_at", "datetime"),
+    ], SessionEnrollment.updated_at, session_enrollments_query),
+    # Running totals; always exported in full
+    Dataset("teacher_earnings", [
+        ("teacher_id", "int"), ("name", "str"), ("profession", "str"), ("lessons", "int"), ("lesson_enrollments", "int"),
+        ("lesson_earnings", "int"), ("sessions", "int"), ("session_enrollments", "int"), ("session_earnings", "int"),
+        ("total_earnings", "int"),
+    ], None, teacher_earnings_query),
+]}
+
+def export_window(dataset, since=None, now=None):
+    """The (since, until] watermark range of an export. until is None for datasets without a watermark."""
+    if dataset.watermark is None:
+        return ExportWindow(None, None)
+    now = now or datetime.utcnow()
+    return ExportWindow(since, now - timedelta(seconds=settings.EXPORT_WATERMARK_LAG_SECONDS))
+
+def build_statement(dataset, window):
+    statement = dataset.query()
+    if dataset.watermark is None:
+        return statement.order_by(statement.selected_columns[0])
+    id_column = statement.selected_columns[0]
+    if window.since is None:
+        # Full export: rows without a timestamp (legacy data) are included, in id order
+        return statement.where(or_(dataset.watermark <= window.until, dataset.watermark.is_(None))).order_by(id_column)
+    # Incremental: walks the (watermark, id) index
+    return statement.where(dataset.watermark > window.since, dataset.watermark <= window.until).order_by(
+        dataset.watermark, id_column)
+
+# ----------------------------------------------------------------------
+# 2. ENCODERS
+# ----------------------------------------------------------------------
+def encode_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+class CsvEncoder:
+    media_type = "text/csv"
+    extension = "csv"
+
+    def __init__(self, columns):
+        self.columns = [name for name, _ in columns]
+
+    def begin(self):
+        return self._write([self.columns])
+
+    def batch(self, rows):
+        return self._write([[encode_value(value) for value in row] for row in rows])
+
+    def end(self):
+        return b""
+
+    def _write(self, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode("utf-8")
+
+class NdjsonEncoder:
+    media_type = "application/x-ndjson"
+    extension = "ndjson"
+
+    def __init__(self, columns):
+        self.columns = [name for name, _ in columns]
+
+    def begin(self):
+        return b""
+
+    def batch(self, rows):
+        return "".join(
+            json.dumps(dict(zip(self.columns, map(encode_value, row))), ensure_ascii=False) + "\n" for row in rows
+        ).encode("utf-8")
+
+    def end(self):
+        return b""
+
+class _Chunks(io.RawIOBase):
+    """Write-only sink that hands back what was written since the last drain()."""
+
+    def __init__(self):
+        self.parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data, self.parts = b"".join(self.parts), []
+        return data
+
+class ParquetEncoder:
+    media_type = "application/vnd.apache.parquet"
+    extension = "parquet"
+
+    def __init__(self, columns):
+        # Imported on first use, like boto3 in storage_utils
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet exports require pyarrow (pip install pyarrow)")
+        self.pa = pyarrow
+        types = {"int": pyarrow.int64(), "str": pyarrow.string(), "bool": pyarrow.bool_(), "datetime": pyarrow.timestamp("us")}
+        self.schema = pyarrow.schema([(name, types[kind]) for name, kind in columns])
+        self.sink = _Chunks()
+        self.writer = pyarrow.parquet.ParquetWriter(self.sink, self.schema, compression="snappy")
+
+    def begin(self):
+        return self.sink.drain()
+
+    def batch(self, rows):
+        arrays = [self.pa.array(values, type=field.type) for values, field in zip(zip(*rows), self.schema)]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+        return self.sink.drain()
+
+    def end(self):
+        self.writer.close()
+        return self.sink.drain()
+
+ENCODERS = {"csv": CsvEncoder, "ndjson": NdjsonEncoder, "parquet": ParquetEncoder}
+
+# ----------------------------------------------------------------------
+# 3. STREAMING
+# ----------------------------------------------------------------------
+def stream_export(session_factory, dataset, encoder, window, batch_size=None):
+    """
+    Yields the encoded export chunk by chunk, one database batch at a time.
+    Opens (and always closes) its own session, so it can outlive the request that started it.
+    """
+    batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+    statement = build_statement(dataset, window).execution_options(stream_results=True, yield_per=batch_size)
+    db = session_factory()
+    rows = 0
+    # No span here: a streaming response resumes the generator in a different context for every chunk
+    try:
+        chunk = encoder.begin()
+        if chunk:
+            yield chunk
+        for batch in db.execute(statement).partitions():
+            rows += len(batch)
+            EXPORT_ROWS.inc(len(batch), dataset=dataset.name)
+            yield encoder.batch(batch)
+        chunk = encoder.end()
+        if chunk:
+            yield chunk
+        logger.info("Export finished", extra={"dataset": dataset.name, "format": encoder.extension, "rows": rows,
+                                              "since": encode_value(window.since), "until": encode_value(window.until)})
+    finally:
+        db.close()
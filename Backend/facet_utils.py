@@ -0,0 +1,248 @@
+import time
+import bisect
+import threading
+from config import settings
+from database import SessionLocal
+from metrics_utils import CATALOG_BUILD_LATENCY
+from tracing_utils import get_logger, span
+import models
+
+logger = get_logger("catalog")
+
+# ----------------------------------------------------------------------
+# Faceted Skill Bank catalog (/api/v1/skillbank/catalog/{kind}).
+#
+# Each worker keeps a snapshot of the lesson and live session catalogs in
+# memory. Every item gets a slot number, and every facet value (type,
+# language, difficulty) a bitmap of the slots that have it. The bitmaps are
+# plain Python ints, so a filter is a few ANDs / ORs and a facet count is
+# int.bit_count(), whatever the catalog size.
+#
+# Facet counts follow the usual multi-select rule: the counts of one facet
+# apply the filters on every *other* facet, so "Hindi (132)" stays visible
+# after the user has picked English.
+#
+# Snapshots are never changed in place. create_lesson / create_session
+# publish a new version with one more slot (bitmaps are immutable ints, so
+# only the small value -> bitmap dicts are copied), and readers keep
+# whichever version they picked up. The whole snapshot is rebuilt from the
+# database every CATALOG_REBUILD_SECONDS, which also picks up items other
+# workers created.
+#
+# Deep pages are walked slot by slot, so offset is capped
+# (CATALOG_MAX_OFFSET); clients page further with ?after=<last item id>.
+# ----------------------------------------------------------------------
+
+FACETS = {
+    "lessons": ("type", "language", "difficulty"),
+    "sessions": ("language", "difficulty"),
+}
+
+def iter_slots(bitmap):
+    """Slot numbers set in bitmap, lowest first."""
+    while bitmap:
+        low = bitmap & -bitmap
+        yield low.bit_length() - 1
+        bitmap ^= low
+
+class Snapshot:
+    """One immutable version of a catalog. ids[slot] is the item id; times[slot] its start (sessions)."""
+
+    def __init__(self, kind, version, ids, bitmaps, times=None):
+        self.kind = kind
+        self.version = version
+        self.ids = ids
+        self.bitmaps = bitmaps # facet -> {value: bitmap}
+        self.times = times
+        self.size = len(ids)
+        self.all = (1 << self.size) - 1
+        self.upcoming_cache = None # (bitmap, valid until)
+
+    @classmethod
+    def build(cls, kind, rows, version):
+        ids, times = [], [] if kind == "sessions" else None
+        bitmaps = {facet: {} for facet in FACETS[kind]}
+        for row in rows:
+            slot = len(ids)
+            ids.append(row.id)
+            if times is not None:
+                times.append(row.scheduled_at)
+            for facet in FACETS[kind]:
+                value = getattr(row, facet)
+                if value is not None:
+                    bitmaps[facet][value] = bitmaps[facet].get(value, 0) | (1 << slot)
+        return cls(kind, version, ids, bitmaps, times)
+
+    def with_item(self, item):
+        """A new version with one more item (item has the facet attributes, plus scheduled_at for sessions)."""
+        slot = self.size
+        bitmaps = {facet: dict(values) for facet, values in self.bitmaps.items()}
+        for facet in FACETS[self.kind]:
+            value = getattr(item, facet)
+            if value is not None:
+                bitmaps[facet][value] = bitmaps[facet].get(value, 0) | (1 << slot)
+        # Slot lists are shared and only appended to: older versions never look past their own size
+        self.ids.append(item.id)
+        if self.times is not None:
+            self.times.append(item.scheduled_at)
+        return Snapshot(self.kind, self.version + 1, self.ids, bitmaps, self.times)
+
+    def upcoming(self, now):
+        """Bitmap of sessions scheduled after now. Recomputed only when the next session starts."""
+        cached = self.upcoming_cache
+        if cached is not None and (cached[1] is None or now < cached[1]):
+            return cached[0]
+        bitmap, valid_until = 0, None
+        for slot in range(self.size):
+            scheduled_at = self.times[slot]
+            if scheduled_at is not None and scheduled_at > now:
+                bitmap |= 1 << slot
+                if valid_until is None or scheduled_at < valid_until:
+                    valid_until = scheduled_at
+        self.upcoming_cache = (bitmap, valid_until)
+        return bitmap
+
+    def match(self, facet, values):
+        """Bitmap of items whose facet is any of values (None = no filter on this facet)."""
+        if not values:
+            return self.all
+        bitmap = 0
+        for value in values:
+            bitmap |= self.bitmaps[facet].get(value, 0)
+        return bitmap
+
+    def query(self, filters, base=None):
+        """
+        filters: facet -> list of accepted values. base restricts every count (e.g. upcoming sessions).
+        Returns (matching bitmap, {facet: {value: count}}).
+        """
+        base = self.all if base is None else base
+        masks = {facet: self.match(facet, filters.get(facet)) for facet in FACETS[self.kind]}
+        matching = base
+        for mask in masks.values():
+            matching &= mask
+        counts = {}
+        for facet in FACETS[self.kind]:
+            others = base
+            for other, mask in masks.items():
+                if other != facet:
+                    others &= mask
+            counts[facet] = {value: (bitmap & others).bit_count() for value, bitmap in sorted(self.bitmaps[facet].items())}
+        return matching, counts
+
+    def after(self, bitmap, item_id):
+        """The part of bitmap after item_id, for keyset paging. Slots are in id order (rebuilds load by id)."""
+        start = bisect.bisect_right(self.ids, item_id, 0, self.size)
+        return bitmap >> start << start
+
+    def page(self, bitmap, offset, limit):
+        """Item ids of one page of a result bitmap, in slot (creation) order."""
+        ids = []
+        for position, slot in enumerate(iter_slots(bitmap)):
+            if position >= offset + limit:
+                break
+            if position >= offset:
+                ids.append(self.ids[slot])
+        return ids
+
+# ----------------------------------------------------------------------
+# 1. PER-WORKER CATALOG
+# ----------------------------------------------------------------------
+class FacetCatalog:
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self.lock = threading.Lock()
+        self.snapshots = {kind: Snapshot.build(kind, [], 0) for kind in FACETS}
+        self.built_at = None
+        self.build_lock = threading.Lock()
+        self.added_during_build = None
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def snapshot(self, kind):
+        # Readers take the current version without locking; it never changes under them
+        return self.snapshots[kind]
+
+    # --- building ---
+    def load(self, db, kind):
+        if kind == "lessons":
+            Lesson = models.SkillLesson
+            return db.query(Lesson.id, Lesson.type, Lesson.language, Lesson.difficulty).order_by(Lesson.id).all()
+        Session = models.LiveSession
+        return db.query(Session.id, Session.language, Session.difficulty, Session.scheduled_at).order_by(Session.id).all()
+
+    def build(self):
+        """Reloads both catalogs from the database. Returns {kind: items}."""
+        with self.build_lock:
+            with self.lock:
+                self.added_during_build = []
+            db = self.session_factory()
+            started = time.perf_counter()
+            try:
+                with span("catalog.build"):
+                    rows = {kind: self.load(db, kind) for kind in FACETS}
+            except Exception:
+                with self.lock:
+                    self.added_during_build = None
+                raise
+            finally:
+                db.close()
+
+            with self.lock:
+                for kind in FACETS:
+                    snapshot = Snapshot.build(kind, rows[kind], self.snapshots[kind].version + 1)
+                    loaded = set(snapshot.ids)
+                    # Items created while the rows were loading may be missing from them
+                    for added_kind, item in self.added_during_build:
+                        if added_kind == kind and item.id not in loaded:
+                            snapshot = snapshot.with_item(item)
+                    self.snapshots[kind] = snapshot
+                self.added_during_build = None
+                self.built_at = time.time()
+            CATALOG_BUILD_LATENCY.observe(time.perf_counter() - started)
+            return {kind: len(rows[kind]) for kind in FACETS}
+
+    def ensure_built(self):
+        """Builds the catalog on first use (scripts and tests that skip the app lifespan)."""
+        if self.built_at is None:
+            try:
+                self.build()
+            except Exception:
+                logger.exception("Catalog build failed; serving an empty catalog")
+
+    def add(self, kind, item):
+        """Publishes a new version with one created lesson or session."""
+        with self.lock:
+            self.snapshots[kind] = self.snapshots[kind].with_item(item)
+            if self.added_during_build is not None:
+                self.added_during_build.append((kind, item))
+
+    # --- lifecycle ---
+    def _loop(self):
+        while not self.stopping.wait(settings.CATALOG_REBUILD_SECONDS):
+            try:
+                self.build()
+            except Exception:
+                logger.exception("Catalog rebuild failed; serving the previous snapshot")
+
+    def start(self):
+        try:
+            self.build()
+        except Exception:
+            logger.exception("Catalog build failed; retrying on first request")
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._loop, name="catalog-snapshot", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def stats(self):
+        age = None if self.built_at is None else round(time.time() - self.built_at, 1)
+        return {kind: {"items": s.size, "version": s.version} for kind, s in self.snapshots.items()} | {"age_seconds": age}
+
+facet_catalog = FacetCatalog()
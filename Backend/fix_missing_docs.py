@@ -1,8 +1,9 @@
 import os
 import sys
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from database import SessionLocal, engine
 import models
+from storage_utils import content_hash
 
 # Ensure tables exist
 models.Base.metadata.create_all(bind=engine)
@@ -10,7 +11,7 @@ models.Base.metadata.create_all(bind=engine)
 def fix_missing_docs():
     db: Session = SessionLocal()
     try:
-        users = db.query(models.User).all()
+        users = db.query(models.User).options(selectinload(models.User.documents)).all()
         print(f"Found {len(users)} users. Checking for missing docs...")
         
         updated_count = 0
@@ -22,42 +23,35 @@ def fix_missing_docs():
                 
             files = os.listdir(upload_dir)
             
-            # Map of file_prefix -> (db_column, file_type_key)
             # The file naming convention in main.py is: f"{upload_dir}/{file_type}_{safe_name}"
             # So we look for files starting with file_type + "_"
-            
-            mapping = {
-                "pan_card": "pan_card_file_path",
-                "training_letter": "training_letter_file_path",
-                "apprenticeship_proof": "apprenticeship_proof_file_path",
-                "local_authority_proof": "local_authority_proof_file_path",
-                "aadhaar": "aadhaar_file_path",
-                "profile_photo": "profile_photo_file_path",
-                "daily_task_photo": "daily_task_photo_file_path",
-                "work_video": "work_video_file_path",
-                "community_recording": "community_recording_file_path"
-            }
+            # Profile photos live on the User row; everything else in user_documents
+            existing_docs = {doc.doc_type for doc in user.documents}
+            file_types = ["profile_photo"] if not user.profile_photo_file_path else []
+            file_types += [t for t in sorted(models.DOC_TYPES) if t not in existing_docs]
             
             user_updated = False
             
-            for file_type, db_col in mapping.items():
-                # Check if DB column is empty
-                if not getattr(user, db_col):
-                    # Look for file starting with file_type
-                    # We need to be careful with prefixes. e.g. "pan_card" matches "pan_card_xyz.jpg"
-                    
-                    found_file = None
-                    # Sort files to get the latest one if possible (though os.listdir order is arbitrary)
-                    # Ideally we pick any matching file
-                    for f in files:
-                        if f.startswith(f"{file_type}_"):
-                            found_file = f"{upload_dir}/{f}"
-                            break
-                    
-                    if found_file:
-                        print(f"  [User {user.id}] Found missing {file_type} on disk: {found_file}")
-                        setattr(user, db_col, found_file)
-                        user_updated = True
+            for file_type in file_types:
+                # Look for file starting with file_type
+                # We need to be careful with prefixes. e.g. "pan_card" matches "pan_card_xyz.jpg"
+                
+                found_file = None
+                # Sort files to get the latest one if possible (though os.listdir order is arbitrary)
+                # Ideally we pick any matching file
+                for f in files:
+                    if f.startswith(f"{file_type}_"):
+                        found_file = f"{upload_dir}/{f}"
+                        break
+                
+                if found_file:
+                    print(f"  [User {user.id}] Found missing {file_type} on disk: {found_file}")
+                    if file_type == "profile_photo":
+                        user.profile_photo_file_path = found_file
+                    else:
+                        db.add(models.UserDocument(user_id=user.id, doc_type=file_type, path=found_file,
+                                                   hash=content_hash(found_file)))
+                    user_updated = True
             
             if user_updated:
                 updated_count += 1
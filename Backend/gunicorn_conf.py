@@ -0,0 +1,47 @@
+# Backend/gunicorn_conf.py
+#
+# Multi-worker serving mode:
+#
+#   gunicorn -c gunicorn_conf.py main:app
+#
+# The app is imported once in the master (preload_app) and forked into one
+# Uvicorn worker per core. Post-fork resets for the DB pool, logging thread
+# and job queue are registered with os.register_at_fork in database.py,
+# tracing_utils.py and job_queue.py, so they also apply to any other
+# preforking server.
+
+import os
+from config import settings, per_worker_backends
+
+def available_cores():
+    # Respects CPU affinity / container cpusets where the platform exposes them
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = settings.WEB_CONCURRENCY or available_cores()
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+
+# An OTP sent via one worker must be verifiable on any other, and an event
+# published in one worker must reach clients connected to any other: refuse to
+# start several workers on per-process state instead of failing at random
+if workers > 1 and per_worker_backends() and not settings.ALLOW_PER_WORKER_STATE:
+    raise SystemExit(
+        f"{', '.join(f'{name}=memory' for name in per_worker_backends())} keeps state per worker; "
+        f"use redis, or serve a single worker (WEB_CONCURRENCY=1 or SERVE_MODE=single)")
+
+# SIGTERM: workers stop accepting, finish in-flight requests, then the app
+# lifespan drains the evaluation queue (SHUTDOWN_DRAIN_SECONDS) and spools
+# whatever is left. graceful_timeout must cover both before SIGKILL.
+graceful_timeout = int(settings.SHUTDOWN_DRAIN_SECONDS) + 15
+timeout = 120
+keepalive = 5
+
+accesslog = None
+errorlog = "-"
+
+def when_ready(server):
+    server.log.info(f"Serving with {workers} workers (preloaded app)")
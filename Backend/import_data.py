@@ -0,0 +1,59 @@
+# Backend/import_data.py
+#
+# Bulk onboarding of partner organisations' workers and lessons from CSV (see import_utils.py).
+#
+#   python import_data.py workers partner_workers.csv
+#   python import_data.py lessons partner_lessons.csv --workers 8 --chunk-size 2000
+#   python import_data.py workers big.csv --checkpoint big.ckpt.json      # re-run the same command to resume
+#
+# Columns (header row required; blank cells mean "not given"):
+#   workers: phone_number, name, profession, local_area, [age, date_of_birth (YYYY-MM-DD), state, district]
+#   lessons: teacher_phone, title, description, type (video|document), price, [language, difficulty, duration_minutes]
+#
+# Rejected rows are written to <file>.errors.csv (or --errors) with their line
+# number and reason. Existing users only get blank profile fields filled in and
+# existing lessons (same teacher and title) are left alone, unless --overwrite.
+
+import sys
+import time
+import argparse
+
+sys.path.append('.')
+from database import engine
+from import_utils import KINDS, run_import
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Bulk import workers or lessons from a CSV file")
+    parser.add_argument("kind", choices=sorted(KINDS))
+    parser.add_argument("source", help="CSV file")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default <source>.checkpoint.json)")
+    parser.add_argument("--errors", help="Error report (default <source>.errors.csv)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Rows per validation task and transaction")
+    parser.add_argument("--workers", type=int, help="Validation processes (default: one per CPU, 0 = none)")
+    parser.add_argument("--overwrite", action="store_true", help="Imported values replace existing ones")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+
+    def report_progress(state):
+        rate = state["written"] / max(time.perf_counter() - started, 1e-6)
+        print(f"\r  line {state['line']:>10,}  written {state['written']:>10,}  errors {state['errors']:>8,}  ({rate:,.0f} rows/s)",
+              end="", file=sys.stderr, flush=True)
+
+    print(f"--- IMPORT {args.kind} from {args.source} ---", file=sys.stderr)
+    try:
+        state = run_import(engine, args.kind, args.source,
+                           checkpoint_path=args.checkpoint or f"{args.source}.checkpoint.json",
+                           report_path=args.errors, chunk_size=args.chunk_size, workers=args.workers,
+                           overwrite=args.overwrite, progress=report_progress)
+    except RuntimeError as e:
+        print(f"\n❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    print(file=sys.stderr)
+
+    elapsed = time.perf_counter() - started
+    print(f"Imported {state['written']:,} rows through line {state['line']:,} in {elapsed:.1f}s; {state['errors']:,} rejected"
+          + (f" (see {args.errors or args.source + '.errors.csv'})" if state["errors"] else ""))
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,361 @@
+import os
+import re
+import csv
+import json
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Optional
+from pydantic import ValidationError, field_validator
+from sqlalchemy import select, update, bindparam, func
+from enrollment_utils import INSERT_CONSTRUCTS
+from auth_utils import new_wallet_hash
+from schemas import CoreProfileUpdate, CreateLessonRequest
+from tracing_utils import get_logger
+import models
+
+logger = get_logger("import")
+
+# ----------------------------------------------------------------------
+# Bulk onboarding from partner spreadsheets (import_data.py).
+#
+#   CSV rows -> chunks -> validation (process pool) -> one transaction per chunk
+#
+# The CSV is read as a stream and cut into chunks. Chunks are validated in
+# worker processes with the API's own request schemas (schemas.py), at most
+# a few chunks ahead of the writer, so memory stays flat for any file size.
+# The writer upserts each chunk with batched statements:
+#
+#   workers -> INSERT ... ON CONFLICT (phone_number) DO UPDATE (filling only
+#              blank profile fields unless --overwrite), then one
+#              SkillWallet per new user with bulk-generated wallet hashes
+#   lessons -> matched to existing lessons on (teacher, title): new ones are
+#              inserted in one executemany, known ones updated in another
+#              (with --overwrite; otherwise left as they are)
+#
+# Rows that fail validation or cannot be written (unknown teacher phone,
+# repeated within one chunk) go to the error report with their line number
+# and are skipped; the rest of the file carries on. After every committed
+# chunk the checkpoint records the last line written, and a resumed import
+# starts after it. Replaying a chunk whose commit landed just before a crash
+# is harmless because every write is an upsert.
+# ----------------------------------------------------------------------
+
+RowError = namedtuple("RowError", ["line", "error", "row"])
+ChunkResult = namedtuple("ChunkResult", ["first_line", "last_line", "valid", "errors"])
+
+PHONE_DIGITS = re.compile(r"\D")
+
+def normalize_phone(value: str) -> str:
+    """Indian mobile numbers as the app stores them (+91XXXXXXXXXX), like the sign-up form."""
+    digits = PHONE_DIGITS.sub("", value or "")
+    if len(digits) == 12 and digits.startswith("91"):
+        digits = digits[2:]
+    if len(digits) != 10:
+        raise ValueError("expected a 10-digit Indian mobile number")
+    return f"+91{digits}"
+
+# ----------------------------------------------------------------------
+# 1. ROW SCHEMAS
+# ----------------------------------------------------------------------
+class WorkerRow(CoreProfileUpdate):
+    phone_number: str
+
+    @field_validator("phone_number")
+    @classmethod
+    def valid_phone(cls, value):
+        return normalize_phone(value)
+
+    @field_validator("date_of_birth")
+    @classmethod
+    def valid_date_of_birth(cls, value):
+        # update_core_profile ignores a bad date; an import reports it instead
+        if value is not None:
+            datetime.strptime(value, "%Y-%m-%d")
+        return value
+
+class LessonRow(CreateLessonRequest):
+    teacher_phone: str
+    duration_minutes: Optional[int] = None
+
+    @field_validator("teacher_phone")
+    @classmethod
+    def valid_phone(cls, value):
+        return normalize_phone(value)
+
+    @field_validator("type")
+    @classmethod
+    def valid_type(cls, value):
+        if value not in ("video", "document"):
+            raise ValueError("must be 'video' or 'document'")
+        return value
+
+KINDS = {"workers": WorkerRow, "lessons": LessonRow}
+
+def required_columns(kind):
+    return [name for name, field in KINDS[kind].model_fields.items() if field.is_required()]
+
+def describe(error: ValidationError):
+    return "; ".join(f"{'.'.join(map(str, e['loc'])) or 'row'}: {e['msg']}" for e in error.errors())
+
+def validate_chunk(kind, rows):
+    """
+    Runs in a worker process. rows: [(line, {column: text})].
+    Returns a ChunkResult with the valid rows as plain dicts (cheap to send back).
+    """
+    schema = KINDS[kind]
+    valid, errors = [], []
+    for line, row in rows:
+        # Spreadsheet blanks mean "not given", so optional fields fall back to their defaults
+        values = {k: v.strip() for k, v in row.items() if k and v is not None and v.strip() != ""}
+        try:
+            valid.append((line, schema.model_validate(values).model_dump()))
+        except ValidationError as e:
+            errors.append(RowError(line, describe(e), row))
+    return ChunkResult(rows[0][0], rows[-1][0], valid, errors)
+
+# ----------------------------------------------------------------------
+# 2. WRITERS (one transaction per chunk)
+# ----------------------------------------------------------------------
+User = models.User.__table__
+Wallet = models.SkillWallet.__table__
+Lesson = models.SkillLesson.__table__
+
+PROFILE_COLUMNS = ("name", "profession", "age", "date_of_birth", "state", "district", "local_area", "profile_photo_file_path")
+
+def dedupe(valid, key, errors, label=None):
+    """Keeps the first row per key; later rows with the same key become errors."""
+    seen, kept = set(), []
+    for line, values in valid:
+        value = values[key]
+        if value in seen:
+            errors.append(RowError(line, f"{label or key}: duplicate of an earlier row in this chunk", values))
+            continue
+        seen.add(value)
+        kept.append((line, values))
+    return kept
+
+def user_values(values):
+    row = {column: values.get(column) for column in PROFILE_COLUMNS}
+    if row["date_of_birth"]:
+        row["date_of_birth"] = datetime.strptime(row["date_of_birth"], "%Y-%m-%d").date()
+    row["phone_number"] = values["phone_number"]
+    return row
+
+def upsert_workers(conn, valid, errors, overwrite=False):
+    """Creates or updates users by phone number and gives every one of them a wallet. Returns rows written."""
+    valid = dedupe(valid, "phone_number", errors)
+    if not valid:
+        return 0
+    rows = [user_values(values) for _, values in valid]
+    insert = INSERT_CONSTRUCTS.get(conn.dialect.name)
+    if insert is not None:
+        statement = insert(User)
+        # Default: only fill in what the worker has not entered themselves
+        updates = {column: (statement.excluded[column] if overwrite else func.coalesce(User.c[column], statement.excluded[column]))
+                   for column in PROFILE_COLUMNS}
+        conn.execute(statement.on_conflict_do_update(index_elements=["phone_number"], set_=updates), rows)
+    else:
+        existing = set(conn.execute(select(User.c.phone_number).where(User.c.phone_number.in_([r["phone_number"] for r in rows]))).scalars())
+        new_rows = [r for r in rows if r["phone_number"] not in existing]
+        if new_rows:
+            conn.execute(User.insert(), new_rows)
+        old_rows = [{f"b_{column}": value for column, value in r.items()} for r in rows if r["phone_number"] in existing]
+        if old_rows:
+            conn.execute(update(User).where(User.c.phone_number == bindparam("b_phone_number")).values(
+                {column: bindparam(f"b_{column}") if overwrite else func.coalesce(User.c[column], bindparam(f"b_{column}"))
+                 for column in PROFILE_COLUMNS}), old_rows)
+
+    # Wallets for the users that do not have one yet, hashed in one pass
+    phones = [r["phone_number"] for r in rows]
+    missing = conn.execute(
+        select(User.c.id).select_from(User.outerjoin(Wallet, Wallet.c.user_id == User.c.id))
+        .where(User.c.phone_number.in_(phones), Wallet.c.id.is_(None))
+    ).scalars().all()
+    if missing:
+        now = datetime.utcnow()
+        insert = INSERT_CONSTRUCTS.get(conn.dialect.name)
+        # A worker signing up through OTP at this moment may have just created theirs
+        statement = insert(Wallet).on_conflict_do_nothing(index_elements=["user_id"]) if insert is not None else Wallet.insert()
+        conn.execute(statement, [{"user_id": user_id, "wallet_hash": new_wallet_hash(user_id, now.timestamp()),
+                                        "created_at": now} for user_id in missing])
+    return len(rows)
+
+def upsert_lessons(conn, valid, errors, overwrite=False):
+    """Creates lessons, or updates the teacher's lesson with the same title. Returns rows written."""
+    if not valid:
+        return 0
+    phones = {values["teacher_phone"] for _, values in valid}
+    teachers = dict(conn.execute(select(User.c.phone_number, User.c.id).where(User.c.phone_number.in_(phones))).all())
+
+    resolved = []
+    for line, values in valid:
+        teacher_id = teachers.get(values["teacher_phone"])
+        if teacher_id is None:
+            errors.append(RowError(line, "teacher_phone: no user with this phone number (import the teacher as a worker first)", values))
+            continue
+        resolved.append((line, dict(values, teacher_id=teacher_id)))
+    for _, values in resolved:
+        values["key"] = (values["teacher_id"], values["title"])
+    resolved = dedupe(resolved, "key", errors, label="title")
+    if not resolved:
+        return 0
+
+    existing = {}
+    for lesson_id, teacher_id, title in conn.execute(
+            select(Lesson.c.id, Lesson.c.teacher_id, Lesson.c.title).where(
+                Lesson.c.teacher_id.in_({v["teacher_id"] for _, v in resolved}),
+                Lesson.c.title.in_({v["title"] for _, v in resolved}))):
+        existing.setdefault((teacher_id, title), lesson_id)
+
+    columns = ("description", "type", "price", "language", "difficulty")
+    new_rows, changed_rows = [], []
+    for _, values in resolved:
+        row = {column: values[column] for column in columns}
+        if values["duration_minutes"] is not None:
+            row["duration_minutes"] = values["duration_minutes"]
+        lesson_id = existing.get(values["key"])
+        if lesson_id is None:
+            new_rows.append(dict(row, teacher_id=values["teacher_id"], title=values["title"], file_path="placeholder.mp4",
+                                 duration_minutes=row.get("duration_minutes", 15), created_at=datetime.utcnow()))
+        elif overwrite:
+            row.setdefault("duration_minutes", 15)
+            changed_rows.append(dict({f"b_{column}": value for column, value in row.items()}, b_id=lesson_id))
+    if new_rows:
+        conn.execute(Lesson.insert(), new_rows)
+    if changed_rows:
+        conn.execute(update(Lesson).where(Lesson.c.id == bindparam("b_id")).values(
+            {column: bindparam(f"b_{column}") for column in columns + ("duration_minutes",)}), changed_rows)
+    return len(new_rows) + len(changed_rows)
+
+WRITERS = {"workers": upsert_workers, "lessons": upsert_lessons}
+
+# ----------------------------------------------------------------------
+# 3. CHECKPOINT AND ERROR REPORT
+# ----------------------------------------------------------------------
+def file_fingerprint(path):
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime": int(stat.st_mtime)}
+
+class Checkpoint:
+    """JSON file with the last committed line of one import. Replaced atomically after every chunk."""
+
+    def __init__(self, path, kind, source):
+        self.path = path
+        self.state = {"kind": kind, "source": file_fingerprint(source), "line": 0,
+                      "written": 0, "errors": 0, "finished": False}
+
+    def load(self):
+        """Returns the line to resume after (0 = start). Refuses a checkpoint that belongs to another file."""
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        with open(self.path) as f:
+            saved = json.load(f)
+        if saved.get("kind") != self.state["kind"] or saved.get("source") != self.state["source"]:
+            raise RuntimeError(f"{self.path} belongs to a different import ({saved.get('kind')} of "
+                               f"{saved.get('source', {}).get('path')}); use a new checkpoint file")
+        self.state = saved
+        return saved["line"]
+
+    def save(self, **changes):
+        self.state.update(changes)
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+class ErrorReport:
+    """CSV of rejected rows: line, error, then the row's original columns."""
+
+    def __init__(self, path, columns, append):
+        self.file = open(path, "a" if append else "w", newline="", encoding="utf-8")
+        self.columns = columns
+        self.writer = csv.writer(self.file)
+        if not append or self.file.tell() == 0:
+            self.writer.writerow(["line", "error"] + columns)
+
+    def write(self, errors):
+        for error in sorted(errors):
+            self.writer.writerow([error.line, error.error] + [error.row.get(column, "") for column in self.columns])
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+# ----------------------------------------------------------------------
+# 4. PIPELINE
+# ----------------------------------------------------------------------
+def read_chunks(reader, chunk_size, skip_through):
+    """[(line, row)] lists of chunk_size rows. Line numbers count the header as line 1, like a spreadsheet."""
+    chunk = []
+    for index, row in enumerate(reader):
+        line = index + 2
+        if line <= skip_through:
+            continue
+        chunk.append((line, row))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def run_import(engine, kind, source, checkpoint_path=None, report_path=None, chunk_size=1000, workers=None,
+               overwrite=False, progress=None):
+    """
+    Imports one CSV file. Returns the checkpoint state (lines, rows written, errors).
+    workers: validation processes (None = one per CPU, 0 = validate in this process).
+    """
+    checkpoint = Checkpoint(checkpoint_path, kind, source)
+    resume_after = checkpoint.load()
+    if checkpoint.state["finished"]:
+        return checkpoint.state
+
+    write_chunk = WRITERS[kind]
+    with open(source, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        reader.fieldnames = [column.strip() for column in reader.fieldnames or []]
+        missing = [column for column in required_columns(kind) if column not in reader.fieldnames]
+        if missing:
+            raise RuntimeError(f"{source} is missing the column(s) {', '.join(missing)}")
+
+        report = ErrorReport(report_path or f"{source}.errors.csv", reader.fieldnames, append=resume_after > 0)
+        pool = ProcessPoolExecutor(max_workers=workers) if workers != 0 else None
+        if resume_after:
+            logger.info("Resuming import", extra={"kind": kind, "after_line": resume_after})
+        try:
+            chunks = read_chunks(reader, chunk_size, resume_after)
+            # Validation runs a few chunks ahead of the writer, never the whole file
+            ahead = 2 * (workers or os.cpu_count() or 1) if pool else 1
+            pending = deque()
+
+            def submit_next():
+                chunk = next(chunks, None)
+                if chunk is None:
+                    return False
+                pending.append(pool.submit(validate_chunk, kind, chunk) if pool else validate_chunk(kind, chunk))
+                return True
+
+            while len(pending) < ahead and submit_next():
+                pass
+            while pending:
+                item = pending.popleft()
+                result = item.result() if pool else item
+                submit_next()
+
+                errors = list(result.errors)
+                with engine.begin() as conn:
+                    written = write_chunk(conn, result.valid, errors, overwrite=overwrite)
+                report.write(errors)
+                checkpoint.save(line=result.last_line, written=checkpoint.state["written"] + written,
+                                errors=checkpoint.state["errors"] + len(errors))
+                if progress:
+                    progress(checkpoint.state)
+            checkpoint.save(finished=True)
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+            report.close()
+    logger.info("Import finished", extra={"kind": kind, **{k: checkpoint.state[k] for k in ("line", "written", "errors")}})
+    return checkpoint.state
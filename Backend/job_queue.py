@@ -0,0 +1,164 @@
+import os
+import json
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from config import settings
+from tracing_utils import get_logger, span
+import sql_stats
+
+logger = get_logger("jobs")
+
+class JobQueue:
+    """
+    Small in-process background job runner (used for AI evaluation).
+    Tracks queue depth so callers and benchmarks can see the backlog.
+    Jobs run in a copy of the submitter's context, so they log under its trace id.
+
+    On shutdown, jobs that have not started within the drain timeout are written
+    to a spool file and picked up again by restore() when a worker next starts.
+    Only functions passed to register() can be spooled; their args must be JSON-serialisable.
+    """
+
+    def __init__(self, max_workers, name="jobs", spool_path=None):
+        self.name = name
+        self.max_workers = max_workers
+        self.spool_path = spool_path
+        self.handlers = {}
+        self._reset()
+        # Threads don't survive fork; a preloaded parent's queue must not be shared with workers
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        self.lock = threading.Lock()
+        self.idle = threading.Condition(self.lock)
+        self.queued = {}
+        self.accepting = True
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+
+    def register(self, fn):
+        """Marks fn as a job that may be spooled and restored by name. Usable as a decorator."""
+        self.handlers[fn.__name__] = fn
+        return fn
+
+    def _run(self, fn, args, kwargs):
+        # Statements run by the job belong to the job, not the request that queued it
+        sql_stats.current_stats.set(None)
+        try:
+            with span("job.run", job=fn.__name__, queue=self.name):
+                fn(*args, **kwargs)
+            ok = True
+        except Exception:
+            logger.exception("Background job failed", extra={"job": fn.__name__, "queue": self.name})
+            ok = False
+        with self.lock:
+            self.pending -= 1
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+            if self.pending == 0:
+                self.idle.notify_all()
+
+    def submit(self, fn, *args, **kwargs):
+        with self.lock:
+            if not self.accepting:
+                raise RuntimeError(f"Job queue {self.name} is shutting down")
+            self.pending += 1
+        context = contextvars.copy_context()
+        future = self.executor.submit(context.run, self._run, fn, args, kwargs)
+        with self.lock:
+            self.queued[future] = (fn.__name__, args, kwargs)
+        future.add_done_callback(self._forget)
+        return future
+
+    def _forget(self, future):
+        with self.lock:
+            self.queued.pop(future, None)
+
+    def depth(self):
+        """Jobs queued or running."""
+        with self.lock:
+            return self.pending
+
+    def drain(self, timeout=None):
+        """Blocks until every submitted job has finished. Returns False on timeout."""
+        with self.lock:
+            return self.idle.wait_for(lambda: self.pending == 0, timeout=timeout)
+
+    def shutdown(self, timeout):
+        """
+        Stops accepting jobs and waits up to `timeout` seconds for the backlog.
+        Jobs still waiting for a thread after that are cancelled and spooled;
+        jobs already running are allowed to finish.
+        """
+        with self.lock:
+            self.accepting = False
+        drained = self.drain(timeout)
+
+        leftover = []
+        if not drained:
+            with self.lock:
+                waiting = list(self.queued.items())
+            for future, job in waiting:
+                if future.cancel():
+                    leftover.append(job)
+            with self.lock:
+                self.pending -= len(leftover)
+        self.executor.shutdown(wait=True)
+
+        spooled = self._spool(leftover)
+        logger.info("Job queue stopped", extra={"queue": self.name, "drained": drained, "spooled": spooled, "lost": len(leftover) - spooled})
+        return {"drained": drained, "spooled": spooled, "lost": len(leftover) - spooled}
+
+    def _spool(self, jobs):
+        if not jobs or not self.spool_path:
+            return 0
+        lines = []
+        for name, args, kwargs in jobs:
+            if name not in self.handlers:
+                logger.error("Dropping unregistered job on shutdown", extra={"job": name, "queue": self.name})
+                continue
+            lines.append(json.dumps({"job": name, "args": list(args), "kwargs": kwargs}) + "\n")
+        # One append per worker; several workers may stop at the same time
+        with open(self.spool_path, "a") as f:
+            f.write("".join(lines))
+        return len(lines)
+
+    def restore(self):
+        """
+        Re-submits jobs spooled by a previous shutdown. The spool is claimed with an
+        atomic rename, so when several workers start together only one replays it.
+        """
+        if not self.spool_path or not os.path.exists(self.spool_path):
+            return 0
+        claimed = f"{self.spool_path}.{os.getpid()}"
+        try:
+            os.replace(self.spool_path, claimed)
+        except FileNotFoundError:
+            return 0
+
+        restored = 0
+        with open(claimed) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                fn = self.handlers.get(entry["job"])
+                if fn is None:
+                    logger.error("Spooled job has no handler", extra={"job": entry["job"], "queue": self.name})
+                    continue
+                self.submit(fn, *entry["args"], **entry["kwargs"])
+                restored += 1
+        os.remove(claimed)
+        logger.info("Restored spooled jobs", extra={"queue": self.name, "restored": restored})
+        return restored
+
+    def stats(self):
+        with self.lock:
+            return {"name": self.name, "depth": self.pending, "completed": self.completed, "failed": self.failed}
+
+evaluation_queue = JobQueue(max_workers=settings.EVALUATION_WORKERS, name="evaluation", spool_path=settings.JOB_SPOOL_PATH)
@@ -0,0 +1,301 @@
+# Backend/load_test.py
+#
+# Scenario-driven API load test. Simulates concurrent users running the
+# journeys real workers and learners take, against a running server:
+#
+#   python seed_bulk_data.py --preset medium
+#   OTP_IP_BURST=1000000 OTP_DEBUG_RESPONSE=true uvicorn main:app --port 8000 &   # every virtual user shares one IP;
+#                                                                               # otp_login reads the code from the response
+#   python load_test.py --base-url http://127.0.0.1:8000 --users 1000 --duration 120 --json results.json
+#   python load_test.py ... --baseline results_previous.json   # prints p95 deltas
+#
+# Results are machine-readable JSON (per scenario and per step) so runs can be diffed between releases.
+
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from datetime import datetime
+
+API = "/api/v1"
+
+# ----------------------------------------------------------------------
+# 1. RESULT COLLECTION
+# ----------------------------------------------------------------------
+class Recorder:
+    def __init__(self):
+        self.steps = {}
+        self.scenarios = {}
+
+    @staticmethod
+    def _bucket(store, name):
+        return store.setdefault(name, {"latencies": [], "errors": 0, "status_codes": {}})
+
+    def step(self, name, elapsed, status_code):
+        bucket = self._bucket(self.steps, name)
+        bucket["latencies"].append(elapsed)
+        bucket["status_codes"][str(status_code)] = bucket["status_codes"].get(str(status_code), 0) + 1
+        if not (isinstance(status_code, int) and status_code < 400):
+            bucket["errors"] += 1
+
+    def scenario(self, name, elapsed, ok):
+        bucket = self._bucket(self.scenarios, name)
+        bucket["latencies"].append(elapsed)
+        if not ok:
+            bucket["errors"] += 1
+
+    @staticmethod
+    def _summarise(bucket, duration):
+        values = sorted(bucket["latencies"])
+
+        def pct(p):
+            if not values:
+                return 0.0
+            return round(values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))] * 1000, 2)
+
+        summary = {
+            "count": len(values),
+            "errors": bucket["errors"],
+            "error_rate": round(bucket["errors"] / len(values), 4) if values else 0.0,
+            "throughput_rps": round(len(values) / duration, 2) if duration else 0.0,
+            "latency_ms": {"p50": pct(50), "p95": pct(95), "p99": pct(99), "max": round(values[-1] * 1000, 2) if values else 0.0}
+        }
+        if bucket["status_codes"]:
+            summary["status_codes"] = bucket["status_codes"]
+        return summary
+
+    def report(self, duration):
+        return {
+            "scenarios": {name: self._summarise(b, duration) for name, b in sorted(self.scenarios.items())},
+            "steps": {name: self._summarise(b, duration) for name, b in sorted(self.steps.items())}
+        }
+
+# ----------------------------------------------------------------------
+# 2. USER JOURNEYS
+# ----------------------------------------------------------------------
+class Journeys:
+    """
+    Each journey is a coroutine taking the shared client; the step() helper
+    records per-request latency and raises on HTTP errors so the scenario is marked failed.
+    """
+
+    def __init__(self, client, recorder, manifest, rng):
+        self.client = client
+        self.recorder = recorder
+        self.manifest = manifest
+        self.rng = rng
+
+    async def step(self, name, method, url, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            status_code = response.status_code
+        except Exception as e:
+            self.recorder.step(name, time.perf_counter() - started, type(e).__name__)
+            raise
+        self.recorder.step(name, time.perf_counter() - started, status_code)
+        if status_code >= 400:
+            raise RuntimeError(f"{name} returned {status_code}")
+        return response
+
+    def _pick(self, key):
+        info = self.manifest[key]
+        return info["first_id"] + self.rng.randrange(max(1, info["count"]))
+
+    def user_id(self):
+        return self._pick("users")
+
+    def teacher_id(self):
+        return self._pick("teachers")
+
+    def lesson_id(self):
+        return self._pick("lessons")
+
+    def session_id(self):
+        return self._pick("sessions")
+
+    def wallet_hash(self, user_id):
+        return f"{self.manifest['wallet_hash_prefix']}{user_id:012d}"
+
+    async def otp_login(self):
+        # New phone numbers outside the seeded range, so every login creates a user like a real signup
+        phone = f"+9180{self.rng.randrange(10**8):08d}"
+        response = await self.step("otp_send", "POST", f"{API}/auth/otp/send", json={"phone_number": phone})
+        otp = response.json().get("debug_otp", "000000")
+        await self.step("otp_verify", "POST", f"{API}/auth/otp/verify", json={"phone_number": phone, "otp_code": otp})
+
+    async def profile_update(self):
+        user_id = self.user_id()
+        await self.step("profile_get", "GET", f"{API}/user/profile/{user_id}")
+        await self.step("profile_update", "POST", f"{API}/user/update_core_profile/{user_id}", json={
+            "name": f"Worker {user_id}",
+            "profession": self.rng.choice(["Painter", "Electrician", "Plumber"]),
+            "age": self.rng.randint(18, 60),
+            "state": "Karnataka",
+            "district": "Bengaluru",
+            "local_area": "Jayanagar"
+        })
+
+    async def tier2_upload(self):
+        user_id = self.user_id()
+        content = bytes(self.rng.getrandbits(8) for _ in range(32 * 1024))
+        await self.step("tier2_upload", "POST", f"{API}/identity/tier2/upload/{user_id}",
+                        params={"file_type": self.rng.choice(["aadhaar", "pan_card", "training_letter"])},
+                        files={"file": ("loadtest.jpg", content, "image/jpeg")})
+
+    async def catalog_browse(self):
+        params = {}
+        if self.rng.random() < 0.5:
+            params["language"] = self.rng.choice(["English", "Hindi", "Tamil"])
+        if self.rng.random() < 0.3:
+            params["difficulty"] = self.rng.choice(["Beginner", "Intermediate", "Advanced"])
+        await self.step("catalog_lessons", "GET", f"{API}/skillbank/lessons", params=params)
+        await self.step("catalog_sessions", "GET", f"{API}/skillbank/sessions", params={"user_id": self.user_id(), **params})
+
+    async def enroll(self):
+        user_id = self.user_id()
+        await self.step("enroll_lesson", "POST", f"{API}/skillbank/enroll/lesson/{user_id}/{self.lesson_id()}")
+        if self.manifest["sessions"]["count"]:
+            await self.step("enroll_session", "POST", f"{API}/skillbank/enroll/session/{user_id}/{self.session_id()}")
+
+    async def progress_updates(self):
+        user_id = self.user_id()
+        response = await self.step("enroll_lesson", "POST", f"{API}/skillbank/enroll/lesson/{user_id}/{self.lesson_id()}")
+        enrollment_id = response.json()["enrollment_id"]
+        for progress in (25, 50, 75, 100):
+            status = "COMPLETED" if progress == 100 else "IN_PROGRESS"
+            await self.step("progress_update", "POST", f"{API}/skillbank/progress/{enrollment_id}",
+                            json={"progress": progress, "status": status})
+
+    async def dashboards(self):
+        user_id = self.user_id()
+        await self.step("dashboard_stats", "GET", f"{API}/dashboard/stats/{user_id}")
+        await self.step("learning_dashboard", "GET", f"{API}/user/learning_dashboard/{user_id}")
+        await self.step("user_proofs", "GET", f"{API}/user/proofs/{user_id}")
+        if self.rng.random() < 0.2:
+            await self.step("teaching_dashboard", "GET", f"{API}/teaching/dashboard/{self.teacher_id()}")
+
+    async def public_profile_scan(self):
+        await self.step("public_profile", "GET", f"{API}/public/profile/{self.wallet_hash(self.user_id())}")
+
+# Relative frequency of each journey in the traffic mix
+SCENARIO_WEIGHTS = {
+    "otp_login": 10,
+    "profile_update": 5,
+    "tier2_upload": 3,
+    "catalog_browse": 30,
+    "enroll": 8,
+    "progress_updates": 14,
+    "dashboards": 20,
+    "public_profile_scan": 10
+}
+
+# ----------------------------------------------------------------------
+# 3. DRIVER
+# ----------------------------------------------------------------------
+async def virtual_user(index, client, recorder, manifest, weights, stop_at, think_time, seed):
+    rng = random.Random(seed * 100_003 + index)
+    journeys = Journeys(client, recorder, manifest, rng)
+    names = list(weights)
+    cumulative = [weights[n] for n in names]
+
+    while time.monotonic() < stop_at:
+        name = rng.choices(names, weights=cumulative)[0]
+        started = time.perf_counter()
+        ok = True
+        try:
+            await getattr(journeys, name)()
+        except Exception:
+            ok = False
+        recorder.scenario(name, time.perf_counter() - started, ok)
+        if think_time:
+            await asyncio.sleep(rng.uniform(0, think_time))
+
+async def run(args, manifest):
+    import httpx
+
+    weights = dict(SCENARIO_WEIGHTS)
+    if args.scenarios:
+        weights = {name: SCENARIO_WEIGHTS[name] for name in args.scenarios.split(",")}
+
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        # Ramp users in evenly so the server isn't hit by one synchronized wave
+        started = time.monotonic()
+        stop_at = started + args.ramp_up + args.duration
+        tasks = []
+        for i in range(args.users):
+            tasks.append(asyncio.create_task(
+                virtual_user(i, client, recorder, manifest, weights, stop_at, args.think_time, args.seed)
+            ))
+            if args.ramp_up:
+                await asyncio.sleep(args.ramp_up / args.users)
+        await asyncio.gather(*tasks)
+        elapsed = time.monotonic() - started
+
+    return {
+        "meta": {
+            "run_at": datetime.utcnow().isoformat(),
+            "base_url": args.base_url,
+            "virtual_users": args.users,
+            "duration_seconds": round(elapsed, 2),
+            "ramp_up_seconds": args.ramp_up,
+            "think_time_seconds": args.think_time,
+            "scenario_weights": weights,
+            "dataset": {k: manifest[k] for k in ("users", "lessons", "sessions", "skill_credentials", "lesson_enrollments") if k in manifest}
+        },
+        **recorder.report(elapsed)
+    }
+
+def print_summary(report, baseline=None):
+    print(f"--- LOAD TEST: {report['meta']['virtual_users']} users, {report['meta']['duration_seconds']}s ---")
+    print(f"{'step':<22}{'count':>8}{'err%':>8}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'Δp95':>10}")
+    for name, s in report["steps"].items():
+        delta = ""
+        if baseline and name in baseline.get("steps", {}):
+            before = baseline["steps"][name]["latency_ms"]["p95"]
+            if before:
+                delta = f"{(s['latency_ms']['p95'] - before) / before * 100:+.1f}%"
+        print(f"{name:<22}{s['count']:>8}{s['error_rate'] * 100:>7.2f}%{s['throughput_rps']:>9}"
+              f"{s['latency_ms']['p50']:>9}{s['latency_ms']['p95']:>9}{s['latency_ms']['p99']:>9}{delta:>10}")
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Scenario-driven Skill Wallet API load test")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--manifest", default="seed_manifest.json", help="Written by seed_bulk_data.py")
+    parser.add_argument("--users", type=int, default=100, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--ramp-up", type=float, default=10)
+    parser.add_argument("--think-time", type=float, default=1.0, help="Max random pause between journeys")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--scenarios", help="Comma-separated subset of: " + ",".join(SCENARIO_WEIGHTS))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_path", help="Write results to this file")
+    parser.add_argument("--baseline", help="Previous results JSON to compare p95 against")
+    args = parser.parse_args()
+
+    try:
+        with open(args.manifest) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        print(f"Manifest {args.manifest} not found. Run seed_bulk_data.py first.")
+        sys.exit(1)
+
+    report = asyncio.run(run(args, manifest))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_summary(report, baseline)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.json_path}")
+
+if __name__ == "__main__":
+    main_cli()
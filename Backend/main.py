@@ -1,47 +1,181 @@
 import models, database
-from auth_utils import generate_otp, hash_otp, verify_otp
+from auth_utils import generate_otp, hash_otp, verify_otp, issue_tokens, decode_token, verify_access_token, TokenError, new_wallet_hash
+from otp_utils import get_otp_store, check_rate_limits
+from notification_utils import Message, get_sender
 from database import engine, SessionLocal
 from fastapi.staticfiles import StaticFiles 
 from config import settings
-from fastapi import FastAPI, Depends, HTTPException, status, Header, Request, Path, File, UploadFile, Form
+from fastapi import FastAPI, Depends, HTTPException, status, Header, Request, Path, Query, File, UploadFile, Form, WebSocket, WebSocketDisconnect, WebSocketException
+from fastapi.requests import HTTPConnection
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import func, and_, select, union
+from sqlalchemy.exc import IntegrityError
 from pydantic import BaseModel, Field
 import uvicorn
 import hashlib
 import random
-from datetime import datetime, date, timedelta
+import math
+from datetime import datetime, date, timedelta, timezone
 from typing import Annotated, Optional, List, Dict, Any
+import io
 import os 
-import shutil 
 import json
-import hashids
+import uuid
+import hmac
 
 # --- AI IMPORTS ---
-from ai_utils import evaluate_skill_with_google, transcribe_audio
+from ai_utils import evaluate_skill_with_google, evaluate_skills_batch, transcribe_audio
 from search_utils import search_opportunities
-
-# --- DB INIT ---
-try:
-    print("=" * 60)
-    print("🔄 Checking Database Schema...")
-    models.Base.metadata.create_all(bind=engine)
-    print("✅ Database ready!")
-    print("=" * 60)
-except Exception as e:
-    print(f"❌ DB Error: {e}")
+from ai_client import gemini_client
+from job_queue import evaluation_queue
+from reminder_dispatcher import dispatcher as reminder_dispatcher, parse_reminder_time
+from progress_buffer import progress_buffer
+from facet_utils import facet_catalog, FACETS
+from schemas import CoreProfileUpdate, CreateLessonRequest
+from export_utils import DATASETS, ENCODERS, export_window, stream_export
+from recommendation_utils import recommendation_index, lesson_doc, feedback_gaps
+from cohort_utils import cohort_standing, previous_score_for
+from events_utils import event_hub, get_broker, publish, format_sse, TooManyConnections
+import asyncio
+from enrollment_utils import register_for_lesson, register_for_session, ALREADY_REGISTERED, FULL, NOT_FOUND
+import sql_stats
+import metrics_utils
+from metrics_utils import HTTP_REQUESTS, HTTP_LATENCY, HTTP_IN_FLIGHT, DB_TIME_PER_REQUEST, DB_STATEMENTS_PER_REQUEST, UPLOAD_BYTES, UPLOAD_LATENCY, OTP_REQUESTS
+from storage_utils import get_storage, build_key, path_for, key_from_path, safe_key, verify_local_upload, HashingReader, record_file_hash, file_hashes
+from fastapi.responses import RedirectResponse, StreamingResponse, PlainTextResponse, JSONResponse
+from tracing_utils import get_logger, span, start_trace, end_trace, trace_id_from_headers, current_trace_id
+from profiling_utils import SamplingProfiler, track_thread
+from db_init import init_db
+from contextlib import asynccontextmanager
+import time
+
+logger = get_logger("api")
+
+# --- STARTUP ---
+# Nothing touches the database or filesystem at import time; that happens
+# once per worker here. Production runs db_init.py before the workers start
+# and sets AUTO_CREATE_SCHEMA=false so boots skip the schema round-trip.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if storage.name == "local":
+        os.makedirs("uploads", exist_ok=True)
+    if settings.AUTO_CREATE_SCHEMA:
+        try:
+            logger.info("Checking database schema")
+            init_db()
+            logger.info("Database ready")
+        except Exception as e:
+            logger.error("Database schema check failed", extra={"error": str(e)})
+    evaluation_queue.restore()
+    if settings.REMINDER_DISPATCHER_IN_APP:
+        reminder_dispatcher.start()
+    progress_buffer.start()
+    recommendation_index.start()
+    facet_catalog.start()
+    get_broker().start()
+    yield
+    get_broker().stop()
+    recommendation_index.stop()
+    facet_catalog.stop()
+    reminder_dispatcher.stop()
+    # Write buffered progress heartbeats before the process exits
+    progress_buffer.stop()
+    # Server has stopped taking requests; finish or spool queued evaluations
+    evaluation_queue.shutdown(timeout=settings.SHUTDOWN_DRAIN_SECONDS)
+
+# --- AUTHORIZATION ---
+# Browser EventSource and WebSocket clients cannot set headers, so event streams
+# may pass the (short-lived) access token as ?access_token= instead
+EVENT_STREAM_PREFIX = "/api/v1/events/"
+
+def connection_token(connection: HTTPConnection):
+    scheme, _, token = connection.headers.get("authorization", "").partition(" ")
+    if token and scheme.lower() == "bearer":
+        return token
+    if connection.url.path.startswith(EVENT_STREAM_PREFIX):
+        return connection.query_params.get("access_token")
+    return None
+
+def authorize_path_user(connection: HTTPConnection):
+    """
+    App-wide dependency: with AUTH_REQUIRED, a {user_id} in the path must be the
+    token's user. Uses the claims resolved by authenticate_request; no database access.
+    """
+    if not settings.AUTH_REQUIRED or "user_id" not in connection.path_params:
+        return
+    if connection.scope["type"] == "websocket":
+        # WebSockets bypass the HTTP middleware, so the token is checked here
+        auth_user_id = None
+        token = connection_token(connection)
+        if token:
+            try:
+                auth_user_id = int(verify_access_token(token)["sub"])
+            except TokenError:
+                pass
+        if str(auth_user_id) != str(connection.path_params["user_id"]):
+            raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason="Not authenticated for this user")
+        return
+    if str(connection.state.auth_user_id) != str(connection.path_params["user_id"]):
+        raise HTTPException(status_code=403, detail="Not allowed to access another user's data")
 
 app = FastAPI(
     title="Skill Wallet Backend API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    dependencies=[Depends(authorize_path_user)]
 )
 
 # --- STATIC FILE MOUNTING ---
-os.makedirs("uploads", exist_ok=True)
-# 1. Standard mount
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
-# 2. Frontend-Specific mount (Fixes 404s)
-app.mount("/proofs/uploads", StaticFiles(directory="uploads"), name="proofs")
+storage = get_storage()
+
+if storage.name == "local":
+    # check_dir=False: the directory is created in lifespan, not at import
+    # 1. Standard mount
+    app.mount("/uploads", StaticFiles(directory="uploads", check_dir=False), name="uploads")
+    # 2. Frontend-Specific mount (Fixes 404s)
+    app.mount("/proofs/uploads", StaticFiles(directory="uploads", check_dir=False), name="proofs")
+else:
+    # Object storage: redirect to a short-lived presigned GET so file bytes never pass through the API
+    def serve_stored_file(key: str):
+        return RedirectResponse(storage.presign_get(key))
+
+    app.add_api_route("/uploads/{key:path}", serve_stored_file, methods=["GET"], include_in_schema=False)
+    app.add_api_route("/proofs/uploads/{key:path}", serve_stored_file, methods=["GET"], include_in_schema=False)
+
+# --- AUTHENTICATION ---
+# Reachable without a token even when AUTH_REQUIRED is on
+PUBLIC_PATHS = {"/", "/metrics", "/docs", "/redoc", "/openapi.json", "/api/v1/skillbank/lessons", "/api/v1/skillbank/sessions",
+                "/api/v1/skillbank/catalog/lessons", "/api/v1/skillbank/catalog/sessions"}
+# /api/v1/export/ checks its own X-Export-Token instead of a user's access token
+PUBLIC_PATH_PREFIXES = ("/api/v1/auth/", "/api/v1/public/", "/api/v1/system/", "/api/v1/export/", "/api/v1/storage/upload", "/uploads/", "/proofs/uploads/", "/docs/")
+
+def is_public_path(path: str):
+    return path in PUBLIC_PATHS or path.startswith(PUBLIC_PATH_PREFIXES)
+
+# Registered before CORSMiddleware, so it runs inside it and 401s still carry CORS headers
+@app.middleware("http")
+async def authenticate_request(request: Request, call_next):
+    """
+    Resolves "Authorization: Bearer <access token>" to request.state.auth_user_id.
+    Signatures are checked locally and verified claims are cached (auth_utils.claims_cache),
+    so this never touches the database.
+    """
+    request.state.auth_user_id = None
+    token = connection_token(request)
+    if token:
+        try:
+            request.state.auth_user_id = int(verify_access_token(token)["sub"])
+        except TokenError as e:
+            # While AUTH_REQUIRED is off, stale or legacy tokens are treated as anonymous
+            if settings.AUTH_REQUIRED:
+                return JSONResponse({"detail": str(e)}, status_code=401, headers={"WWW-Authenticate": "Bearer"})
+
+    if (settings.AUTH_REQUIRED and request.state.auth_user_id is None
+            and request.method != "OPTIONS" and not is_public_path(request.url.path)):
+        return JSONResponse({"detail": "Not authenticated"}, status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    return await call_next(request)
 
 app.add_middleware(
     CORSMiddleware,
@@ -51,7 +185,69 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# --- REQUEST METRICS & SQL STATEMENT COUNTING ---
+sql_stats.instrument_engine(engine)
+
+def profiling_requested(request: Request):
+    """Per-request profiling needs PROFILING_ENABLED and an X-Profile header matching PROFILING_TOKEN."""
+    if not settings.PROFILING_ENABLED or not settings.PROFILING_TOKEN:
+        return False
+    return request.headers.get("x-profile") == settings.PROFILING_TOKEN
+
+@app.middleware("http")
+async def observe_request(request: Request, call_next):
+    method = request.method
+    trace_tokens = start_trace(trace_id_from_headers(request.headers))
+    stats, token = sql_stats.start_request()
+    profiler = SamplingProfiler(settings.PROFILING_INTERVAL_MS / 1000).start() if profiling_requested(request) else None
+    HTTP_IN_FLIGHT.inc(method=method)
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        with span("http.request", method=method) as root:
+            try:
+                response = await call_next(request)
+                status_code = response.status_code
+                if profiler is not None:
+                    # Drain the body so streamed work is inside the profile window
+                    async for _ in response.body_iterator:
+                        pass
+            finally:
+                # Label by route template (not raw path) to keep label cardinality bounded
+                route = request.scope.get("route")
+                route_path = route.path if route is not None else "unmatched"
+                root.set("route", route_path)
+                root.set("status", status_code)
+                root.set("db_statements", stats.statements)
+        trace_id = current_trace_id.get()
+    finally:
+        if profiler is not None:
+            profiler.stop()
+        sql_stats.end_request(token)
+        end_trace(trace_tokens)
+        HTTP_IN_FLIGHT.dec(method=method)
+        HTTP_REQUESTS.inc(method=method, route=route_path, status=status_code)
+        HTTP_LATENCY.observe(time.perf_counter() - started, method=method, route=route_path)
+        DB_TIME_PER_REQUEST.observe(stats.db_time, route=route_path)
+        DB_STATEMENTS_PER_REQUEST.observe(stats.statements, route=route_path)
+    if profiler is not None:
+        # The profile replaces the normal body; the original status is reported alongside it
+        response = JSONResponse({
+            "route": route_path,
+            "status": status_code,
+            "db_statements": stats.statements,
+            "db_time_ms": round(stats.db_time * 1000, 3),
+            "profile": profiler.report()
+        })
+    response.headers["X-Trace-Id"] = trace_id
+    if settings.DEBUG_SQL_HEADERS:
+        response.headers["X-DB-Statements"] = str(stats.statements)
+        response.headers["X-DB-Time-Ms"] = f"{stats.db_time * 1000:.2f}"
+    return response
+
 def get_db():
+    # Sync endpoints run in the threadpool; include their thread in a profiled request
+    track_thread()
     db = SessionLocal()
     try:
         yield db
@@ -61,6 +257,7 @@ def get_db():
 GetDB = Annotated[Session, Depends(get_db)]
 
 # --- SCHEMAS ---
+# (CoreProfileUpdate and CreateLessonRequest are in schemas.py, shared with the bulk importer)
 
 class OtpRequest(BaseModel):
     phone_number: str
@@ -69,16 +266,6 @@ class OtpVerify(BaseModel):
     phone_number: str
     otp_code: str
 
-class CoreProfileUpdate(BaseModel):
-    name: str
-    profession: str
-    age: Optional[int] = None
-    date_of_birth: Optional[str] = None
-    state: Optional[str] = None
-    district: Optional[str] = None
-    local_area: str
-    profile_photo_file_path: Optional[str] = None
-
 class WorkSubmissionRequest(BaseModel):
     wallet_hash: str
     skill_name: str
@@ -112,43 +299,140 @@ def get_opportunities(user_id: int, db: GetDB):
 def read_root():
     return {"message": "Skill Wallet API Online", "status": "Ready"}
 
+@app.get("/api/v1/system/ai_client")
+def get_ai_client_status():
+    """
+    Breaker state, limiter tokens and call counters for the shared Gemini client.
+    """
+    return gemini_client.stats()
+
+AI_BREAKER_OPEN = metrics_utils.registry.register(metrics_utils.Gauge(
+    "skillwallet_ai_breaker_open", "1 while the Gemini circuit breaker is open or half-open."))
+AI_IN_FLIGHT = metrics_utils.registry.register(metrics_utils.Gauge(
+    "skillwallet_ai_calls_in_flight", "Gemini calls currently in flight."))
+EVALUATION_QUEUE_DEPTH = metrics_utils.registry.register(metrics_utils.Gauge(
+    "skillwallet_evaluation_queue_depth", "Background evaluation jobs queued or running."))
+
+def collect_runtime_gauges():
+    ai_stats = gemini_client.stats()
+    AI_BREAKER_OPEN.set(0 if ai_stats["breaker"]["state"] == "CLOSED" else 1)
+    AI_IN_FLIGHT.set(ai_stats["concurrency"]["in_flight"])
+    EVALUATION_QUEUE_DEPTH.set(evaluation_queue.depth())
+
+metrics_utils.registry.add_collector(collect_runtime_gauges)
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics(request: Request):
+    """
+    Prometheus text exposition. Needs the METRICS_TOKEN bearer token when one is configured;
+    otherwise local scrapers only, unless METRICS_ALLOW_REMOTE is set.
+    """
+    if settings.METRICS_TOKEN:
+        token = request.headers.get("authorization", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+            raise HTTPException(status_code=403, detail="A valid metrics bearer token is required")
+    elif not settings.METRICS_ALLOW_REMOTE and client_ip(request) not in ("127.0.0.1", "::1", "localhost"):
+        raise HTTPException(status_code=403, detail="Metrics are only available locally")
+    return PlainTextResponse(metrics_utils.registry.render(), media_type="text/plain; version=0.0.4")
+
+def client_ip(request: Request):
+    return request.client.host if request.client else ""
+
+def enforce_otp_rate_limit(action: str, phone: Optional[str], request: Request):
+    retry_after = check_rate_limits(action, phone=phone, client_ip=client_ip(request))
+    if retry_after:
+        OTP_REQUESTS.inc(action=action, result="rate_limited")
+        raise HTTPException(status_code=429, detail="Too many OTP requests. Please try again later.",
+                            headers={"Retry-After": str(math.ceil(retry_after))})
+
 @app.post("/api/v1/auth/otp/send")
-def send_otp(request: OtpRequest, db: GetDB):
+def send_otp(request: OtpRequest, http_request: Request):
+    # No database access: the challenge lives in the OTP store until it is verified
     phone = request.phone_number
-    user = db.query(models.User).filter(models.User.phone_number == phone).first()
-    if not user:
-        user = models.User(phone_number=phone)
-        db.add(user)
-        db.commit()
-        db.refresh(user)
-    
+    enforce_otp_rate_limit("send", phone, http_request)
+
     otp = generate_otp()
-    user.otp_hash = hash_otp(otp)
-    db.commit()
-    print(f"🔑 DEBUG OTP for {phone}: {otp}")
-    return {"message": "OTP sent", "debug_otp": otp}
+    get_otp_store().save_challenge(phone, hash_otp(otp), settings.OTP_TTL_SECONDS)
+    # The code only leaves the server by SMS (the "log" backend writes it to the log instead)
+    error = get_sender().send_batch([Message(f"otp:{phone}", phone, f"Your Skill Wallet code is {otp}")])[f"otp:{phone}"]
+    if error:
+        OTP_REQUESTS.inc(action="send", result="failed")
+        logger.warning("OTP SMS failed", extra={"error": error})
+        raise HTTPException(status_code=502, detail="Could not send the OTP. Please try again.")
+    OTP_REQUESTS.inc(action="send", result="sent")
+    if settings.OTP_DEBUG_RESPONSE:
+        return {"message": "OTP sent", "debug_otp": otp}
+    return {"message": "OTP sent"}
 
 @app.post("/api/v1/auth/otp/verify")
-def verify_user_otp(request: OtpVerify, db: GetDB):
-    user = db.query(models.User).filter(models.User.phone_number == request.phone_number).first()
-    if not user or not verify_otp(request.otp_code, user.otp_hash):
+def verify_user_otp(request: OtpVerify, http_request: Request, db: GetDB):
+    phone = request.phone_number
+    enforce_otp_rate_limit("verify", phone, http_request)
+
+    store = get_otp_store()
+    # Counted before the code is checked, so concurrent guesses can't exceed OTP_MAX_ATTEMPTS
+    challenge = store.claim_attempt(phone)
+    if not challenge or challenge.attempts > settings.OTP_MAX_ATTEMPTS:
+        OTP_REQUESTS.inc(action="verify", result="invalid")
         raise HTTPException(status_code=400, detail="Invalid OTP")
-    
+    if not verify_otp(request.otp_code, challenge.otp_hash):
+        OTP_REQUESTS.inc(action="verify", result="invalid")
+        raise HTTPException(status_code=400, detail="Invalid OTP")
+    # Single use: of two concurrent verifications only one gets through
+    if not store.consume_challenge(phone):
+        OTP_REQUESTS.inc(action="verify", result="invalid")
+        raise HTTPException(status_code=400, detail="Invalid OTP")
+
+    # First successful login creates the User (and its wallet) in one commit
+    user = db.query(models.User).options(joinedload(models.User.skill_wallet)).filter(models.User.phone_number == phone).first()
+    if not user:
+        user = models.User(phone_number=phone)
+        db.add(user)
+        try:
+            db.flush()
+        except IntegrityError:
+            # Same phone verified concurrently on another worker
+            db.rollback()
+            user = db.query(models.User).filter(models.User.phone_number == phone).first()
+
     if not user.skill_wallet:
-        w_hash = hashids.Hashids(salt=settings.SECRET_KEY, min_length=16).encode(user.id, int(datetime.utcnow().timestamp()))
-        wallet = models.SkillWallet(user_id=user.id, wallet_hash=w_hash)
+        wallet = models.SkillWallet(user_id=user.id, wallet_hash=new_wallet_hash(user.id))
         db.add(wallet)
-        db.commit()
+    if db.new:
+        try:
+            db.commit()
+        except IntegrityError:
+            # The other request created the wallet first
+            db.rollback()
+            user = db.query(models.User).filter(models.User.phone_number == phone).first()
+
+    OTP_REQUESTS.inc(action="verify", result="verified")
+    return {**issue_tokens(user.id), "user_id": user.id}
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
-    return {"access_token": f"DEBUG_ACCESS_TOKEN_for_{user.id}", "token_type": "bearer", "user_id": user.id}
+@app.post("/api/v1/auth/token/refresh")
+def refresh_access_token(request: RefreshRequest):
+    """Exchanges a refresh token for a new access + refresh token pair. Stateless, no database access."""
+    try:
+        claims = decode_token(request.refresh_token, "refresh")
+    except TokenError as e:
+        raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"})
+    user_id = int(claims["sub"])
+    return {**issue_tokens(user_id), "user_id": user_id}
 
 @app.get("/api/v1/user/profile/{user_id}")
 def get_user_profile(user_id: int, db: GetDB):
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = db.query(models.User).options(
+        joinedload(models.User.skill_wallet),
+        joinedload(models.User.documents)
+    ).filter(models.User.id == user_id).first()
     if not user: raise HTTPException(status_code=404, detail="User not found")
     
     # Check if user has uploaded any teaching content
     has_uploaded = db.query(models.SkillLesson).filter(models.SkillLesson.teacher_id == user.id).first() is not None
+    documents = {doc.doc_type: doc.path for doc in user.documents}
 
     # Return profile + wallet hash
     response = {
@@ -162,11 +446,11 @@ def get_user_profile(user_id: int, db: GetDB):
         "local_area": user.local_area,
         "wallet_hash": user.skill_wallet.wallet_hash if user.skill_wallet else None,
         "profile_photo": user.profile_photo_file_path,
-        "aadhaar_file_path": user.aadhaar_file_path,
-        "pan_card_file_path": user.pan_card_file_path,
-        "training_letter_file_path": user.training_letter_file_path,
-        "apprenticeship_proof_file_path": user.apprenticeship_proof_file_path,
-        "local_authority_proof_file_path": user.local_authority_proof_file_path,
+        "aadhaar_file_path": documents.get("aadhaar"),
+        "pan_card_file_path": documents.get("pan_card"),
+        "training_letter_file_path": documents.get("training_letter"),
+        "apprenticeship_proof_file_path": documents.get("apprenticeship_proof"),
+        "local_authority_proof_file_path": documents.get("local_authority_proof"),
         "has_uploaded": has_uploaded
     }
     return response
@@ -189,101 +473,433 @@ def update_core_profile(user_id: int, request: CoreProfileUpdate, db: GetDB):
     db.commit()
     return {"message": "Profile updated"}
 
+AUDIO_EXTENSIONS = (".webm", ".mp3", ".wav", ".m4a")
+
+def save_uploaded_file(db: Session, user_id: int, file_type: str, file_path: str, digest: str, size: Optional[int] = None):
+    """
+    Records the file's content hash and, for known file types, its path (profile photo
+    on the User, anything else as a user_documents row). Not committed.
+    Returns False if the user does not exist.
+    """
+    if file_type == "profile_photo":
+        if not db.query(models.User).filter(models.User.id == user_id).update({"profile_photo_file_path": file_path}):
+            return False
+    else:
+        # User check and current document in one query
+        row = db.query(models.User.id, models.UserDocument).outerjoin(models.UserDocument, and_(
+            models.UserDocument.user_id == models.User.id,
+            models.UserDocument.doc_type == file_type
+        )).filter(models.User.id == user_id).first()
+        if not row:
+            return False
+        if file_type in models.DOC_TYPES:
+            document = row.UserDocument
+            if not document:
+                document = models.UserDocument(user_id=user_id, doc_type=file_type)
+                db.add(document)
+            document.path = file_path
+            document.uploaded_at = datetime.utcnow()
+            document.hash = digest
+    record_file_hash(db, file_path, digest, size, user_id)
+    return True
+
+def record_uploaded_doc(db: Session, user_id: int, file_type: str, file_path: str, digest: str,
+                        size: Optional[int] = None, content_type: Optional[str] = None):
+    """
+    Stores an upload (see save_uploaded_file) and auto-transcribes audio recordings.
+    digest / size were taken while the file was stored, so it is not read again here.
+    Returns False if the user does not exist.
+    """
+    try:
+        if not save_uploaded_file(db, user_id, file_type, file_path, digest, size):
+            return False
+        db.commit()
+    except IntegrityError:
+        # Two uploads of the same doc_type raced (uq_user_document_type): the row exists now,
+        # so replace it like any re-upload
+        db.rollback()
+        save_uploaded_file(db, user_id, file_type, file_path, digest, size)
+        db.commit()
+    if file_type not in models.KNOWN_FILE_TYPES:
+        return True
+
+    # Auto-transcribe if it's a community recording or audio
+    if file_type == "community_recording" or (content_type or "").startswith("audio/") or file_path.endswith(AUDIO_EXTENSIONS):
+        try:
+            key = key_from_path(file_path)
+            with span("upload.transcribe", file_type=file_type):
+                with storage.local_copy(key) as local_path:
+                    transcript = transcribe_audio(local_path)
+
+                # Save transcript next to the recording as a .txt sidecar
+                txt_key = os.path.splitext(key)[0] + ".txt"
+                storage.save(txt_key, io.BytesIO(transcript.encode("utf-8")), content_type="text/plain")
+            logger.info("Transcription saved", extra={"path": path_for(txt_key)})
+        except Exception as e:
+            logger.warning("Auto-transcription failed", extra={"path": file_path, "error": str(e)})
+    return True
+
 @app.post("/api/v1/identity/tier2/upload/{user_id}")
-async def upload_tier2_doc(user_id: int, db: GetDB, file: UploadFile = File(...), file_type: str = "document"):
-    upload_dir = f"uploads/{user_id}"
-    os.makedirs(upload_dir, exist_ok=True)
-    safe_name = file.filename.replace(" ", "_")
-    file_path = f"{upload_dir}/{file_type}_{safe_name}"
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-        
-    db_user = db.query(models.User).filter(models.User.id == user_id).first()
-    if db_user:
-        field_map = {
-            "profile_photo": "profile_photo_file_path",
-            "aadhaar": "aadhaar_file_path",
-            "pan_card": "pan_card_file_path",
-            "training_letter": "training_letter_file_path",
-            "apprenticeship_proof": "apprenticeship_proof_file_path",
-            "local_authority_proof": "local_authority_proof_file_path",
-            "daily_task_photo": "daily_task_photo_file_path",
-            "work_video": "work_video_file_path",
-            "community_recording": "community_recording_file_path"
-        }
-        if file_type in field_map:
-            setattr(db_user, field_map[file_type], file_path)
-            db.commit()
-            
-            # Auto-transcribe if it's a community recording or audio
-            if file_type == "community_recording" or file.content_type.startswith("audio/") or file.filename.endswith((".webm", ".mp3", ".wav", ".m4a")):
-                try:
-                    print(f"Auto-transcribing {file_path}...")
-                    transcript = transcribe_audio(file_path)
-                    
-                    # Save transcript to .txt file
-                    txt_path = os.path.splitext(file_path)[0] + ".txt"
-                    with open(txt_path, "w", encoding="utf-8") as f:
-                        f.write(transcript)
-                    print(f"Transcription saved to {txt_path}")
-                except Exception as e:
-                    print(f"Auto-transcription failed: {e}")
+def upload_tier2_doc(user_id: int, db: GetDB, file: UploadFile = File(...), file_type: str = "document"):
+    try:
+        key = build_key(user_id, file_type, file.filename or "")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="file_type must be lowercase letters and underscores")
+    metric_type = file_type if file_type in models.KNOWN_FILE_TYPES else "other"
+    # Hashed while it is stored, so work submissions never read the file again
+    reader = HashingReader(file.file)
+    with span("upload.store", file_type=metric_type, backend=storage.name), UPLOAD_LATENCY.time(file_type=metric_type):
+        file_path = storage.save(key, reader, content_type=file.content_type)
+    UPLOAD_BYTES.inc(reader.size, file_type=metric_type)
+
+    if not record_uploaded_doc(db, user_id, file_type, file_path, reader.hexdigest(), reader.size, content_type=file.content_type):
+        raise HTTPException(status_code=404, detail="User not found")
 
     return {"filename": file.filename, "file_path": file_path}
 
-@app.post("/api/v1/work/submit/{user_id}")
-def submit_work(user_id: int, request: WorkSubmissionRequest, db: GetDB):
-    wallet = db.query(models.SkillWallet).filter(models.SkillWallet.user_id == user_id).first()
-    if not wallet: raise HTTPException(status_code=404, detail="Wallet not initialized")
+class PresignUploadRequest(BaseModel):
+    filename: str
+    file_type: str = "document"
+    content_type: Optional[str] = None
+
+class CompleteUploadRequest(BaseModel):
+    file_path: str
+    file_type: str = "document"
+    content_type: Optional[str] = None
+
+@app.post("/api/v1/identity/tier2/presign/{user_id}")
+def presign_tier2_upload(user_id: int, request: PresignUploadRequest, db: GetDB):
+    """
+    Step 1 of a direct upload: returns a presigned PUT URL so large files
+    (work videos) go straight to storage instead of through this process.
+    """
+    user = db.query(models.User.id).filter(models.User.id == user_id).first()
+    if not user: raise HTTPException(status_code=404, detail="User not found")
+
+    try:
+        key = build_key(user_id, request.file_type, request.filename)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="file_type must be lowercase letters and underscores")
+    headers = {"Content-Type": request.content_type} if request.content_type else {}
+    return {
+        "upload_url": storage.presign_put(key, content_type=request.content_type),
+        "method": "PUT",
+        "headers": headers,
+        "file_path": path_for(key),
+        "expires_in": settings.STORAGE_PRESIGN_EXPIRY_SECONDS
+    }
+
+@app.post("/api/v1/identity/tier2/complete/{user_id}")
+def complete_tier2_upload(user_id: int, request: CompleteUploadRequest, db: GetDB):
+    """
+    Step 2 of a direct upload: the client calls this once the PUT succeeded.
+    """
+    if request.file_type not in models.KNOWN_FILE_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unknown file_type {request.file_type}")
+    # Normalise before the ownership check, so "12/../13/x" can't pass as user 12's file
+    try:
+        key = safe_key(key_from_path(request.file_path))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid file path")
+    if not key.startswith(f"{user_id}/"):
+        raise HTTPException(status_code=400, detail="File does not belong to this user")
+    # The bytes went straight to storage: read them back once, here, rather than on every submission
+    digest = storage.hash_object(key)
+    if digest is None:
+        raise HTTPException(status_code=404, detail="Upload not found in storage")
+
+    if not record_uploaded_doc(db, user_id, request.file_type, path_for(key), digest, content_type=request.content_type):
+        raise HTTPException(status_code=404, detail="User not found")
+    return {"message": "Upload recorded", "file_path": path_for(key), "file_type": request.file_type}
+
+@app.put("/api/v1/storage/upload", include_in_schema=False)
+async def put_signed_upload(request: Request, key: str, expires: int, signature: str):
+    """
+    Target of presigned PUT URLs when STORAGE_BACKEND=local.
+    """
+    if storage.name != "local":
+        raise HTTPException(status_code=404)
+    if not verify_local_upload(key, expires, signature):
+        raise HTTPException(status_code=403, detail="Invalid or expired upload signature")
+    # Keys are normalised when signed; anything else predates that check
+    try:
+        if safe_key(key) != key:
+            raise ValueError(key)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid storage key")
+
+    received = 0
+    with UPLOAD_LATENCY.time(file_type="presigned"):
+        with storage.open_for_write(key) as buffer:
+            async for chunk in request.stream():
+                buffer.write(chunk)
+                received += len(chunk)
+    UPLOAD_BYTES.inc(received, file_type="presigned")
+    return {"file_path": path_for(key)}
+
+def build_eval_context(user):
+    return {
+        "local_area": user.local_area,
+        "district": user.district,
+        "state": user.state,
+        "age": user.age
+    }
+
+def apply_evaluation(cred, eval_result):
+    cred.skill_trust_score = eval_result.get("score", 300)
+    cred.transcription = eval_result.get("transcription", "No audio summary")
+    cred.evaluation_feedback = json.dumps(eval_result.get("feedback", {}))
+
+    if cred.skill_trust_score >= 500:
+        cred.is_verified = True
+        cred.verification_status = "VERIFIED"
+
+def credential_status_event(cred):
+    """
+    Channel and payload of a "credential.status" push. Build it before db.commit()
+    (commit expires cred) and publish() after, so clients that re-fetch see the new state.
+    """
+    return f"wallet:{cred.skill_wallet_id}", {
+        "credential_id": cred.id,
+        "skill_name": cred.skill_name,
+        "status": cred.verification_status,
+        "is_verified": cred.is_verified,
+        "score": cred.skill_trust_score
+    }
+
+def generate_token_id():
+    # 128 random bits, so inserts never trip the token_id unique constraint
+    return f"TOKEN_{uuid.uuid4().hex.upper()}"
+
+def find_existing_credential(db: Session, wallet_id: int, idempotency_key: Optional[str], proof_hash: Optional[str], audio_hash: Optional[str]):
+    query = db.query(models.SkillCredential).filter(models.SkillCredential.skill_wallet_id == wallet_id)
+    if idempotency_key:
+        existing = query.filter(models.SkillCredential.idempotency_key == idempotency_key).first()
+        if existing:
+            return existing
+    if proof_hash is None and audio_hash is None:
+        return None
+    return query.filter(
+        models.SkillCredential.proof_hash == proof_hash,
+        models.SkillCredential.audio_hash == audio_hash
+    ).first()
+
+def submission_hashes(db, submissions):
+    """
+    (proof_hash, audio_hash) per submission, from the hashes recorded at upload.
+    (None, None) when neither file was given: those submissions are never merged by content.
+    """
+    hashes = file_hashes(db, [path for item in submissions for path in (item.image_url, item.audio_file_url)])
+    pairs = []
+    for item in submissions:
+        pair = (hashes[item.image_url], hashes[item.audio_file_url])
+        pairs.append(pair if any(pair) else (None, None))
+    return pairs
+
+def needs_regrading(cred):
+    """An ungraded credential old enough that its evaluation must have failed (AI error, lost job)."""
+    if cred.verification_status != "PENDING" or cred.is_verified or cred.evaluation_feedback is not None:
+        return False
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.EVALUATION_RETRY_AFTER_SECONDS)
+    return cred.issued_date is not None and cred.issued_date < cutoff
+
+def existing_credential_response(cred):
+    return {
+        "message": "Already submitted",
+        "credential_id": cred.id,
+        "status": cred.verification_status,
+        "score": cred.skill_trust_score,
+        "feedback": json.loads(cred.evaluation_feedback) if cred.evaluation_feedback else None,
+        "duplicate": True
+    }
 
-    cred = models.SkillCredential(
+def new_credential(wallet, request: WorkSubmissionRequest, idempotency_key=None, proof_hash=None, audio_hash=None):
+    return models.SkillCredential(
         skill_wallet_id=wallet.id,
         skill_name=request.skill_name,
-        token_id=f"TOKEN_{random.randint(1000,9999)}",
+        token_id=generate_token_id(),
         proof_url=request.image_url,
         audio_description_url=request.audio_file_url,
         language_code=request.language_code,
         transcription=request.description,
-        verification_status="PENDING"
+        verification_status="PENDING",
+        idempotency_key=idempotency_key,
+        proof_hash=proof_hash,
+        audio_hash=audio_hash
     )
-    db.add(cred)
-    db.commit()
-    db.refresh(cred)
+
+@evaluation_queue.register
+def run_evaluation_job(credential_id: int, eval_kwargs: dict):
+    """
+    Background grading for EVALUATION_MODE=background. Leaves the credential PENDING on failure.
+    """
+    db = SessionLocal()
+    pending = None
+    try:
+        cred = db.get(models.SkillCredential, credential_id)
+        if not cred:
+            return
+        pending = credential_status_event(cred)
+        eval_result = evaluate_skill_with_google(**eval_kwargs)
+        apply_evaluation(cred, eval_result)
+        channel, event = credential_status_event(cred)
+        db.commit()
+        publish(channel, "credential.status", event)
+    except Exception as e:
+        logger.exception("AI evaluation failed")
+        db.rollback()
+        if pending is not None:
+            # Lets the client stop waiting; the credential stays PENDING
+            publish(pending[0], "credential.evaluation_failed", pending[1])
+    finally:
+        db.close()
+
+@app.post("/api/v1/work/submit/{user_id}")
+def submit_work(user_id: int, request: WorkSubmissionRequest, db: GetDB, idempotency_key: Annotated[Optional[str], Header()] = None):
+    wallet = db.query(models.SkillWallet).filter(models.SkillWallet.user_id == user_id).first()
+    if not wallet: raise HTTPException(status_code=404, detail="Wallet not initialized")
+
+    # Retries (same Idempotency-Key) and re-submissions of the same files return the original credential
+    proof_hash, audio_hash = submission_hashes(db, [request])[0]
+    existing = find_existing_credential(db, wallet.id, idempotency_key, proof_hash, audio_hash)
+    if existing and not needs_regrading(existing):
+        return existing_credential_response(existing)
+
+    if existing:
+        # Its first evaluation failed; grade it again rather than report PENDING forever
+        cred = existing
+    else:
+        cred = new_credential(wallet, request, idempotency_key, proof_hash, audio_hash)
+        db.add(cred)
+        try:
+            db.commit()
+        except IntegrityError:
+            # A concurrent retry (same key) or submission of the same files won the race
+            db.rollback()
+            existing = find_existing_credential(db, wallet.id, idempotency_key, proof_hash, audio_hash)
+            if not existing: raise
+            return existing_credential_response(existing)
+        db.refresh(cred)
 
     user = db.query(models.User).filter(models.User.id == user_id).first()
-    context_data = {
-        "local_area": user.local_area,
-        "district": user.district,
-        "state": user.state,
-        "age": user.age
+    eval_kwargs = {
+        "work_proof_path": request.image_url,
+        "audio_path": request.audio_file_url,
+        "profession": user.profession or "General Worker",
+        "context_data": build_eval_context(user),
+        "user_description": request.description or ""
     }
+
+    if settings.EVALUATION_MODE == "background":
+        evaluation_queue.submit(run_evaluation_job, cred.id, eval_kwargs)
+        return {"message": "Submitted for evaluation", "credential_id": cred.id, "status": cred.verification_status}
     
     try:
         # Trigger Forensic Check + Grading
-        eval_result = evaluate_skill_with_google(
-            work_proof_path=request.image_url,
-            audio_path=request.audio_file_url,
-            profession=user.profession or "General Worker",
-            context_data=context_data,
-            user_description=request.description or ""
-        )
-        
-        cred.skill_trust_score = eval_result.get("score", 300)
-        cred.transcription = eval_result.get("transcription", "No audio summary")
-        cred.evaluation_feedback = json.dumps(eval_result.get("feedback", {}))
-        
-        if cred.skill_trust_score >= 500:
-            cred.is_verified = True
-            cred.verification_status = "VERIFIED"
+        eval_result = evaluate_skill_with_google(**eval_kwargs)
         
+        apply_evaluation(cred, eval_result)
+        channel, event = credential_status_event(cred)
         db.commit()
-        return {"message": "Evaluated", "score": cred.skill_trust_score, "feedback": eval_result.get("feedback")}
+        publish(channel, "credential.status", event)
+        return {"message": "Evaluated", "credential_id": cred.id, "score": cred.skill_trust_score, "feedback": eval_result.get("feedback")}
         
     except Exception as e:
-        print(f"AI Failure: {e}")
+        logger.exception("AI evaluation failed")
         return {"message": "Submitted but AI failed. Saved as pending.", "credential_id": cred.id}
 
+class BatchWorkSubmissionRequest(BaseModel):
+    submissions: List[WorkSubmissionRequest] = Field(min_length=1, max_length=50)
+
+@app.post("/api/v1/work/submit_batch/{user_id}")
+def submit_work_batch(user_id: int, request: BatchWorkSubmissionRequest, db: GetDB, idempotency_key: Annotated[Optional[str], Header()] = None):
+    """
+    Submits several work proofs at once.
+    All credentials are inserted in one transaction, then graded in batches.
+    The response is NDJSON: one line per proof, streamed as each batch finishes.
+    Item i of a batch uses the idempotency key "<Idempotency-Key>:<i>".
+    """
+    wallet = db.query(models.SkillWallet).filter(models.SkillWallet.user_id == user_id).first()
+    if not wallet: raise HTTPException(status_code=404, detail="Wallet not initialized")
+    user = db.query(models.User).filter(models.User.id == user_id).first()
+
+    duplicates = {} # index -> existing credential
+    pending = [] # (index, new credential or one to grade again)
+    seen_hashes = {}
+    for index, (item, hashes) in enumerate(zip(request.submissions, submission_hashes(db, request.submissions))):
+        item_key = f"{idempotency_key}:{index}" if idempotency_key else None
+        existing = find_existing_credential(db, wallet.id, item_key, *hashes)
+        if existing and not needs_regrading(existing):
+            duplicates[index] = existing
+        elif hashes in seen_hashes:
+            # Same files twice in one batch - the first copy is graded, the rest point at it
+            duplicates[index] = seen_hashes[hashes]
+        else:
+            cred = existing or new_credential(wallet, item, item_key, *hashes)
+            if hashes != (None, None):
+                seen_hashes[hashes] = cred
+            pending.append((index, cred))
+
+    db.add_all([cred for _, cred in pending])
+    try:
+        db.commit()
+    except IntegrityError:
+        # Same Idempotency-Key or the same files submitted concurrently
+        db.rollback()
+        raise HTTPException(status_code=409, detail="The same submission is already in progress")
+
+    duplicate_lines = [
+        json.dumps({"index": index, **existing_credential_response(cred)}, default=str) + "\n"
+        for index, cred in sorted(duplicates.items())
+    ]
+    credential_ids = [cred.id for _, cred in pending]
+    original_indexes = [index for index, _ in pending]
+
+    profession = user.profession or "General Worker"
+    context_data = build_eval_context(user)
+    items = [
+        {
+            "work_proof_path": request.submissions[index].image_url,
+            "audio_path": request.submissions[index].audio_file_url,
+            "profession": profession,
+            "context_data": context_data,
+            "user_description": request.submissions[index].description or ""
+        }
+        for index in original_indexes
+    ]
+
+    def stream_results():
+        yield from duplicate_lines
+
+        # The request-scoped session is closed once the response starts, so use our own
+        stream_db = SessionLocal()
+        done = set()
+        try:
+            for position, eval_result in evaluate_skills_batch(items):
+                cred = stream_db.get(models.SkillCredential, credential_ids[position])
+                apply_evaluation(cred, eval_result)
+                channel, event = credential_status_event(cred)
+                stream_db.commit()
+                publish(channel, "credential.status", event)
+                done.add(position)
+                yield json.dumps({
+                    "index": original_indexes[position],
+                    "credential_id": event["credential_id"],
+                    "status": event["status"],
+                    "score": event["score"],
+                    "feedback": eval_result.get("feedback")
+                }) + "\n"
+        except Exception as e:
+            logger.exception("AI evaluation failed")
+            stream_db.rollback()
+            for position, cred_id in enumerate(credential_ids):
+                if position not in done:
+                    yield json.dumps({"index": original_indexes[position], "credential_id": cred_id, "status": "PENDING"}) + "\n"
+        finally:
+            stream_db.close()
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
 @app.post("/api/v1/work/submit_grade/{credential_id}")
 def submit_grade(credential_id: int, grade: GradeSubmission, db: GetDB):
     cred = db.query(models.SkillCredential).filter(models.SkillCredential.id == credential_id).first()
@@ -293,55 +909,59 @@ def submit_grade(credential_id: int, grade: GradeSubmission, db: GetDB):
     cred.is_verified = True
     if grade.recommendations:
         cred.evaluation_feedback = json.dumps(grade.recommendations)
+    channel, event = credential_status_event(cred)
     db.commit()
+    publish(channel, "credential.status", event)
     return {"message": "Grade manually updated"}
 
 @app.get("/api/v1/user/proofs/{user_id}")
 def get_user_proofs(user_id: int, db: GetDB):
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = db.query(models.User).options(
+        joinedload(models.User.documents),
+        joinedload(models.User.skill_wallet).selectinload(models.SkillWallet.credentials)
+    ).filter(models.User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    documents = {doc.doc_type: doc.path for doc in user.documents}
     proofs = []
-    if user.daily_task_photo_file_path:
+    if documents.get("daily_task_photo"):
         proofs.append({
             "title": "Daily Task",
             "skill": "Work Discipline",
             "grade_score": 85, 
             "transcription": "Photo evidence of daily work.",
-            "visualProofUrl": user.daily_task_photo_file_path,
+            "visualProofUrl": documents["daily_task_photo"],
             "language_code": "en"
         })
 
-    if user.work_video_file_path:
+    if documents.get("work_video"):
         proofs.append({
             "title": "Work Video",
             "skill": "Practical Demonstration",
             "grade_score": 90, 
             "transcription": "Video evidence of work.",
-            "visualProofUrl": user.work_video_file_path,
+            "visualProofUrl": documents["work_video"],
             "language_code": "en"
         })
 
-    if user.community_recording_file_path:
-        is_audio = user.community_recording_file_path.endswith(('.webm', '.mp3', '.wav', '.m4a'))
+    recording_path = documents.get("community_recording")
+    if recording_path:
+        is_audio = recording_path.endswith(AUDIO_EXTENSIONS)
         transcription_text = "Your skill story."
         
         # Check for sidecar text file (generated by auto-transcription)
-        txt_path = os.path.splitext(user.community_recording_file_path)[0] + ".txt"
-        if os.path.exists(txt_path):
-            try:
-                with open(txt_path, 'r', encoding='utf-8') as f:
-                    transcription_text = f.read()
-            except Exception as e:
-                print(f"Error reading transcription text: {e}")
-        elif not is_audio and os.path.exists(user.community_recording_file_path):
-             # Legacy fallback: if the main file itself is text (unlikely now)
-            try:
-                with open(user.community_recording_file_path, 'r', encoding='utf-8') as f:
-                    transcription_text = f.read()
-            except Exception as e:
-                print(f"Error reading story text: {e}")
+        recording_key = key_from_path(recording_path)
+        txt_key = os.path.splitext(recording_key)[0] + ".txt"
+        try:
+            sidecar = storage.read_bytes(txt_key)
+            if sidecar is None and not is_audio:
+                # Legacy fallback: if the main file itself is text (unlikely now)
+                sidecar = storage.read_bytes(recording_key)
+            if sidecar is not None:
+                transcription_text = sidecar.decode("utf-8")
+        except Exception as e:
+            logger.warning("Error reading transcription text", extra={"key": txt_key, "error": str(e)})
 
         proofs.append({
             "title": "My Skill Story",
@@ -349,7 +969,7 @@ def get_user_proofs(user_id: int, db: GetDB):
             "grade_score": 80,
             "transcription": transcription_text,
             "visualProofUrl": None,
-            "audioProofUrl": user.community_recording_file_path if is_audio else None,
+            "audioProofUrl": recording_path if is_audio else None,
             "language_code": "en"
         })
 
@@ -375,17 +995,34 @@ def get_skill_recommendations(user_id: int, db: GetDB):
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user: raise HTTPException(status_code=404)
 
-    profession = user.profession.lower() if user.profession else "general"
-    skill_database = {
-        "painter": [
-            {"title": "Texture Painting", "subtitle": "Earn ₹800/day", "icon_type": "pen_tool", "progress": 0, "badge": "High Value"},
-            {"title": "Damp Proofing", "subtitle": "High Demand", "icon_type": "shield", "progress": 0, "badge": "Urgent"}
-        ],
-        "general": [
-            {"title": "Work Safety", "subtitle": "Essential", "icon_type": "shield", "progress": 0, "badge": "Mandatory"}
-        ]
-    }
-    recommended = skill_database["painter"] if "painter" in profession else skill_database["general"]
+    # Gaps named in the feedback of the user's most recent credentials
+    feedback = db.query(models.SkillCredential.evaluation_feedback).join(models.SkillWallet).filter(
+        models.SkillWallet.user_id == user_id,
+        models.SkillCredential.evaluation_feedback.isnot(None)
+    ).order_by(models.SkillCredential.issued_date.desc()).limit(settings.RECOMMENDATION_FEEDBACK_CREDENTIALS).all()
+    gaps = [feedback_gaps(row.evaluation_feedback) for row in feedback]
+
+    # Finished lessons are not recommended again; started ones show their progress
+    enrollments = db.query(models.LessonEnrollment.lesson_id, models.LessonEnrollment.progress_percent,
+                           models.LessonEnrollment.status).filter(models.LessonEnrollment.user_id == user_id).all()
+    progress = {e.lesson_id: e.progress_percent or 0 for e in enrollments}
+    completed = {e.lesson_id for e in enrollments if e.status == "COMPLETED"}
+
+    recommendation_index.ensure_built()
+    matches = recommendation_index.top_k(user.profession or "", gaps, exclude=completed)
+    recommended = [{
+        "lesson_id": match.lesson.id,
+        "title": match.lesson.title,
+        "subtitle": f"{match.lesson.difficulty or 'Beginner'} · {match.lesson.duration_minutes or 15} min",
+        "icon_type": "video" if match.lesson.type == "video" else "file_text",
+        "progress": progress.get(match.lesson.id, 0),
+        # Most of the match came from the user's own feedback gaps
+        "badge": "Closes a Gap" if match.gap_score * 2 >= match.score else "For Your Trade",
+        "score": round(match.score, 4)
+    } for match in matches]
+    if not recommended:
+        # Nothing in the catalog matches yet
+        recommended = [{"title": "Work Safety", "subtitle": "Essential", "icon_type": "shield", "progress": 0, "badge": "Mandatory"}]
     return {"user_id": user_id, "profession": user.profession, "recommendations": recommended}
 
 # --------------------------------------------------------------------------
@@ -397,7 +1034,13 @@ def get_public_profile(wallet_hash: str, db: GetDB):
     Read-only public profile access via QR Code.
     Strictly filters out private data (Aadhaar, PAN, Phone).
     """
-    wallet = db.query(models.SkillWallet).filter(models.SkillWallet.wallet_hash == wallet_hash).first()
+    # Cohort rank comes along from the tables cohort_stats.py maintains
+    wallet, ranked, cohort = db.query(models.SkillWallet, models.WorkerScore, models.CohortStats).options(
+        joinedload(models.SkillWallet.owner),
+        selectinload(models.SkillWallet.credentials)
+    ).outerjoin(models.WorkerScore, models.WorkerScore.user_id == models.SkillWallet.user_id).outerjoin(
+        models.CohortStats, models.CohortStats.id == models.WorkerScore.cohort_id
+    ).filter(models.SkillWallet.wallet_hash == wallet_hash).first() or (None, None, None)
     if not wallet:
         raise HTTPException(status_code=404, detail="Skill Card not found")
     
@@ -424,6 +1067,7 @@ def get_public_profile(wallet_hash: str, db: GetDB):
         "member_since": wallet.created_at.strftime("%b %Y"),
         "verified_skills": verified_skills,
         "total_verified": len(verified_skills),
+        "cohort_standing": cohort_standing(cohort, ranked),
         "card_status": "Active" if len(verified_skills) > 0 else "Pending Activation"
     }
     
@@ -433,9 +1077,50 @@ def get_public_profile(wallet_hash: str, db: GetDB):
 # 8. SKILL BANK API
 # --------------------------------------------------------------------------
 
+def lesson_card(l):
+    return {
+        "id": l.id,
+        "title": l.title,
+        "description": l.description,
+        "type": l.type,
+        "price": l.price,
+        "teacher_name": l.teacher.name if l.teacher else "Unknown",
+        "teacher_profession": l.teacher.profession if l.teacher else "Instructor",
+        "duration_minutes": l.duration_minutes,
+        "language": l.language,
+        "difficulty": l.difficulty
+    }
+
+def session_card(s, reminder_session_ids):
+    return {
+        "id": s.id,
+        "title": s.title,
+        "description": s.description,
+        "scheduled_at": s.scheduled_at,
+        "price": s.price,
+        "teacher_name": s.teacher.name if s.teacher else "Unknown",
+        "meeting_link": s.meeting_link,
+        "language": s.language,
+        "difficulty": s.difficulty,
+        "capacity": s.capacity,
+        "seats_left": None if s.capacity is None else max(0, s.capacity - s.seats_taken),
+        "is_reminder_set": s.id in reminder_session_ids
+    }
+
+def reminder_session_ids_for(db: Session, user_id: Optional[int], sessions):
+    # One lookup for all of this user's reminders instead of one per session
+    if not user_id or not sessions:
+        return set()
+    return {
+        row[0] for row in db.query(models.LiveSessionReminder.session_id).filter(
+            models.LiveSessionReminder.user_id == user_id,
+            models.LiveSessionReminder.session_id.in_([s.id for s in sessions])
+        )
+    }
+
 @app.get("/api/v1/skillbank/lessons")
 def get_skill_lessons(db: GetDB, type: Optional[str] = None, language: Optional[str] = None, difficulty: Optional[str] = None):
-    query = db.query(models.SkillLesson)
+    query = db.query(models.SkillLesson).options(joinedload(models.SkillLesson.teacher))
     if type and type != 'All':
         query = query.filter(models.SkillLesson.type == type)
     if language and language != 'All':
@@ -448,25 +1133,11 @@ def get_skill_lessons(db: GetDB, type: Optional[str] = None, language: Optional[
     # SEED DATA REMOVED as per user request
     # ...
 
-    return [
-        {
-            "id": l.id,
-            "title": l.title,
-            "description": l.description,
-            "type": l.type,
-            "price": l.price,
-            "teacher_name": l.teacher.name if l.teacher else "Unknown",
-            "teacher_profession": l.teacher.profession if l.teacher else "Instructor",
-            "duration_minutes": l.duration_minutes,
-            "language": l.language,
-            "difficulty": l.difficulty
-        }
-        for l in lessons
-    ]
+    return [lesson_card(l) for l in lessons]
 
 @app.get("/api/v1/skillbank/sessions")
 def get_live_sessions(db: GetDB, user_id: Optional[int] = None, language: Optional[str] = None, difficulty: Optional[str] = None, teacher_id: Optional[int] = None):
-    query = db.query(models.LiveSession).filter(models.LiveSession.scheduled_at > datetime.utcnow())
+    query = db.query(models.LiveSession).options(joinedload(models.LiveSession.teacher)).filter(models.LiveSession.scheduled_at > datetime.utcnow())
     
     if language and language != 'All':
         query = query.filter(models.LiveSession.language == language)
@@ -476,31 +1147,58 @@ def get_live_sessions(db: GetDB, user_id: Optional[int] = None, language: Option
         query = query.filter(models.LiveSession.teacher_id == teacher_id)
         
     sessions = query.all()
-    
-    return [
-        {
-            "id": s.id,
-            "title": s.title,
-            "description": s.description,
-            "scheduled_at": s.scheduled_at,
-            "price": s.price,
-            "teacher_name": s.teacher.name if s.teacher else "Unknown",
-            "meeting_link": s.meeting_link,
-            "language": s.language,
-            "difficulty": s.difficulty,
-            "is_reminder_set": db.query(models.LiveSessionReminder).filter(
-                models.LiveSessionReminder.session_id == s.id,
-                models.LiveSessionReminder.user_id == user_id
-            ).first() is not None if user_id else False
-        }
-        for s in sessions
-    ]
+    reminder_session_ids = reminder_session_ids_for(db, user_id, sessions)
+    return [session_card(s, reminder_session_ids) for s in sessions]
+
+# --- FACETED CATALOG ---
+# Counts per type / language / difficulty and filtered pages, answered from the
+# in-memory bitmap snapshot (facet_utils.py); only the page's rows are loaded.
+def parse_facet_values(value: Optional[str]):
+    """"Hindi,English" -> ["Hindi", "English"]; empty or "All" -> None (no filter)."""
+    if not value:
+        return None
+    values = [v.strip() for v in value.split(",") if v.strip() and v.strip() != "All"]
+    return values or None
+
+@app.get("/api/v1/skillbank/catalog/{kind}")
+def get_catalog(kind: str, db: GetDB, type: Optional[str] = None, language: Optional[str] = None,
+                difficulty: Optional[str] = None, user_id: Optional[int] = None,
+                offset: int = Query(0, ge=0, le=settings.CATALOG_MAX_OFFSET), after: Optional[int] = None,
+                limit: int = Query(settings.CATALOG_PAGE_SIZE, ge=1, le=settings.CATALOG_MAX_PAGE_SIZE)):
+    if kind not in FACETS: raise HTTPException(status_code=404, detail="Unknown catalog")
+
+    facet_catalog.ensure_built()
+    snapshot = facet_catalog.snapshot(kind)
+    requested = {"type": type, "language": language, "difficulty": difficulty}
+    filters = {facet: parse_facet_values(requested[facet]) for facet in FACETS[kind]}
+    # Sessions that already started are not in the catalog (as in /skillbank/sessions)
+    base = snapshot.upcoming(datetime.utcnow()) if kind == "sessions" else None
+    matching, counts = snapshot.query(filters, base)
+    # after=<last item id> continues from the previous page without walking the skipped slots
+    remaining = matching if after is None else snapshot.after(matching, after)
+    ids = snapshot.page(remaining, offset, limit)
+    next_after = ids[-1] if ids and offset + limit < remaining.bit_count() else None
+
+    items = []
+    if ids:
+        model = models.SkillLesson if kind == "lessons" else models.LiveSession
+        rows = {row.id: row for row in db.query(model).options(joinedload(model.teacher)).filter(model.id.in_(ids))}
+        if kind == "lessons":
+            items = [lesson_card(rows[i]) for i in ids if i in rows]
+        else:
+            sessions = [rows[i] for i in ids if i in rows]
+            reminder_session_ids = reminder_session_ids_for(db, user_id, sessions)
+            items = [session_card(s, reminder_session_ids) for s in sessions]
+
+    return {"kind": kind, "version": snapshot.version, "total": matching.bit_count(),
+            "offset": offset, "limit": limit, "next_after": next_after, "facets": counts, "items": items}
 
 class CreateReminderRequest(BaseModel):
     session_id: int
     phone_number: str
-    date: str
-    time: str
+    date: str # YYYY-MM-DD
+    time: str # HH:MM AM/PM (or 24h HH:MM)
+    timezone: Optional[str] = None # IANA name, e.g. "Asia/Kolkata"; defaults to REMINDER_TIMEZONE
 
 @app.post("/api/v1/skillbank/reminders/{user_id}")
 def create_reminder(user_id: int, request: CreateReminderRequest, db: GetDB):
@@ -509,26 +1207,28 @@ def create_reminder(user_id: int, request: CreateReminderRequest, db: GetDB):
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
+    try:
+        remind_at = parse_reminder_time(request.date, request.time, request.timezone)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid reminder date/time: {e}")
+
     reminder = models.LiveSessionReminder(
         user_id=user_id,
         session_id=request.session_id,
         phone_number=request.phone_number,
         reminder_date=request.date,
-        reminder_time=request.time
+        reminder_time=request.time,
+        remind_at=remind_at,
+        status="PENDING"
     )
     db.add(reminder)
     db.commit()
-    return {"message": "Reminder set successfully", "reminder_id": reminder.id}
+    if reminder_dispatcher.running:
+        # Due soon: don't wait for the next refill
+        reminder_dispatcher.schedule(reminder.id, remind_at)
+    return {"message": "Reminder set successfully", "reminder_id": reminder.id, "remind_at": remind_at}
 
 
-class CreateLessonRequest(BaseModel):
-    title: str
-    description: str
-    type: str # 'video' or 'document'
-    price: int
-    language: str = "English"
-    difficulty: str = "Beginner"
-
 @app.post("/api/v1/skillbank/create_lesson/{user_id}")
 def create_skill_lesson(user_id: int, request: CreateLessonRequest, db: GetDB):
     user = db.query(models.User).filter(models.User.id == user_id).first()
@@ -546,6 +1246,10 @@ def create_skill_lesson(user_id: int, request: CreateLessonRequest, db: GetDB):
     )
     db.add(lesson)
     db.commit()
+    facet_catalog.add("lessons", lesson)
+    recommendation_index.add_lesson(lesson_doc(
+        lesson.id, request.title, request.description, request.type, request.price,
+        lesson.duration_minutes, request.difficulty, request.language))
     return {"message": "Lesson created", "lesson_id": lesson.id}
 
 class CreateSessionRequest(BaseModel):
@@ -555,6 +1259,7 @@ class CreateSessionRequest(BaseModel):
     price: int
     language: str = "English"
     difficulty: str = "Beginner"
+    capacity: Optional[int] = Field(default=None, ge=1) # None = unlimited seats
 
 @app.post("/api/v1/skillbank/create_session/{user_id}")
 def create_live_session(user_id: int, request: CreateSessionRequest, db: GetDB):
@@ -569,12 +1274,36 @@ def create_live_session(user_id: int, request: CreateSessionRequest, db: GetDB):
         price=request.price,
         meeting_link=f"https://meet.skillwallet.com/{random.randint(10000,99999)}",
         language=request.language,
-        difficulty=request.difficulty
+        difficulty=request.difficulty,
+        capacity=request.capacity
     )
     db.add(session)
     db.commit()
+    facet_catalog.add("sessions", session)
     return {"message": "Session scheduled", "session_id": session.id, "meeting_link": session.meeting_link}
 
+def set_session_active(db: Session, user_id: int, session_id: int, active: bool):
+    session = db.query(models.LiveSession).filter(
+        models.LiveSession.id == session_id,
+        models.LiveSession.teacher_id == user_id
+    ).first()
+    if not session: raise HTTPException(status_code=404, detail="Session not found")
+
+    session.is_active = active
+    event = {"session_id": session.id, "title": session.title, "is_active": active, "meeting_link": session.meeting_link}
+    db.commit()
+    # Learners following this session (events stream) are told to join / leave
+    publish(f"session:{session_id}", "session.started" if active else "session.ended", event)
+    return {"message": "Session started" if active else "Session ended", **event}
+
+@app.post("/api/v1/skillbank/session/{user_id}/{session_id}/start")
+def start_live_session(user_id: int, session_id: int, db: GetDB):
+    return set_session_active(db, user_id, session_id, True)
+
+@app.post("/api/v1/skillbank/session/{user_id}/{session_id}/end")
+def end_live_session(user_id: int, session_id: int, db: GetDB):
+    return set_session_active(db, user_id, session_id, False)
+
 # --- LEARNING DASHBOARD & ENROLLMENT ENDPOINTS ---
 
 # --- TEACHING DASHBOARD ENDPOINTS ---
@@ -598,46 +1327,50 @@ def get_teaching_dashboard(user_id: int, db: GetDB):
     
     # 2. Calculate Stats
     
-    # Total Students: Unique students enrolled in any lesson OR session by this teacher
-    # Get lesson IDs
     lesson_ids = [l.id for l in videos] + [l.id for l in docs]
-    lesson_students = db.query(models.LessonEnrollment.user_id).filter(
-        models.LessonEnrollment.lesson_id.in_(lesson_ids)
-    ).distinct().all() if lesson_ids else []
-    
-    # Get session IDs
     session_ids = [s.id for s in live_classes]
-    session_students = db.query(models.SessionEnrollment.user_id).filter(
-        models.SessionEnrollment.session_id.in_(session_ids)
-    ).distinct().all() if session_ids else []
-    
-    unique_student_ids = set([s[0] for s in lesson_students] + [s[0] for s in session_students])
-    total_students = len(unique_student_ids)
+
+    # Total Students: Unique students enrolled in any lesson OR session by this teacher.
+    # Joined on teacher_id (not IN lists) so both halves stay index searches; UNION dedupes in SQL.
+    lesson_students = db.query(models.LessonEnrollment.user_id).join(
+        models.SkillLesson, models.SkillLesson.id == models.LessonEnrollment.lesson_id
+    ).filter(models.SkillLesson.teacher_id == user_id)
+    session_students = db.query(models.SessionEnrollment.user_id).join(
+        models.LiveSession, models.LiveSession.id == models.SessionEnrollment.session_id
+    ).filter(models.LiveSession.teacher_id == user_id)
+    total_students = db.query(func.count()).select_from(
+        lesson_students.union(session_students).subquery()
+    ).scalar()
     
+    # Enrollment counts per lesson / session, one grouped query each
+    lesson_counts = dict(db.query(models.LessonEnrollment.lesson_id, func.count(models.LessonEnrollment.id)).filter(
+        models.LessonEnrollment.lesson_id.in_(lesson_ids)
+    ).group_by(models.LessonEnrollment.lesson_id).all()) if lesson_ids else {}
+    session_counts = dict(db.query(models.SessionEnrollment.session_id, func.count(models.SessionEnrollment.id)).filter(
+        models.SessionEnrollment.session_id.in_(session_ids)
+    ).group_by(models.SessionEnrollment.session_id).all()) if session_ids else {}
+
     # Earnings
     # Lesson earnings
     lesson_earnings = 0
     for l in videos + docs:
-        enrollment_count = db.query(models.LessonEnrollment).filter(models.LessonEnrollment.lesson_id == l.id).count()
-        lesson_earnings += (l.price or 0) * enrollment_count
+        lesson_earnings += (l.price or 0) * lesson_counts.get(l.id, 0)
         
     # Live Session earnings
     session_earnings = 0
     for s in live_classes:
-        enrollment_count = db.query(models.SessionEnrollment).filter(models.SessionEnrollment.session_id == s.id).count()
-        session_earnings += (s.price or 0) * enrollment_count
+        session_earnings += (s.price or 0) * session_counts.get(s.id, 0)
         
     total_earnings = lesson_earnings + session_earnings
 
     # Process Live Classes for response (add attendee count)
     processed_live_classes = []
     for s in live_classes:
-        attendee_count = db.query(models.SessionEnrollment).filter(models.SessionEnrollment.session_id == s.id).count()
         processed_live_classes.append({
             "id": s.id,
             "title": s.title,
             "scheduled_at": s.scheduled_at,
-            "attendees": attendee_count,
+            "attendees": session_counts.get(s.id, 0),
             "price": s.price
         })
 
@@ -686,43 +1419,22 @@ def get_teaching_dashboard(user_id: int, db: GetDB):
 
 @app.post("/api/v1/skillbank/enroll/lesson/{user_id}/{lesson_id}")
 def enroll_in_lesson(user_id: int, lesson_id: int, db: GetDB):
-    # Check if already enrolled
-    existing = db.query(models.LessonEnrollment).filter(
-        models.LessonEnrollment.user_id == user_id,
-        models.LessonEnrollment.lesson_id == lesson_id
-    ).first()
-    
-    if existing:
-        return {"message": "Already enrolled", "enrollment_id": existing.id}
-        
-    enrollment = models.LessonEnrollment(
-        user_id=user_id,
-        lesson_id=lesson_id,
-        status="ENROLLED",
-        progress_percent=0
-    )
-    db.add(enrollment)
-    db.commit()
-    return {"message": "Enrolled successfully", "enrollment_id": enrollment.id}
+    # Insert-or-ignore on uq_lesson_enrollment_user_lesson, safe under concurrent clicks
+    registration = register_for_lesson(db, user_id, lesson_id)
+    if registration.status == ALREADY_REGISTERED:
+        return {"message": "Already enrolled", "enrollment_id": registration.enrollment_id}
+    return {"message": "Enrolled successfully", "enrollment_id": registration.enrollment_id}
 
 @app.post("/api/v1/skillbank/enroll/session/{user_id}/{session_id}")
 def enroll_in_session(user_id: int, session_id: int, db: GetDB):
-    existing = db.query(models.SessionEnrollment).filter(
-        models.SessionEnrollment.user_id == user_id,
-        models.SessionEnrollment.session_id == session_id
-    ).first()
-    
-    if existing:
-        return {"message": "Already registered", "enrollment_id": existing.id}
-        
-    enrollment = models.SessionEnrollment(
-        user_id=user_id,
-        session_id=session_id,
-        status="REGISTERED"
-    )
-    db.add(enrollment)
-    db.commit()
-    return {"message": "Registered successfully", "enrollment_id": enrollment.id}
+    registration = register_for_session(db, user_id, session_id)
+    if registration.status == NOT_FOUND:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if registration.status == FULL:
+        raise HTTPException(status_code=409, detail="Session is full")
+    if registration.status == ALREADY_REGISTERED:
+        return {"message": "Already registered", "enrollment_id": registration.enrollment_id}
+    return {"message": "Registered successfully", "enrollment_id": registration.enrollment_id}
 
 class UpdateProgressRequest(BaseModel):
     progress: int
@@ -743,9 +1455,33 @@ def update_lesson_progress(enrollment_id: int, request: UpdateProgressRequest, d
     db.commit()
     return {"message": "Progress updated"}
 
+class ProgressHeartbeat(BaseModel):
+    enrollment_id: int
+    progress: int = Field(ge=0, le=100)
+    status: str
+    timestamp: Optional[datetime] = None # When the player recorded it; defaults to arrival time
+
+class BatchProgressRequest(BaseModel):
+    events: List[ProgressHeartbeat] = Field(min_length=1)
+
+@app.post("/api/v1/skillbank/progress/batch/{user_id}", status_code=202)
+def record_progress_batch(user_id: int, request: BatchProgressRequest):
+    """
+    Course player heartbeats. Buffered and coalesced per enrollment, then written
+    in bulk every PROGRESS_FLUSH_SECONDS (progress_buffer.py); no database access here.
+    """
+    if len(request.events) > settings.PROGRESS_BATCH_MAX_EVENTS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.PROGRESS_BATCH_MAX_EVENTS} events per batch")
+    accepted = progress_buffer.record(user_id, [
+        (e.enrollment_id, e.progress, e.status, e.timestamp) for e in request.events
+    ])
+    return {"accepted": accepted, "flush_interval_seconds": settings.PROGRESS_FLUSH_SECONDS}
+
 @app.get("/api/v1/skillbank/enrollments/{user_id}")
 def get_user_enrollments(user_id: int, db: GetDB):
-    enrollments = db.query(models.LessonEnrollment).filter(models.LessonEnrollment.user_id == user_id).all()
+    enrollments = db.query(models.LessonEnrollment).options(
+        joinedload(models.LessonEnrollment.lesson).joinedload(models.SkillLesson.teacher)
+    ).filter(models.LessonEnrollment.user_id == user_id).all()
     return [
         {
             "id": e.id,
@@ -770,7 +1506,9 @@ def get_user_enrollments(user_id: int, db: GetDB):
 @app.get("/api/v1/dashboard/stats/{user_id}")
 def get_dashboard_stats(user_id: int, db: GetDB):
     # 1. Enrollment Stats
-    enrollments = db.query(models.LessonEnrollment).filter(models.LessonEnrollment.user_id == user_id).all()
+    enrollments = db.query(models.LessonEnrollment).options(
+        joinedload(models.LessonEnrollment.lesson)
+    ).filter(models.LessonEnrollment.user_id == user_id).all()
     
     total_enrolled = len(enrollments)
     not_started = len([e for e in enrollments if e.status == "ENROLLED" or e.progress_percent == 0])
@@ -815,10 +1553,15 @@ def get_dashboard_stats(user_id: int, db: GetDB):
     time_str = format_time(total_minutes)
 
     # 3. Skill Growth (Based on Credentials)
-    # Get user's wallet first
-    wallet = db.query(models.SkillWallet).filter(models.SkillWallet.user_id == user_id).first()
+    # Get user's wallet first, with their cohort rank from the last cohort_stats.py run
+    wallet, ranked, cohort = db.query(models.SkillWallet, models.WorkerScore, models.CohortStats).outerjoin(
+        models.WorkerScore, models.WorkerScore.user_id == models.SkillWallet.user_id
+    ).outerjoin(
+        models.CohortStats, models.CohortStats.id == models.WorkerScore.cohort_id
+    ).filter(models.SkillWallet.user_id == user_id).first() or (None, None, None)
     current_score = 0
-    previous_score = 0 # Simulated "Last Month"
+    previous_score = 0 # Score before the latest change
+    standing = None
     
     if wallet:
         credentials = db.query(models.SkillCredential).filter(models.SkillCredential.skill_wallet_id == wallet.id).all()
@@ -827,8 +1570,8 @@ def get_dashboard_stats(user_id: int, db: GetDB):
             scores = [c.skill_trust_score for c in credentials if c.skill_trust_score]
             if scores:
                 current_score = int(sum(scores) / len(scores))
-                # Simulate previous score as slightly lower to show growth
-                previous_score = max(300, current_score - 45) 
+                previous_score = previous_score_for(ranked, current_score)
+                standing = cohort_standing(cohort, ranked, current_score, details=True)
             else:
                  # Default baseline if no scored credentials
                 current_score = 300
@@ -853,6 +1596,7 @@ def get_dashboard_stats(user_id: int, db: GetDB):
         "skill_growth": {
             "current_score": current_score,
             "previous_score": previous_score,
+            "cohort": standing,
             "growth_message": "Your skill score increased because you completed practical lessons." if current_score > previous_score else "Start learning to grow your skill score."
         }
     }
@@ -860,7 +1604,9 @@ def get_dashboard_stats(user_id: int, db: GetDB):
 @app.get("/api/v1/user/learning_dashboard/{user_id}")
 def get_learning_dashboard(user_id: int, db: GetDB):
     # 1. Progress Stats
-    enrollments = db.query(models.LessonEnrollment).filter(models.LessonEnrollment.user_id == user_id).all()
+    enrollments = db.query(models.LessonEnrollment).options(
+        joinedload(models.LessonEnrollment.lesson)
+    ).filter(models.LessonEnrollment.user_id == user_id).all()
     
     stats = {
         "enrolled": len(enrollments),
@@ -913,5 +1659,139 @@ def get_learning_dashboard(user_id: int, db: GetDB):
         ]
     }
 
+# --------------------------------------------------------------------------
+# 9. SERVER PUSH (credential status, live session events)
+# --------------------------------------------------------------------------
+def stream_channels(user_id: int, sessions: Optional[str]):
+    """
+    Channels one connection follows: the user's wallet plus up to EVENTS_MAX_SESSIONS live
+    sessions. Sessions the user neither registered for nor teaches are left out.
+    """
+    try:
+        session_ids = {int(part) for part in sessions.split(",") if part.strip()} if sessions else set()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="sessions must be comma-separated session ids")
+    if len(session_ids) > settings.EVENTS_MAX_SESSIONS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.EVENTS_MAX_SESSIONS} sessions per connection")
+
+    db = SessionLocal()
+    try:
+        wallet_id = db.query(models.SkillWallet.id).filter(models.SkillWallet.user_id == user_id).scalar()
+        if session_ids:
+            registered = select(models.SessionEnrollment.session_id).where(
+                models.SessionEnrollment.user_id == user_id, models.SessionEnrollment.session_id.in_(session_ids))
+            teaching = select(models.LiveSession.id).where(
+                models.LiveSession.teacher_id == user_id, models.LiveSession.id.in_(session_ids))
+            session_ids = set(db.execute(union(registered, teaching)).scalars())
+    finally:
+        db.close()
+    channels = [f"session:{session_id}" for session_id in sorted(session_ids)]
+    if wallet_id is not None:
+        channels.append(f"wallet:{wallet_id}")
+    return channels
+
+@app.websocket("/api/v1/events/ws/{user_id}")
+async def events_websocket(websocket: WebSocket, user_id: int, sessions: Optional[str] = None):
+    """
+    Pushes credential.status / credential.evaluation_failed and session.started / session.ended
+    events as JSON messages, with a {"type": "ping"} after EVENTS_HEARTBEAT_SECONDS of silence.
+    Closes with 1013 (try again later) when over the connection limits or too far behind.
+    """
+    await websocket.accept()
+    try:
+        channels = await run_in_threadpool(stream_channels, user_id, sessions)
+        subscription = event_hub.subscribe(user_id, channels, "websocket")
+    except HTTPException as e:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=e.detail)
+        return
+    except TooManyConnections as e:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason=str(e))
+        return
+
+    async def wait_for_disconnect():
+        # Clients only listen; anything they send is ignored
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    listener = asyncio.create_task(wait_for_disconnect())
+    try:
+        while True:
+            getter = asyncio.create_task(subscription.next_event(settings.EVENTS_HEARTBEAT_SECONDS))
+            done, _ = await asyncio.wait({getter, listener}, return_when=asyncio.FIRST_COMPLETED)
+            if listener in done:
+                getter.cancel()
+                break
+            if subscription.closed_reason is not None:
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason=subscription.closed_reason)
+                break
+            event = getter.result() or {"type": "ping", "ts": time.time()}
+            # A client that stops reading must not hold this coroutine (and its queue) forever
+            await asyncio.wait_for(websocket.send_json(event), settings.EVENTS_SEND_TIMEOUT_SECONDS)
+    except (WebSocketDisconnect, asyncio.TimeoutError):
+        pass
+    finally:
+        listener.cancel()
+        event_hub.unsubscribe(subscription)
+
+@app.get("/api/v1/events/stream/{user_id}")
+async def events_stream(user_id: int, request: Request, sessions: Optional[str] = None):
+    """
+    Server-Sent Events version of events_websocket, for clients without WebSockets.
+    Each event is "event: <type>" + "data: <json>"; ": ping" comments keep proxies from timing out.
+    """
+    channels = await run_in_threadpool(stream_channels, user_id, sessions)
+    try:
+        subscription = event_hub.subscribe(user_id, channels, "sse")
+    except TooManyConnections as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+
+    async def event_source():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                event = await subscription.next_event(settings.EVENTS_HEARTBEAT_SECONDS)
+                if subscription.closed_reason is not None:
+                    # The client reconnects (after `retry`) and re-fetches current state
+                    yield format_sse({"type": "overflow", "data": {"reason": subscription.closed_reason}})
+                    break
+                yield format_sse(event) if event else ": ping\n\n"
+        finally:
+            event_hub.unsubscribe(subscription)
+
+    return StreamingResponse(event_source(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# --------------------------------------------------------------------------
+# 10. BULK EXPORT (reporting extracts; see export_utils.py)
+# --------------------------------------------------------------------------
+@app.get("/api/v1/export/{dataset}")
+def export_dataset(dataset: str, request: Request, format: str = "csv", since: Optional[datetime] = None):
+    """
+    Streams a whole dataset as CSV, NDJSON or Parquet in constant memory.
+    With ?since=<previous X-Export-Watermark> only rows changed after it are sent.
+    """
+    token = request.headers.get("x-export-token", "")
+    if not settings.EXPORT_TOKEN or not hmac.compare_digest(token.encode(), settings.EXPORT_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="A valid X-Export-Token is required")
+    if dataset not in DATASETS: raise HTTPException(status_code=404, detail="Unknown dataset")
+    if format not in ENCODERS: raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(ENCODERS)}")
+
+    spec = DATASETS[dataset]
+    if since is not None and spec.watermark is None:
+        raise HTTPException(status_code=400, detail=f"{dataset} has no watermark; export it in full")
+    if since is not None and since.tzinfo is not None:
+        # Timestamps are stored as naive UTC
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    try:
+        encoder = ENCODERS[format](spec.columns)
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+    window = export_window(spec, since)
+    headers = {"Content-Disposition": f'attachment; filename="{dataset}.{encoder.extension}"'}
+    if window.until is not None:
+        headers["X-Export-Watermark"] = window.until.isoformat()
+    return StreamingResponse(stream_export(SessionLocal, spec, encoder, window), media_type=encoder.media_type, headers=headers)
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
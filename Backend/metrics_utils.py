@@ -0,0 +1,221 @@
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from tracing_utils import get_logger
+
+logger = get_logger("metrics")
+
+# ----------------------------------------------------------------------
+# Minimal in-process metrics with Prometheus text exposition.
+# Served at GET /metrics (see main.py). Counters are per process.
+# ----------------------------------------------------------------------
+
+INF_LABEL = 'le="+Inf"'
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            items = sorted(self.values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_number(value)}")
+        return lines
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self.values.items())
+        for key, (bucket_counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                le = f'le="{_format_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, INF_LABEL)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_number(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, fn):
+        """fn() is called on every scrape, to refresh gauges that mirror other state."""
+        self.collectors.append(fn)
+
+    def render(self):
+        for fn in self.collectors:
+            try:
+                fn()
+            except Exception as e:
+                logger.warning("Metrics collector failed", extra={"collector": fn.__name__, "error": str(e)})
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+# --- HTTP ---
+HTTP_REQUESTS = registry.register(Counter(
+    "skillwallet_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")))
+HTTP_LATENCY = registry.register(Histogram(
+    "skillwallet_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route")))
+HTTP_IN_FLIGHT = registry.register(Gauge(
+    "skillwallet_http_requests_in_flight", "HTTP requests currently being served.", ("method",)))
+
+# --- DATABASE ---
+DB_TIME_PER_REQUEST = registry.register(Histogram(
+    "skillwallet_db_time_per_request_seconds", "Total SQL execution time per HTTP request.", ("route",)))
+DB_STATEMENTS_PER_REQUEST = registry.register(Histogram(
+    "skillwallet_db_statements_per_request", "SQL statements executed per HTTP request.", ("route",),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100)))
+
+# --- AI ---
+AI_CALL_LATENCY = registry.register(Histogram(
+    "skillwallet_ai_call_duration_seconds", "Duration of transcription / evaluation calls.", ("operation",),
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)))
+AI_CALL_ERRORS = registry.register(Counter(
+    "skillwallet_ai_call_errors_total", "Failed transcription / evaluation calls.", ("operation",)))
+
+# --- UPLOADS ---
+UPLOAD_BYTES = registry.register(Counter(
+    "skillwallet_upload_bytes_total", "Bytes received by upload endpoints.", ("file_type",)))
+UPLOAD_LATENCY = registry.register(Histogram(
+    "skillwallet_upload_duration_seconds", "Time to store an uploaded file.", ("file_type",)))
+
+# --- AUTH ---
+OTP_REQUESTS = registry.register(Counter(
+    "skillwallet_otp_requests_total", "OTP sends / verifications by result.", ("action", "result")))
+
+# --- NOTIFICATIONS ---
+REMINDERS_SENT = registry.register(Counter(
+    "skillwallet_reminders_total", "Live session reminders dispatched, by result (sent, failed, expired).", ("result",)))
+
+# --- LEARNING ---
+PROGRESS_EVENTS = registry.register(Counter(
+    "skillwallet_progress_events_total", "Lesson progress heartbeats, by result (buffered, coalesced, written, failed).", ("result",)))
+PROGRESS_FLUSH_LATENCY = registry.register(Histogram(
+    "skillwallet_progress_flush_duration_seconds", "Time to write one flush of buffered lesson progress.", ()))
+
+# --- RECOMMENDATIONS ---
+RECOMMENDATION_INDEX_BUILD_LATENCY = registry.register(Histogram(
+    "skillwallet_recommendation_index_build_duration_seconds", "Time to rebuild the lesson recommendation index.", ()))
+RECOMMENDATION_INDEX_LESSONS = registry.register(Gauge(
+    "skillwallet_recommendation_index_lessons", "Lessons in this worker's recommendation index.", ()))
+
+# --- CATALOG ---
+CATALOG_BUILD_LATENCY = registry.register(Histogram(
+    "skillwallet_catalog_build_duration_seconds", "Time to rebuild the faceted Skill Bank catalog snapshot.", ()))
+
+# --- EXPORTS ---
+EXPORT_ROWS = registry.register(Counter(
+    "skillwallet_export_rows_total", "Rows streamed by bulk exports, by dataset.", ("dataset",)))
+
+# --- PUSH ---
+EVENTS_PUBLISHED = registry.register(Counter(
+    "skillwallet_events_published_total", "Server-push events published, by type.", ("type",)))
+EVENTS_DROPPED = registry.register(Counter(
+    "skillwallet_events_dropped_total", "Server-push events or clients dropped, by reason.", ("reason",)))
+STREAM_CONNECTIONS = registry.register(Gauge(
+    "skillwallet_stream_connections", "Open WebSocket / SSE connections in this worker.", ("transport",)))
+
+# --- CACHES ---
+CACHE_REQUESTS = registry.register(Counter(
+    "skillwallet_cache_requests_total", "Cache lookups by result (hit, miss, stale).", ("cache", "result")))
+
+@contextmanager
+def observe_ai_call(operation):
+    """Times an AI call and counts it as an error if it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        AI_CALL_ERRORS.inc(operation=operation)
+        raise
+    finally:
+        AI_CALL_LATENCY.observe(time.perf_counter() - started, operation=operation)
@@ -1,124 +1,52 @@
-import sqlite3
-import os
+# Backend/migrate_db.py
+#
+# Applies the versioned migrations in migrations/ to DATABASE_URL (SQLite or PostgreSQL):
+#
+#   python migrate_db.py                       # upgrade to latest
+#   python migrate_db.py status                # list applied / pending versions and backfills
+#   python migrate_db.py upgrade --to 3        # stop at a version
+#   python migrate_db.py upgrade --batch-size 1000 --pause 0.2   # gentler backfills on a busy database
+#
+# Safe to re-run: interrupted migrations and backfills pick up where they stopped.
+# New migration: add migrations/NNNN_description.py defining upgrade(op) (see migration_utils.Operations).
+
+import sys
+import argparse
+from sqlalchemy import text
+from database import engine
+from migration_utils import MigrationRunner
+
+def print_status(runner):
+    print(f"Database: {engine.url.render_as_string(hide_password=True)}")
+    for version, name, applied in runner.status():
+        print(f"  {'[x]' if applied else '[ ]'} {version:04d} {name}")
+    with engine.connect() as conn:
+        backfills = conn.execute(text("SELECT name, last_id, rows_done, finished_at FROM migration_backfills ORDER BY name")).all()
+    for row in backfills:
+        state = "finished" if row.finished_at else f"in progress (after id {row.last_id})"
+        print(f"  backfill {row.name}: {row.rows_done} rows, {state}")
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Versioned schema migrations")
+    parser.add_argument("command", nargs="?", default="upgrade", choices=["upgrade", "status"])
+    parser.add_argument("--to", type=int, dest="target", help="Highest version to apply")
+    parser.add_argument("--batch-size", type=int, help="Rows per backfill batch")
+    parser.add_argument("--pause", type=float, help="Seconds to sleep between backfill batches")
+    args = parser.parse_args()
+
+    runner = MigrationRunner(engine)
+    if args.command == "status":
+        print_status(runner)
+        return
 
-# Use absolute path to ensure we find the DB file
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_FILE = os.path.join(BASE_DIR, "sql_app.db")
-
-def migrate():
-    print(f"Using database: {DB_FILE}")
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
-    # List of new columns to add
-    new_columns = [
-        ("email", "VARCHAR"),
-        ("date_of_birth", "DATE"),
-        ("gender", "VARCHAR"),
-        ("name", "VARCHAR"),
-        ("profession", "VARCHAR"),
-        ("age", "INTEGER"),
-        ("local_area", "VARCHAR"),
-        ("profile_photo_file_path", "VARCHAR"),
-        ("training_letter_file_path", "VARCHAR"),
-        ("apprenticeship_proof_file_path", "VARCHAR"),
-        ("local_authority_proof_file_path", "VARCHAR"),
-        ("recommendation_file_path", "VARCHAR"),
-        ("community_verifier_id", "VARCHAR"),
-        ("previous_certificates_file_path", "VARCHAR"),
-        ("past_jobs_proof_file_path", "VARCHAR"),
-        ("daily_task_photo_file_path", "VARCHAR"),
-        ("work_video_file_path", "VARCHAR"),
-        ("campus_lab_doc_file_path", "VARCHAR"),
-        ("community_recording_file_path", "VARCHAR"),
-        ("tier3_cibil_score", "INTEGER DEFAULT 0"),
-        ("state", "VARCHAR"),
-        ("district", "VARCHAR")
-    ]
-    
     print("--- MIGRATING DATABASE ---")
-    
-    for col_name, col_type in new_columns:
-        try:
-            print(f"Adding column: {col_name}...")
-            cursor.execute(f"ALTER TABLE users ADD COLUMN {col_name} {col_type}")
-            print(f"  -> Success")
-        except sqlite3.OperationalError as e:
-             # Check for "duplicate column" error which varies by SQLite version/driver
-            if "duplicate column" in str(e).lower() or "already exists" in str(e).lower():
-                print(f"  -> Column already exists (Skipped)")
-            else:
-                print(f"  -> Error: {e}")
-
-    # Add duration_minutes to skill_lessons
-    try:
-        print("Adding duration_minutes to skill_lessons...")
-        cursor.execute("ALTER TABLE skill_lessons ADD COLUMN duration_minutes INTEGER DEFAULT 15")
-        print("  -> Success")
-    except sqlite3.OperationalError as e:
-        if "duplicate column" in str(e).lower() or "already exists" in str(e).lower():
-            print("  -> Column already exists (Skipped)")
-        else:
-            print(f"  -> Error: {e}")
-
-    # Add language to skill_lessons
     try:
-        print("Adding language to skill_lessons...")
-        cursor.execute("ALTER TABLE skill_lessons ADD COLUMN language VARCHAR DEFAULT 'English'")
-        print("  -> Success")
-    except sqlite3.OperationalError as e:
-        if "duplicate column" in str(e).lower() or "already exists" in str(e).lower():
-            print("  -> Column already exists (Skipped)")
-        else:
-            print(f"  -> Error: {e}")
-
-    # Add difficulty to skill_lessons
-    try:
-        print("Adding difficulty to skill_lessons...")
-        cursor.execute("ALTER TABLE skill_lessons ADD COLUMN difficulty VARCHAR DEFAULT 'Beginner'")
-        print("  -> Success")
-    except sqlite3.OperationalError as e:
-        if "duplicate column" in str(e).lower() or "already exists" in str(e).lower():
-            print("  -> Column already exists (Skipped)")
-        else:
-            print(f"  -> Error: {e}")
-
-    # Add last_accessed to lesson_enrollments
-    try:
-        print("Adding last_accessed to lesson_enrollments...")
-        cursor.execute("ALTER TABLE lesson_enrollments ADD COLUMN last_accessed DATETIME DEFAULT CURRENT_TIMESTAMP")
-        print("  -> Success")
-    except sqlite3.OperationalError as e:
-        if "duplicate column" in str(e).lower() or "already exists" in str(e).lower():
-            print("  -> Column already exists (Skipped)")
-        else:
-            print(f"  -> Error: {e}")
-
-    # Add language to live_sessions
-    try:
-        print("Adding language to live_sessions...")
-        cursor.execute("ALTER TABLE live_sessions ADD COLUMN language VARCHAR DEFAULT 'English'")
-        print("  -> Success")
-    except sqlite3.OperationalError as e:
-        if "duplicate column" in str(e).lower() or "already exists" in str(e).lower():
-            print("  -> Column already exists (Skipped)")
-        else:
-            print(f"  -> Error: {e}")
-
-    # Add difficulty to live_sessions
-    try:
-        print("Adding difficulty to live_sessions...")
-        cursor.execute("ALTER TABLE live_sessions ADD COLUMN difficulty VARCHAR DEFAULT 'Beginner'")
-        print("  -> Success")
-    except sqlite3.OperationalError as e:
-        if "duplicate column" in str(e).lower() or "already exists" in str(e).lower():
-            print("  -> Column already exists (Skipped)")
-        else:
-            print(f"  -> Error: {e}")
-
-    conn.commit()
-    conn.close()
-    print("--- MIGRATION COMPLETE ---")
+        applied = runner.upgrade(target=args.target, batch_size=args.batch_size, pause=args.pause)
+    except Exception as e:
+        # Every step is idempotent, so fixing the cause and re-running continues from here
+        print(f"Migration failed: {e}")
+        sys.exit(1)
+    print(f"--- MIGRATION COMPLETE ({len(applied)} applied) ---")
 
 if __name__ == "__main__":
-    migrate()
\ No newline at end of file
+    main_cli()
@@ -0,0 +1,265 @@
+import os
+import re
+import time
+import importlib.util
+from datetime import datetime
+from sqlalchemy import text, inspect
+from config import settings
+
+# ----------------------------------------------------------------------
+# Versioned schema migrations for SQLite and PostgreSQL.
+#
+# Each file in migrations/ is named NNNN_description.py and defines
+# upgrade(op). Applied versions are recorded in schema_migrations.
+#
+# Migrations are forward-only and run step by step rather than in one big
+# transaction, so long-running work never holds locks for the whole migration:
+#   - every op is idempotent (IF NOT EXISTS / existence checks), so a
+#     migration interrupted half way can simply be run again
+#   - indexes are built CONCURRENTLY on PostgreSQL
+#   - backfills run in keyset-paginated batches, each committed together
+#     with its checkpoint, so they resume where they stopped
+# ----------------------------------------------------------------------
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+MIGRATION_FILE_PATTERN = re.compile(r"^(\d{4})_(\w+)\.py$")
+# Arbitrary constant for pg_advisory_lock, so only one deploy migrates at a time
+ADVISORY_LOCK_KEY = 727_001
+
+class MigrationError(Exception):
+    pass
+
+class Migration:
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+        self._module = None
+
+    @property
+    def module(self):
+        if self._module is None:
+            spec = importlib.util.spec_from_file_location(f"migration_{self.version:04d}", self.path)
+            self._module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(self._module)
+        return self._module
+
+    @property
+    def description(self):
+        doc = (self.module.__doc__ or "").strip()
+        return doc.splitlines()[0] if doc else self.name.replace("_", " ")
+
+def discover_migrations(directory=MIGRATIONS_DIR):
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = MIGRATION_FILE_PATTERN.match(filename)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise MigrationError(f"Duplicate migration versions in {directory}")
+    return migrations
+
+# ----------------------------------------------------------------------
+# OPERATIONS (passed to each migration's upgrade(op))
+# ----------------------------------------------------------------------
+class Operations:
+    def __init__(self, engine, batch_size=None, pause=None, log=print):
+        self.engine = engine
+        self.dialect = engine.dialect.name
+        self.batch_size = batch_size or settings.MIGRATION_BATCH_SIZE
+        self.pause = settings.MIGRATION_BATCH_PAUSE_SECONDS if pause is None else pause
+        self.log = log
+
+    @property
+    def is_postgres(self):
+        return self.dialect == "postgresql"
+
+    def _ddl(self, sql, autocommit=False):
+        options = {"isolation_level": "AUTOCOMMIT"} if autocommit else {}
+        with self.engine.connect().execution_options(**options) as conn:
+            if self.is_postgres:
+                # Fail fast instead of queueing behind long transactions (and blocking everyone queued behind us)
+                conn.execute(text(f"SET lock_timeout = '{int(settings.MIGRATION_LOCK_TIMEOUT_SECONDS * 1000)}ms'"))
+            conn.execute(text(sql))
+            if not autocommit:
+                conn.commit()
+
+    # --- introspection ---
+    def has_table(self, table):
+        return inspect(self.engine).has_table(table)
+
+    def has_column(self, table, column):
+        return self.has_table(table) and column in {c["name"] for c in inspect(self.engine).get_columns(table)}
+
+    def has_index(self, table, name):
+        if not self.has_table(table):
+            return False
+        inspector = inspect(self.engine)
+        names = {i["name"] for i in inspector.get_indexes(table)}
+        names |= {c["name"] for c in inspector.get_unique_constraints(table)}
+        return name in names
+
+    # --- DDL ---
+    def execute(self, sql, params=None):
+        with self.engine.begin() as conn:
+            return conn.execute(text(sql), params or {})
+
+    def create_tables(self, metadata, tables=None):
+        """Creates missing tables (and their indexes) from SQLAlchemy metadata."""
+        metadata.create_all(bind=self.engine, tables=tables, checkfirst=True)
+
+    def add_column(self, table, column, ddl_type):
+        """ddl_type is the raw column definition, e.g. "VARCHAR DEFAULT 'English'"."""
+        if self.has_column(table, column):
+            return False
+        self.log(f"  + {table}.{column}")
+        self._ddl(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}")
+        return True
+
+    def create_index(self, name, table, columns, unique=False, where=None):
+        """
+        CREATE INDEX without blocking writes on PostgreSQL (CONCURRENTLY, outside a transaction).
+        A concurrent build that failed earlier leaves an INVALID index behind; it is dropped and rebuilt.
+        """
+        unique_sql = "UNIQUE " if unique else ""
+        where_sql = f" WHERE {where}" if where else ""
+        cols = ", ".join(columns)
+        if self.is_postgres:
+            with self.engine.connect() as conn:
+                valid = conn.execute(text(
+                    "SELECT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid WHERE c.relname = :name"
+                ), {"name": name}).scalar()
+            if valid is True:
+                return False
+            if valid is False:
+                self.log(f"  ! rebuilding invalid index {name}")
+                self._ddl(f"DROP INDEX CONCURRENTLY IF EXISTS {name}", autocommit=True)
+            self.log(f"  + index {name} on {table} ({cols}) CONCURRENTLY")
+            self._ddl(f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({cols}){where_sql}", autocommit=True)
+            return True
+
+        if self.has_index(table, name):
+            return False
+        self.log(f"  + index {name} on {table} ({cols})")
+        self._ddl(f"CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table} ({cols}){where_sql}")
+        return True
+
+    def drop_index(self, name):
+        if self.is_postgres:
+            self._ddl(f"DROP INDEX CONCURRENTLY IF EXISTS {name}", autocommit=True)
+        else:
+            self._ddl(f"DROP INDEX IF EXISTS {name}")
+
+    # --- data ---
+    def backfill(self, name, table, columns, where, apply, batch_size=None):
+        """
+        Resumable batched backfill.
+
+        Selects `id, <columns>` from rows matching `where`, in id order, batch_size at a time.
+        apply(conn, rows) performs the updates for one batch; it runs in the same transaction
+        as the checkpoint write, so a crash never loses or repeats a committed batch.
+        """
+        batch_size = batch_size or self.batch_size
+        select_cols = ", ".join(["id", *columns])
+        query = text(f"SELECT {select_cols} FROM {table} WHERE ({where}) AND id > :last_id ORDER BY id LIMIT :limit")
+
+        with self.engine.begin() as conn:
+            state = conn.execute(text("SELECT last_id, rows_done, finished_at FROM migration_backfills WHERE name = :name"),
+                                 {"name": name}).first()
+            if state is None:
+                conn.execute(text("INSERT INTO migration_backfills (name, last_id, rows_done, updated_at) VALUES (:name, 0, 0, :now)"),
+                             {"name": name, "now": datetime.utcnow()})
+                last_id, rows_done = 0, 0
+            elif state.finished_at is not None:
+                return state.rows_done
+            else:
+                last_id, rows_done = state.last_id, state.rows_done
+                if last_id:
+                    self.log(f"  ~ resuming backfill {name} after id {last_id} ({rows_done} rows done)")
+
+        started = time.perf_counter()
+        while True:
+            with self.engine.begin() as conn:
+                rows = conn.execute(query, {"last_id": last_id, "limit": batch_size}).all()
+                if rows:
+                    apply(conn, rows)
+                    last_id = rows[-1].id
+                    rows_done += len(rows)
+                conn.execute(text(
+                    "UPDATE migration_backfills SET last_id = :last_id, rows_done = :rows_done, updated_at = :now, "
+                    "finished_at = :finished WHERE name = :name"
+                ), {"name": name, "last_id": last_id, "rows_done": rows_done, "now": datetime.utcnow(),
+                    "finished": None if len(rows) == batch_size else datetime.utcnow()})
+            if len(rows) < batch_size:
+                break
+            self.log(f"  ~ {name}: {rows_done} rows ({rows_done / (time.perf_counter() - started):.0f} rows/s)")
+            if self.pause:
+                # Leave room for production traffic between batches
+                time.sleep(self.pause)
+
+        self.log(f"  = backfill {name}: {rows_done} rows")
+        return rows_done
+
+# ----------------------------------------------------------------------
+# RUNNER
+# ----------------------------------------------------------------------
+BOOKKEEPING_SQL = [
+    "CREATE TABLE IF NOT EXISTS schema_migrations (version INTEGER PRIMARY KEY, name VARCHAR NOT NULL, applied_at TIMESTAMP NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS migration_backfills (name VARCHAR PRIMARY KEY, last_id BIGINT NOT NULL, rows_done BIGINT NOT NULL, "
+    "updated_at TIMESTAMP NOT NULL, finished_at TIMESTAMP)"
+]
+
+class MigrationRunner:
+    def __init__(self, engine, migrations=None, log=print):
+        self.engine = engine
+        self.migrations = migrations if migrations is not None else discover_migrations()
+        self.log = log
+
+    def ensure_bookkeeping(self):
+        with self.engine.begin() as conn:
+            for sql in BOOKKEEPING_SQL:
+                conn.execute(text(sql))
+
+    def applied_versions(self):
+        self.ensure_bookkeeping()
+        with self.engine.connect() as conn:
+            return {row.version for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+    def pending(self, target=None):
+        applied = self.applied_versions()
+        return [m for m in self.migrations if m.version not in applied and (target is None or m.version <= target)]
+
+    def status(self):
+        applied = self.applied_versions()
+        return [(m.version, m.name, m.version in applied) for m in self.migrations]
+
+    def _lock(self, conn):
+        if self.engine.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+
+    def _unlock(self, conn):
+        if self.engine.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+
+    def upgrade(self, target=None, batch_size=None, pause=None):
+        """Applies pending migrations up to `target` (default: latest). Returns the versions applied."""
+        op = Operations(self.engine, batch_size=batch_size, pause=pause, log=self.log)
+        applied_now = []
+        # The advisory lock is session scoped, so hold one connection open for the whole run
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+            self._lock(lock_conn)
+            try:
+                # Re-read under the lock: another deploy may have just finished
+                for migration in self.pending(target):
+                    self.log(f"Applying {migration.version:04d} {migration.name}: {migration.description}")
+                    started = time.perf_counter()
+                    migration.module.upgrade(op)
+                    with self.engine.begin() as conn:
+                        conn.execute(text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:v, :n, :t)"),
+                                     {"v": migration.version, "n": migration.name, "t": datetime.utcnow()})
+                    self.log(f"  done in {time.perf_counter() - started:.2f}s")
+                    applied_now.append(migration.version)
+            finally:
+                self._unlock(lock_conn)
+        return applied_now
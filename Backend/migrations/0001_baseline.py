@@ -0,0 +1,6 @@
+"""Create any missing tables from the models (fresh databases start here)."""
+
+import models
+
+def upgrade(op):
+    op.create_tables(models.Base.metadata)
@@ -0,0 +1,46 @@
+"""Columns previously added by hand with the old SQLite-only migrate_db.py."""
+
+import models
+
+USER_COLUMNS = [
+    ("email", "VARCHAR"),
+    ("date_of_birth", "DATE"),
+    ("gender", "VARCHAR"),
+    ("name", "VARCHAR"),
+    ("profession", "VARCHAR"),
+    ("age", "INTEGER"),
+    ("local_area", "VARCHAR"),
+    ("profile_photo_file_path", "VARCHAR"),
+    ("training_letter_file_path", "VARCHAR"),
+    ("apprenticeship_proof_file_path", "VARCHAR"),
+    ("local_authority_proof_file_path", "VARCHAR"),
+    ("recommendation_file_path", "VARCHAR"),
+    ("community_verifier_id", "VARCHAR"),
+    ("previous_certificates_file_path", "VARCHAR"),
+    ("past_jobs_proof_file_path", "VARCHAR"),
+    ("daily_task_photo_file_path", "VARCHAR"),
+    ("work_video_file_path", "VARCHAR"),
+    ("campus_lab_doc_file_path", "VARCHAR"),
+    ("community_recording_file_path", "VARCHAR"),
+    ("tier3_cibil_score", "INTEGER DEFAULT 0"),
+    ("state", "VARCHAR"),
+    ("district", "VARCHAR")
+]
+
+OTHER_COLUMNS = [
+    ("skill_lessons", "duration_minutes", "INTEGER DEFAULT 15"),
+    ("skill_lessons", "language", "VARCHAR DEFAULT 'English'"),
+    ("skill_lessons", "difficulty", "VARCHAR DEFAULT 'Beginner'"),
+    ("lesson_enrollments", "last_accessed", "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"),
+    ("live_sessions", "language", "VARCHAR DEFAULT 'English'"),
+    ("live_sessions", "difficulty", "VARCHAR DEFAULT 'Beginner'"),
+]
+
+def upgrade(op):
+    # Only columns the models still map: the legacy *_file_path columns (moved to user_documents
+    # by 0005) already exist on databases that used them and would be dead weight on fresh ones
+    tables = models.Base.metadata.tables
+    columns = [("users", column, ddl_type) for column, ddl_type in USER_COLUMNS] + OTHER_COLUMNS
+    for table, column, ddl_type in columns:
+        if column in tables[table].c:
+            op.add_column(table, column, ddl_type)
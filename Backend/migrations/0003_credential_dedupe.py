@@ -0,0 +1,22 @@
+"""Submission dedupe columns and indexes on skill_credentials, with content hashes for existing rows."""
+
+from sqlalchemy import text
+from storage_utils import content_hash
+
+def hash_existing_proofs(conn, rows):
+    conn.execute(
+        text("UPDATE skill_credentials SET proof_hash = :proof_hash, audio_hash = :audio_hash WHERE id = :id"),
+        [{"id": row.id, "proof_hash": content_hash(row.proof_url), "audio_hash": content_hash(row.audio_description_url)} for row in rows]
+    )
+
+def upgrade(op):
+    for column in ("idempotency_key", "proof_hash", "audio_hash"):
+        op.add_column("skill_credentials", column, "VARCHAR")
+
+    op.create_index("uq_credential_idempotency", "skill_credentials", ["skill_wallet_id", "idempotency_key"], unique=True)
+    op.create_index("ix_credential_content", "skill_credentials", ["skill_wallet_id", "proof_hash", "audio_hash"])
+
+    # Credentials created before dedupe existed have no hashes, so resubmissions of them were never caught.
+    # Hashing reads every stored file, hence a small batch size.
+    op.backfill("credential_content_hashes", "skill_credentials", ["proof_url", "audio_description_url"],
+                where="proof_hash IS NULL", apply=hash_existing_proofs, batch_size=500)
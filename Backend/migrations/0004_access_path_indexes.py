@@ -0,0 +1,28 @@
+"""Composite indexes for hot access paths, and one enrollment per user and lesson."""
+
+# Keep the most advanced of each set of duplicate enrollments (then the oldest)
+DEDUPE_LESSON_ENROLLMENTS = """
+DELETE FROM lesson_enrollments WHERE EXISTS (
+    SELECT 1 FROM lesson_enrollments keep
+    WHERE keep.user_id = lesson_enrollments.user_id
+      AND keep.lesson_id = lesson_enrollments.lesson_id
+      AND (COALESCE(keep.progress_percent, 0) > COALESCE(lesson_enrollments.progress_percent, 0)
+           OR (COALESCE(keep.progress_percent, 0) = COALESCE(lesson_enrollments.progress_percent, 0)
+               AND keep.id < lesson_enrollments.id))
+)
+"""
+
+def upgrade(op):
+    op.create_index("ix_credential_wallet_issued", "skill_credentials", ["skill_wallet_id", "issued_date"])
+    op.create_index("ix_reminder_session_user", "live_session_reminders", ["session_id", "user_id"])
+    op.create_index("ix_lesson_enrollment_lesson_user", "lesson_enrollments", ["lesson_id", "user_id"])
+    op.create_index("ix_session_enrollment_session_user", "session_enrollments", ["session_id", "user_id"])
+    op.create_index("ix_live_session_scheduled", "live_sessions", ["scheduled_at"])
+    op.create_index("ix_live_session_teacher_scheduled", "live_sessions", ["teacher_id", "scheduled_at"])
+
+    # Double-clicked enrolls could create duplicates before the constraint existed
+    if not op.has_index("lesson_enrollments", "uq_lesson_enrollment_user_lesson"):
+        removed = op.execute(DEDUPE_LESSON_ENROLLMENTS).rowcount
+        if removed:
+            op.log(f"  - removed {removed} duplicate lesson enrollments")
+    op.create_index("uq_lesson_enrollment_user_lesson", "lesson_enrollments", ["user_id", "lesson_id"], unique=True)
@@ -0,0 +1,46 @@
+"""Move tier 2 / tier 3 proof paths from users columns to user_documents rows."""
+
+from datetime import datetime
+from sqlalchemy import text, bindparam
+import models
+from storage_utils import content_hash
+
+# Legacy users.<doc_type>_file_path columns. They are left in place (unmapped) so
+# workers still running the previous release keep working during a rolling deploy.
+LEGACY_DOC_TYPES = [
+    "aadhaar", "pan_card", "voter_id", "driving_license", "ration_card",
+    "training_letter", "apprenticeship_proof", "local_authority_proof",
+    "recommendation", "previous_certificates", "past_jobs_proof",
+    "daily_task_photo", "work_video", "campus_lab_doc", "community_recording"
+]
+
+EXISTING_DOCS = text("SELECT user_id, doc_type FROM user_documents WHERE user_id IN :user_ids").bindparams(
+    bindparam("user_ids", expanding=True))
+INSERT_DOC = text("INSERT INTO user_documents (user_id, doc_type, path, uploaded_at, hash) "
+                  "VALUES (:user_id, :doc_type, :path, :uploaded_at, :hash)")
+
+def upgrade(op):
+    op.create_tables(models.Base.metadata, tables=[models.UserDocument.__table__])
+
+    # Fresh databases have none of these columns (0002 skips unmapped ones); old ones have theirs
+    doc_types = [t for t in LEGACY_DOC_TYPES if op.has_column("users", f"{t}_file_path")]
+    if not doc_types:
+        return
+    columns = [f"{t}_file_path" for t in doc_types]
+
+    def copy_documents(conn, rows):
+        # Users who already uploaded again through the new code path keep that newer file
+        existing = set(conn.execute(EXISTING_DOCS, {"user_ids": [row.id for row in rows]}).all())
+        now = datetime.utcnow()
+        documents = [
+            {"user_id": row.id, "doc_type": doc_type, "path": path, "uploaded_at": now, "hash": content_hash(path)}
+            for row in rows
+            for doc_type, path in zip(doc_types, row[1:])
+            if path and (row.id, doc_type) not in existing
+        ]
+        if documents:
+            conn.execute(INSERT_DOC, documents)
+
+    # Hashing reads every stored file, hence a small batch size
+    op.backfill("user_documents_from_columns", "users", columns,
+                where=" OR ".join(f"{c} IS NOT NULL" for c in columns), apply=copy_documents, batch_size=500)
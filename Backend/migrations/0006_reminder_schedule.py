@@ -0,0 +1,38 @@
+"""Timezone-aware remind_at and dispatch state on live_session_reminders."""
+
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import text, bindparam, DateTime
+from config import settings
+from reminder_dispatcher import parse_reminder_time
+
+# Bound through DateTime so SQLite gets the same text format the ORM writes
+SET_SCHEDULE = text("UPDATE live_session_reminders SET remind_at = :remind_at, status = :status WHERE id = :id").bindparams(
+    bindparam("remind_at", type_=DateTime(timezone=True)))
+
+def upgrade(op):
+    timestamp = "TIMESTAMP WITH TIME ZONE" if op.is_postgres else "TIMESTAMP"
+    op.add_column("live_session_reminders", "remind_at", timestamp)
+    op.add_column("live_session_reminders", "status", "VARCHAR DEFAULT 'PENDING'")
+    op.add_column("live_session_reminders", "attempts", "INTEGER DEFAULT 0")
+    op.add_column("live_session_reminders", "claim_token", "VARCHAR")
+    op.add_column("live_session_reminders", "claimed_at", timestamp)
+    op.add_column("live_session_reminders", "sent_at", timestamp)
+
+    # Reminders were never sent before; ones already in the past are expired, not sent late
+    late_cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.REMINDER_MAX_LATENESS_SECONDS)
+
+    def parse_schedule(conn, rows):
+        updates = []
+        for row in rows:
+            try:
+                remind_at = parse_reminder_time(row.reminder_date, row.reminder_time)
+                status = "EXPIRED" if remind_at < late_cutoff else "PENDING"
+            except ValueError:
+                remind_at, status = None, "INVALID"
+            updates.append({"id": row.id, "remind_at": remind_at, "status": status})
+        conn.execute(SET_SCHEDULE, updates)
+
+    op.backfill("reminder_remind_at", "live_session_reminders", ["reminder_date", "reminder_time"],
+                where="remind_at IS NULL AND (status IS NULL OR status = 'PENDING')", apply=parse_schedule)
+
+    op.create_index("ix_reminder_due", "live_session_reminders", ["status", "remind_at"])
@@ -0,0 +1,37 @@
+"""One registration per user and live session, and seat capacity with a maintained seats_taken counter."""
+
+from sqlalchemy import text
+
+# Keep the attended registration of each duplicate set (then the oldest)
+DEDUPE_SESSION_ENROLLMENTS = """
+DELETE FROM session_enrollments WHERE EXISTS (
+    SELECT 1 FROM session_enrollments keep
+    WHERE keep.user_id = session_enrollments.user_id
+      AND keep.session_id = session_enrollments.session_id
+      AND (CASE WHEN keep.status = 'ATTENDED' THEN 1 ELSE 0 END > CASE WHEN session_enrollments.status = 'ATTENDED' THEN 1 ELSE 0 END
+           OR (CASE WHEN keep.status = 'ATTENDED' THEN 1 ELSE 0 END = CASE WHEN session_enrollments.status = 'ATTENDED' THEN 1 ELSE 0 END
+               AND keep.id < session_enrollments.id))
+)
+"""
+
+COUNT_SEATS = text(
+    "UPDATE live_sessions SET seats_taken = "
+    "(SELECT COUNT(*) FROM session_enrollments e WHERE e.session_id = live_sessions.id) WHERE id = :id"
+)
+
+def count_seats(conn, rows):
+    conn.execute(COUNT_SEATS, [{"id": row.id} for row in rows])
+
+def upgrade(op):
+    # Concurrent clicks could create duplicates before the constraint existed
+    if not op.has_index("session_enrollments", "uq_session_enrollment_user_session"):
+        removed = op.execute(DEDUPE_SESSION_ENROLLMENTS).rowcount
+        if removed:
+            op.log(f"  - removed {removed} duplicate session enrollments")
+    op.create_index("uq_session_enrollment_user_session", "session_enrollments", ["user_id", "session_id"], unique=True)
+
+    op.add_column("live_sessions", "capacity", "INTEGER")
+    op.add_column("live_sessions", "seats_taken", "INTEGER NOT NULL DEFAULT 0")
+
+    # Existing sessions start with their current registrations counted (they have no capacity yet)
+    op.backfill("live_session_seats_taken", "live_sessions", [], where="1 = 1", apply=count_seats)
@@ -0,0 +1,6 @@
+"""Indexes for incremental exports on the issued_date / last_accessed / registered_at watermarks."""
+
+def upgrade(op):
+    op.create_index("ix_credential_issued", "skill_credentials", ["issued_date", "id"])
+    op.create_index("ix_lesson_enrollment_accessed", "lesson_enrollments", ["last_accessed", "id"])
+    op.create_index("ix_session_enrollment_registered", "session_enrollments", ["registered_at", "id"])
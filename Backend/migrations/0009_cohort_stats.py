@@ -0,0 +1,7 @@
+"""Cohort percentile / histogram tables for peer comparison of trust scores."""
+
+import models
+
+def upgrade(op):
+    # Filled by `python cohort_stats.py`; the dashboards treat missing rows as "not ranked yet"
+    op.create_tables(models.Base.metadata, tables=[models.CohortStats.__table__, models.WorkerScore.__table__])
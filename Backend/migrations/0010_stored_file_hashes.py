@@ -0,0 +1,19 @@
+"""Content hashes recorded at upload (stored_files), and a unique index for submission dedupe."""
+
+import models
+
+def upgrade(op):
+    # Files uploaded before this are hashed on their first submission (storage_utils.file_hashes)
+    op.create_tables(models.Base.metadata, tables=[models.StoredFile.__table__])
+
+    # Submissions without files all hashed to ("", "") and would collide under the unique index
+    op.execute("UPDATE skill_credentials SET proof_hash = NULL, audio_hash = NULL WHERE proof_hash = '' AND audio_hash = ''")
+    # Duplicates that slipped past the non-unique index keep their scores; only the oldest stays matchable
+    op.execute(
+        "UPDATE skill_credentials SET proof_hash = NULL, audio_hash = NULL "
+        "WHERE proof_hash IS NOT NULL AND id NOT IN ("
+        "SELECT MIN(id) FROM skill_credentials WHERE proof_hash IS NOT NULL GROUP BY skill_wallet_id, proof_hash, audio_hash)"
+    )
+
+    op.create_index("uq_credential_content", "skill_credentials", ["skill_wallet_id", "proof_hash", "audio_hash"], unique=True)
+    op.drop_index("ix_credential_content")
@@ -0,0 +1,20 @@
+"""updated_at on skill_credentials and session_enrollments, the incremental export watermark."""
+
+from sqlalchemy import text
+
+def copy_timestamp(table, column):
+    def apply(conn, rows):
+        conn.execute(text(f"UPDATE {table} SET updated_at = {column} WHERE id = :id"), [{"id": row.id} for row in rows])
+    return apply
+
+def upgrade(op):
+    for table, column in (("skill_credentials", "issued_date"), ("session_enrollments", "registered_at")):
+        op.add_column(table, "updated_at", "TIMESTAMP") # naive UTC, like issued_date
+        # Existing rows have no change history; their creation time is the best watermark there is
+        op.backfill(f"{table}_updated_at", table, [column], where=f"updated_at IS NULL AND {column} IS NOT NULL",
+                    apply=copy_timestamp(table, column))
+
+    op.create_index("ix_credential_updated", "skill_credentials", ["updated_at", "id"])
+    op.create_index("ix_session_enrollment_updated", "session_enrollments", ["updated_at", "id"])
+    op.drop_index("ix_credential_issued")
+    op.drop_index("ix_session_enrollment_registered")
@@ -0,0 +1,15 @@
+"""updated_at on lesson_enrollments: exports follow server write time, not client heartbeat times."""
+
+from sqlalchemy import text
+
+def copy_timestamp(conn, rows):
+    conn.execute(text("UPDATE lesson_enrollments SET updated_at = COALESCE(last_accessed, enrolled_at) WHERE id = :id"),
+                 [{"id": row.id} for row in rows])
+
+def upgrade(op):
+    op.add_column("lesson_enrollments", "updated_at", "TIMESTAMP") # naive UTC, like last_accessed
+    op.backfill("lesson_enrollments_updated_at", "lesson_enrollments", ["last_accessed"],
+                where="updated_at IS NULL AND (last_accessed IS NOT NULL OR enrolled_at IS NOT NULL)", apply=copy_timestamp)
+
+    op.create_index("ix_lesson_enrollment_updated", "lesson_enrollments", ["updated_at", "id"])
+    op.drop_index("ix_lesson_enrollment_accessed")
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Date
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Date, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 
 # Define the declarative base for all models
@@ -14,23 +14,23 @@ class User(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     
-    # Auth Fields
+    # Auth Fields (deferred: only the OTP endpoints read them)
     phone_number = Column(String, unique=True, index=True)
-    otp_hash = Column(String)
-    otp_expiry = Column(DateTime)
+    otp_hash = deferred(Column(String), group="otp")
+    otp_expiry = deferred(Column(DateTime), group="otp")
     is_verified = Column(Boolean, default=False)
     
     # --- CRITICAL FIX: Added Missing Fields for Wallet Initialization ---
     verification_status = Column(String(50), default="PENDING")
     tier_level = Column(Integer, default=0)
-    kyc_data = Column(Text, default="{}") # Used for flexible JSON data or default empty string
+    kyc_data = deferred(Column(Text, default="{}"), group="kyc") # Used for flexible JSON data or default empty string
     last_login_at = Column(DateTime, default=datetime.utcnow) # ADDED: Required by main.py
     # -------------------------------------------------------------------
 
     # --- NEW CORE IDENTITY FIELDS ---
-    email = Column(String, unique=True, index=True, nullable=True) 
-    date_of_birth = Column(Date, nullable=True)                  
-    gender = Column(String, nullable=True)                       
+    email = deferred(Column(String, unique=True, index=True, nullable=True), group="details")
+    date_of_birth = deferred(Column(Date, nullable=True), group="details")
+    gender = deferred(Column(String, nullable=True), group="details")
 
     # Core Profile Fields (CRITICAL: Added Name and Profession)
     name = Column(String, nullable=True)     # NEW
@@ -42,47 +42,75 @@ class User(Base):
     profile_photo_file_path = Column(String, nullable=True) # NEW
 
     # --- TIER 1: SKILL TAG ---
-    skill_tag = Column(String, nullable=True)
-    power_skill_tag = Column(String, nullable=True) 
+    skill_tag = deferred(Column(String, nullable=True), group="details")
+    power_skill_tag = deferred(Column(String, nullable=True), group="details")
 
-    # --- TIER 2: GOVERNMENT PROOFS (All optional, Nullable=True) ---
-    aadhaar_number = Column(String, nullable=True)
-    aadhaar_file_path = Column(String, nullable=True)
-
-    pan_card_number = Column(String, nullable=True)
-    pan_card_file_path = Column(String, nullable=True)
-
-    voter_id_number = Column(String, nullable=True)
-    voter_id_file_path = Column(String, nullable=True)
-
-    driving_license_number = Column(String, nullable=True)
-    driving_license_file_path = Column(String, nullable=True)
-
-    ration_card_number = Column(String, nullable=True)
-    ration_card_file_path = Column(String, nullable=True)
-
-    # --- TIER 2 EXTENSION: NEW TRUST RECORDS ---
-    training_letter_file_path = Column(String, nullable=True)
-    apprenticeship_proof_file_path = Column(String, nullable=True)
-    local_authority_proof_file_path = Column(String, nullable=True)
+    # --- TIER 2: GOVERNMENT ID NUMBERS (All optional, Nullable=True) ---
+    # The uploaded proofs themselves live in user_documents
+    aadhaar_number = deferred(Column(String, nullable=True), group="kyc")
+    pan_card_number = deferred(Column(String, nullable=True), group="kyc")
+    voter_id_number = deferred(Column(String, nullable=True), group="kyc")
+    driving_license_number = deferred(Column(String, nullable=True), group="kyc")
+    ration_card_number = deferred(Column(String, nullable=True), group="kyc")
 
     # --- TIER 3: PROFESSIONAL PROOFS (All optional) ---
-    recommendation_file_path = Column(String, nullable=True)
-    community_verifier_id = Column(String, nullable=True)
-    previous_certificates_file_path = Column(String, nullable=True)
-    past_jobs_proof_file_path = Column(String, nullable=True)
-
-    # --- TIER 3 EXTENSION: WORK JOURNEY ---
-    daily_task_photo_file_path = Column(String, nullable=True)
-    work_video_file_path = Column(String, nullable=True)
-    campus_lab_doc_file_path = Column(String, nullable=True)
-    community_recording_file_path = Column(String, nullable=True)
+    community_verifier_id = deferred(Column(String, nullable=True), group="kyc")
 
     # --- TIER 3: SKILL SCORE ---
-    tier3_cibil_score = Column(Integer, default=0)
+    tier3_cibil_score = deferred(Column(Integer, default=0), group="kyc")
 
     # Relationship to SkillWallet (One User owns One SkillWallet)
     skill_wallet = relationship("SkillWallet", back_populates="owner", uselist=False)
+    documents = relationship("UserDocument", back_populates="user")
+
+
+# doc_type values of user_documents (the profile photo stays on the User row, it is shown everywhere)
+DOC_TYPES = {
+    "aadhaar",
+    "pan_card",
+    "training_letter",
+    "apprenticeship_proof",
+    "local_authority_proof",
+    "daily_task_photo",
+    "work_video",
+    "community_recording"
+}
+# file_type values of uploads that are recorded on the user
+KNOWN_FILE_TYPES = DOC_TYPES | {"profile_photo"}
+
+class UserDocument(Base):
+    """
+    Tier 2 / Tier 3 proofs uploaded by a user, one current file per doc_type
+    (e.g. "aadhaar", "work_video"). Kept out of users so profile lookups stay narrow.
+    """
+    __tablename__ = "user_documents"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    doc_type = Column(String, nullable=False)
+    path = Column(String, nullable=False)
+    uploaded_at = Column(DateTime, default=datetime.utcnow)
+    hash = Column(String, nullable=True) # SHA-256 of the file, as in stored_files
+
+    user = relationship("User", back_populates="documents")
+
+    __table_args__ = (
+        # Re-uploading a doc_type replaces the row; also serves "all docs of a user"
+        UniqueConstraint("user_id", "doc_type", name="uq_user_document_type"),
+    )
+
+class StoredFile(Base):
+    """
+    Content hash of every file uploaded through the API, taken once while it is
+    stored (or when a direct upload completes), so submissions never re-read files.
+    """
+    __tablename__ = "stored_files"
+
+    path = Column(String, primary_key=True) # "uploads/<key>", as handed to the client
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    hash = Column(String, nullable=False) # SHA-256 of the content
+    size = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
 
 
 # ----------------------------------------------------------------------
@@ -146,10 +174,28 @@ class SkillCredential(Base):
     is_verified = Column(Boolean, default=False) 
 
     issued_date = Column(DateTime, default=datetime.utcnow)
+    # Set on every ORM / Core write (grading happens after issue), the export watermark
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Deduplication - retries and re-uploads of the same proof map to one credential
+    idempotency_key = Column(String, nullable=True) # Client supplied Idempotency-Key header
+    proof_hash = Column(String, nullable=True) # SHA-256 of the work proof file ("" if none)
+    audio_hash = Column(String, nullable=True) # SHA-256 of the audio description ("" if none)
+    # Both NULL when neither file was given: such submissions are never deduplicated by content
 
     # Relationship back to the Skill Wallet
     wallet = relationship("SkillWallet", back_populates="credentials")
 
+    __table_args__ = (
+        UniqueConstraint("skill_wallet_id", "idempotency_key", name="uq_credential_idempotency"),
+        # One credential per wallet and content, also under concurrent submissions
+        UniqueConstraint("skill_wallet_id", "proof_hash", "audio_hash", name="uq_credential_content"),
+        # Wallet history in issue order (dashboards, public profile)
+        Index("ix_credential_wallet_issued", "skill_wallet_id", "issued_date"),
+        # Incremental exports by last change (export_utils)
+        Index("ix_credential_updated", "updated_at", "id"),
+    )
+
 # ----------------------------------------------------------------------
 # 4. SKILL BANK MODELS (Teaching & Learning Layer)
 # ----------------------------------------------------------------------
@@ -181,13 +227,28 @@ class LiveSessionReminder(Base):
     user_id = Column(Integer, ForeignKey("users.id"))
     session_id = Column(Integer, ForeignKey("live_sessions.id"))
     phone_number = Column(String)
-    reminder_date = Column(String) # Storing as string for simplicity YYYY-MM-DD
-    reminder_time = Column(String) # Storing as string HH:MM AM/PM
+    reminder_date = Column(String) # As entered: YYYY-MM-DD (kept for display)
+    reminder_time = Column(String) # As entered: HH:MM AM/PM (kept for display)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # Dispatch state (see reminder_dispatcher.py)
+    remind_at = Column(DateTime(timezone=True), nullable=True) # UTC instant parsed from date + time
+    status = Column(String, default="PENDING") # PENDING, SENDING, SENT, FAILED, EXPIRED, INVALID
+    attempts = Column(Integer, default=0)
+    claim_token = Column(String, nullable=True) # Dispatcher batch that is sending it
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
     user = relationship("User")
     session = relationship("LiveSession")
 
+    __table_args__ = (
+        # "Which of these sessions has this user set a reminder for?"
+        Index("ix_reminder_session_user", "session_id", "user_id"),
+        # Due reminders: status = 'PENDING' AND remind_at <= :horizon
+        Index("ix_reminder_due", "status", "remind_at"),
+    )
+
 # ----------------------------------------------------------------------
 # 5. OPPORTUNITY CACHE (For DuckDuckGo Results)
 # ----------------------------------------------------------------------
@@ -212,10 +273,21 @@ class LessonEnrollment(Base):
     enrolled_at = Column(DateTime, default=datetime.utcnow)
     last_accessed = Column(DateTime, default=datetime.utcnow) # NEW: For tracking weekly/monthly activity
     completed_at = Column(DateTime, nullable=True)
+    # Server time of the last write, the export watermark (last_accessed comes from client heartbeats)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     user = relationship("User")
     lesson = relationship("SkillLesson")
 
+    __table_args__ = (
+        # One enrollment per user and lesson; enroll_in_lesson relies on it under concurrent requests
+        UniqueConstraint("user_id", "lesson_id", name="uq_lesson_enrollment_user_lesson"),
+        # Covering index for per-lesson student lists and counts
+        Index("ix_lesson_enrollment_lesson_user", "lesson_id", "user_id"),
+        # Incremental exports by last change (export_utils)
+        Index("ix_lesson_enrollment_updated", "updated_at", "id"),
+    )
+
 class SessionEnrollment(Base):
     __tablename__ = "session_enrollments"
 
@@ -226,10 +298,21 @@ class SessionEnrollment(Base):
     status = Column(String, default="REGISTERED") # REGISTERED, ATTENDED
     
     registered_at = Column(DateTime, default=datetime.utcnow)
+    # Set on every ORM / Core write (status changes after registration), the export watermark
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     user = relationship("User")
     session = relationship("LiveSession")
 
+    __table_args__ = (
+        # One registration per user and session; registration inserts rely on it (enrollment_utils)
+        UniqueConstraint("user_id", "session_id", name="uq_session_enrollment_user_session"),
+        # Covering index for per-session attendee lists and counts
+        Index("ix_session_enrollment_session_user", "session_id", "user_id"),
+        # Incremental exports by last change (export_utils)
+        Index("ix_session_enrollment_updated", "updated_at", "id"),
+    )
+
 class LiveSession(Base):
     __tablename__ = "live_sessions"
 
@@ -246,7 +329,55 @@ class LiveSession(Base):
     
     is_active = Column(Boolean, default=False)
     meeting_link = Column(String, nullable=True) # Simulated link
+
+    capacity = Column(Integer, nullable=True) # Seats; NULL = unlimited
+    seats_taken = Column(Integer, default=0, nullable=False) # Kept in step with session_enrollments by register_for_session
     
     created_at = Column(DateTime, default=datetime.utcnow)
     
     teacher = relationship("User")
+
+    __table_args__ = (
+        # Upcoming-session range filters, and a teacher's sessions by date
+        Index("ix_live_session_scheduled", "scheduled_at"),
+        Index("ix_live_session_teacher_scheduled", "teacher_id", "scheduled_at"),
+    )
+
+# ----------------------------------------------------------------------
+# 6. COHORT STATISTICS (Peer comparison, written by cohort_stats.py)
+# ----------------------------------------------------------------------
+class CohortStats(Base):
+    __tablename__ = "cohort_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Cohort key; unknown values are stored as "" so the unique constraint holds
+    profession = Column(String, nullable=False, default="")
+    state = Column(String, nullable=False, default="")
+    district = Column(String, nullable=False, default="")
+
+    workers = Column(Integer, default=0) # Workers with at least one scored credential
+    mean_score = Column(Integer, nullable=True)
+    percentiles = Column(Text, nullable=True) # JSON: {"p10": 420, "p25": ..., "p90": ...}
+    histogram = Column(Text, nullable=True) # JSON: worker counts per COHORT_HISTOGRAM_BUCKET points from 300
+    score_table = Column(Text, nullable=True) # JSON: [[score, workers below, workers at score], ...] for rank lookups
+
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("profession", "state", "district", name="uq_cohort_key"),
+    )
+
+class WorkerScore(Base):
+    __tablename__ = "worker_scores"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    cohort_id = Column(Integer, ForeignKey("cohort_stats.id"), index=True)
+
+    score = Column(Integer) # Average skill_trust_score, as on the dashboard
+    previous_score = Column(Integer, nullable=True) # Score before the last change
+    percentile = Column(Integer) # 0-100: share of the cohort scoring lower (ties count half)
+    rank = Column(Integer) # 1 = highest score in the cohort
+
+    score_changed_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
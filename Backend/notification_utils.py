@@ -0,0 +1,106 @@
+import threading
+from collections import deque, namedtuple
+from config import settings
+from tracing_utils import get_logger, span
+
+logger = get_logger("notifications")
+
+# ----------------------------------------------------------------------
+# Outgoing SMS / notifications (live session reminders, ...).
+#
+# NOTIFICATION_BACKEND:
+#   "log"    -> local stub: logs each message and keeps the last few in
+#               memory (LogSender.outbox); nothing leaves the machine
+#   "twilio" -> Twilio Programmable Messaging (TWILIO_* settings)
+# ----------------------------------------------------------------------
+
+Message = namedtuple("Message", ["key", "to", "body"])
+
+# ----------------------------------------------------------------------
+# 1. BASE INTERFACE
+# ----------------------------------------------------------------------
+class NotificationSender:
+    name = "base"
+
+    def send_batch(self, messages):
+        """
+        Sends several messages. Returns {message.key: error string or None};
+        one failed message must not fail the others.
+        """
+        raise NotImplementedError
+
+# ----------------------------------------------------------------------
+# 2. LOCAL STUB
+# ----------------------------------------------------------------------
+class LogSender(NotificationSender):
+    name = "log"
+
+    def __init__(self, keep=1000):
+        self.outbox = deque(maxlen=keep)
+        self.lock = threading.Lock()
+
+    def send_batch(self, messages):
+        with self.lock:
+            self.outbox.extend(messages)
+        for message in messages:
+            logger.info("Notification (stub)", extra={"key": message.key, "to": message.to, "body": message.body})
+        return {message.key: None for message in messages}
+
+# ----------------------------------------------------------------------
+# 3. TWILIO
+# ----------------------------------------------------------------------
+class TwilioSender(NotificationSender):
+    name = "twilio"
+
+    def __init__(self, account_sid, auth_token, from_number=None, messaging_service_sid=None):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.from_number = from_number or None
+        self.messaging_service_sid = messaging_service_sid or None
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        # Imported on first use, like boto3 in storage_utils
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    try:
+                        from twilio.rest import Client
+                    except ImportError:
+                        raise RuntimeError("NOTIFICATION_BACKEND=twilio requires twilio (pip install twilio)")
+                    self._client = Client(self.account_sid, self.auth_token)
+        return self._client
+
+    def send_batch(self, messages):
+        # Twilio has no bulk SMS call; the batch shares one client and one span
+        results = {}
+        with span("notifications.twilio_batch", size=len(messages)):
+            for message in messages:
+                sender = {"from_": self.from_number} if self.from_number else {"messaging_service_sid": self.messaging_service_sid}
+                try:
+                    self.client.messages.create(to=message.to, body=message.body, **sender)
+                    results[message.key] = None
+                except Exception as e:
+                    results[message.key] = str(e)
+        return results
+
+# ----------------------------------------------------------------------
+# 4. FACTORY
+# ----------------------------------------------------------------------
+_sender = None
+
+def get_sender():
+    global _sender
+    if _sender is None:
+        if settings.NOTIFICATION_BACKEND == "twilio":
+            _sender = TwilioSender(
+                account_sid=settings.TWILIO_ACCOUNT_SID,
+                auth_token=settings.TWILIO_AUTH_TOKEN,
+                from_number=settings.TWILIO_FROM_NUMBER,
+                messaging_service_sid=settings.TWILIO_SERVICE_SID,
+            )
+        else:
+            _sender = LogSender()
+    return _sender
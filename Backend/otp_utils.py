@@ -0,0 +1,246 @@
+import time
+import threading
+from collections import namedtuple
+from config import settings
+
+# ----------------------------------------------------------------------
+# OTP challenges and login rate limits, kept out of the users table.
+#
+# send_otp only writes a short-lived challenge here; the User row is created
+# by verify_user_otp once the code checks out. Every request first takes a
+# token from per-phone / per-IP token buckets, so retry storms and abuse are
+# turned away before they cost an SMS or a database write.
+#
+# OTP_STORE_BACKEND:
+#   "memory" -> per process; fine for one worker (SERVE_MODE=single)
+#   "redis"  -> shared by all workers; point OTP_REDIS_URL at a local
+#               Redis / Valkey container to run it without managed infra
+# ----------------------------------------------------------------------
+
+OtpChallenge = namedtuple("OtpChallenge", ["otp_hash", "attempts"])
+
+# ----------------------------------------------------------------------
+# 1. BASE INTERFACE
+# ----------------------------------------------------------------------
+class OtpStore:
+    name = "base"
+
+    def save_challenge(self, phone, otp_hash, ttl_seconds):
+        """Stores (or replaces) the pending challenge for a phone number."""
+        raise NotImplementedError
+
+    def get_challenge(self, phone):
+        """Returns the pending OtpChallenge, or None if there is none or it expired."""
+        raise NotImplementedError
+
+    def claim_attempt(self, phone):
+        """
+        Counts one verification attempt against the pending challenge, atomically, and returns
+        the OtpChallenge with the new count (None if there is none). Callers compare that count,
+        so concurrent guesses can't all pass a check made before any of them was counted.
+        """
+        raise NotImplementedError
+
+    def consume_challenge(self, phone):
+        """Removes the challenge. Returns True only for the caller that removed it."""
+        raise NotImplementedError
+
+    def take_token(self, key, rate_per_second, burst):
+        """
+        Token bucket: takes one token from bucket `key`.
+        Returns (allowed, seconds until a token is available).
+        """
+        raise NotImplementedError
+
+# ----------------------------------------------------------------------
+# 2. IN-MEMORY (single process)
+# ----------------------------------------------------------------------
+class MemoryOtpStore(OtpStore):
+    name = "memory"
+    # Expired entries are swept every this many writes, so the dicts stay bounded
+    SWEEP_EVERY = 1024
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.challenges = {} # phone -> [otp_hash, attempts, expires_at]
+        self.buckets = {} # key -> [tokens, updated_at, rate, burst]
+        self.writes = 0
+
+    def _sweep(self, now):
+        self.writes += 1
+        if self.writes % self.SWEEP_EVERY:
+            return
+        self.challenges = {k: v for k, v in self.challenges.items() if v[2] > now}
+        # A bucket that has refilled completely holds no state worth keeping
+        self.buckets = {k: b for k, b in self.buckets.items() if b[0] + (now - b[1]) * b[2] < b[3]}
+
+    def save_challenge(self, phone, otp_hash, ttl_seconds):
+        now = time.monotonic()
+        with self.lock:
+            self._sweep(now)
+            self.challenges[phone] = [otp_hash, 0, now + ttl_seconds]
+
+    def get_challenge(self, phone):
+        with self.lock:
+            entry = self.challenges.get(phone)
+            if entry is None or entry[2] <= time.monotonic():
+                return None
+            return OtpChallenge(entry[0], entry[1])
+
+    def claim_attempt(self, phone):
+        with self.lock:
+            entry = self.challenges.get(phone)
+            if entry is None or entry[2] <= time.monotonic():
+                return None
+            entry[1] += 1
+            return OtpChallenge(entry[0], entry[1])
+
+    def consume_challenge(self, phone):
+        with self.lock:
+            entry = self.challenges.pop(phone, None)
+            return entry is not None and entry[2] > time.monotonic()
+
+    def take_token(self, key, rate_per_second, burst):
+        now = time.monotonic()
+        with self.lock:
+            self._sweep(now)
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = [float(burst), now, rate_per_second, burst]
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate_per_second)
+            bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True, 0.0
+            return False, (1 - bucket[0]) / rate_per_second
+
+# ----------------------------------------------------------------------
+# 3. REDIS (shared across workers and hosts)
+# ----------------------------------------------------------------------
+# Refill and take in one round trip, atomically; the clock is Redis's own,
+# so workers on different hosts agree on it.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(wait)}
+"""
+
+# Only counts against a challenge that still exists (HINCRBY alone would recreate it without a TTL)
+CLAIM_ATTEMPT_SCRIPT = """
+local otp_hash = redis.call('HGET', KEYS[1], 'otp_hash')
+if not otp_hash then
+    return nil
+end
+return {otp_hash, redis.call('HINCRBY', KEYS[1], 'attempts', 1)}
+"""
+
+class RedisOtpStore(OtpStore):
+    name = "redis"
+    PREFIX = "skillwallet:otp:"
+
+    def __init__(self, url):
+        self.url = url
+        self._client = None
+        self._bucket_script = None
+        self._claim_script = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        # Imported on first use, like boto3 in storage_utils
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    try:
+                        import redis
+                    except ImportError:
+                        raise RuntimeError("OTP_STORE_BACKEND=redis requires redis (pip install redis)")
+                    client = redis.Redis.from_url(self.url, decode_responses=True)
+                    self._bucket_script = client.register_script(TOKEN_BUCKET_SCRIPT)
+                    self._claim_script = client.register_script(CLAIM_ATTEMPT_SCRIPT)
+                    self._client = client
+        return self._client
+
+    def _challenge_key(self, phone):
+        return f"{self.PREFIX}challenge:{phone}"
+
+    def save_challenge(self, phone, otp_hash, ttl_seconds):
+        key = self._challenge_key(phone)
+        pipe = self.client.pipeline()
+        pipe.delete(key)
+        pipe.hset(key, mapping={"otp_hash": otp_hash, "attempts": 0})
+        pipe.expire(key, int(ttl_seconds))
+        pipe.execute()
+
+    def get_challenge(self, phone):
+        entry = self.client.hgetall(self._challenge_key(phone))
+        if not entry:
+            return None
+        return OtpChallenge(entry["otp_hash"], int(entry.get("attempts", 0)))
+
+    def claim_attempt(self, phone):
+        client = self.client
+        result = self._claim_script(keys=[self._challenge_key(phone)], client=client)
+        if not result:
+            return None
+        return OtpChallenge(result[0], int(result[1]))
+
+    def consume_challenge(self, phone):
+        return self.client.delete(self._challenge_key(phone)) == 1
+
+    def take_token(self, key, rate_per_second, burst):
+        client = self.client
+        allowed, wait = self._bucket_script(keys=[f"{self.PREFIX}bucket:{key}"], args=[rate_per_second, burst], client=client)
+        return allowed == 1, float(wait)
+
+# ----------------------------------------------------------------------
+# 4. FACTORY + RATE LIMITS
+# ----------------------------------------------------------------------
+_store = None
+
+def get_otp_store():
+    global _store
+    if _store is None:
+        if settings.OTP_STORE_BACKEND == "redis":
+            _store = RedisOtpStore(settings.OTP_REDIS_URL)
+        else:
+            _store = MemoryOtpStore()
+    return _store
+
+def check_rate_limits(action, phone=None, client_ip=None):
+    """
+    Takes a token from each bucket that applies to this request.
+    Returns 0 when allowed, else the seconds to wait (for Retry-After).
+    """
+    store = get_otp_store()
+    limits = []
+    if phone and action == "verify":
+        # Guessing codes for one phone from many IPs
+        limits.append((f"{action}:phone:{phone}", 1 / settings.OTP_VERIFY_PHONE_REFILL_SECONDS, settings.OTP_VERIFY_PHONE_BURST))
+    elif phone:
+        limits.append((f"{action}:phone:{phone}", 1 / settings.OTP_PHONE_REFILL_SECONDS, settings.OTP_PHONE_BURST))
+    if client_ip:
+        limits.append((f"{action}:ip:{client_ip}", 1 / settings.OTP_IP_REFILL_SECONDS, settings.OTP_IP_BURST))
+
+    retry_after = 0.0
+    for key, rate, burst in limits:
+        allowed, wait = store.take_token(key, rate, burst)
+        if not allowed:
+            retry_after = max(retry_after, wait)
+    return retry_after
@@ -0,0 +1,104 @@
+import sys
+import time
+import threading
+from collections import Counter
+from contextvars import ContextVar
+
+# ----------------------------------------------------------------------
+# On-demand sampling profiler for single requests.
+# Enabled per request by main.py (X-Profile header, PROFILING_ENABLED +
+# PROFILING_TOKEN settings). A sampler thread snapshots the stacks of the
+# request's threads at a fixed interval; overhead is confined to the
+# profiled request's lifetime.
+#
+# The request's threads are the event loop thread that started the profiler
+# and every threadpool thread that calls track_thread() (main.get_db does).
+# Threadpool work inherits the request's context, so track_thread() finds
+# the request's profiler there. Other requests, the job queue and the log
+# writer are not sampled.
+# ----------------------------------------------------------------------
+
+# Innermost frames that mean "this thread is parked", not doing request work
+IDLE_FUNCTIONS = {"wait", "select", "poll", "epoll", "_worker", "get", "dequeue", "accept", "sleep", "run_forever", "_run_once"}
+MAX_STACK_DEPTH = 64
+
+current_profiler: ContextVar = ContextVar("current_profiler", default=None)
+
+def track_thread():
+    """Adds the calling thread to the profile of the current request, if it is being profiled."""
+    profiler = current_profiler.get()
+    if profiler is not None:
+        profiler.threads.add(threading.get_ident())
+
+def _frame_label(frame):
+    code = frame.f_code
+    module = code.co_filename.rsplit("/", 1)[-1]
+    return f"{module}:{code.co_name}:{frame.f_lineno}"
+
+class SamplingProfiler:
+    """
+    Samples the threads working on one request (see track_thread), skipping
+    idle moments. Stacks are kept in collapsed "outer;...;inner" form, ready
+    for flamegraph tooling.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.started = None
+        self.elapsed = 0.0
+        self.stopping = threading.Event()
+        self.threads = {threading.get_ident()}
+        self.thread = threading.Thread(target=self._sample_loop, name="request-profiler", daemon=True)
+        self._token = None
+
+    def start(self):
+        self._token = current_profiler.set(self)
+        self.started = time.perf_counter()
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        self.thread.join()
+        self.elapsed = time.perf_counter() - self.started
+        current_profiler.reset(self._token)
+
+    def _sample_loop(self):
+        while not self.stopping.wait(self.interval):
+            self.samples += 1
+            frames = sys._current_frames()
+            for thread_id in list(self.threads):
+                frame = frames.get(thread_id)
+                if frame is None or frame.f_code.co_name in IDLE_FUNCTIONS:
+                    continue
+                labels = []
+                while frame is not None and len(labels) < MAX_STACK_DEPTH:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(labels))] += 1
+
+    def report(self, top=25):
+        """Summary of where sampled time went: hottest stacks and per-function self/total counts."""
+        self_counts = Counter()
+        total_counts = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            self_counts[frames[-1]] += count
+            for label in set(frames):
+                total_counts[label] += count
+        busy = sum(self.stacks.values())
+
+        def rows(counter):
+            return [{"frame": label, "samples": n, "share": round(n / busy, 4)} for label, n in counter.most_common(top)]
+
+        return {
+            "duration_ms": round(self.elapsed * 1000, 3),
+            "interval_ms": self.interval * 1000,
+            "ticks": self.samples,
+            "busy_samples": busy,
+            "top_self": rows(self_counts) if busy else [],
+            "top_total": rows(total_counts) if busy else [],
+            "collapsed_stacks": [f"{stack} {n}" for stack, n in self.stacks.most_common(top)]
+        }
@@ -0,0 +1,181 @@
+import threading
+from datetime import datetime, timezone
+from sqlalchemy import update, bindparam, case, or_, func, DateTime
+from config import settings
+from database import SessionLocal
+from metrics_utils import PROGRESS_EVENTS, PROGRESS_FLUSH_LATENCY
+from tracing_utils import get_logger, span
+import models
+
+logger = get_logger("progress")
+
+# ----------------------------------------------------------------------
+# Write-coalescing buffer for lesson progress heartbeats.
+#
+# POST /skillbank/progress/batch/{user_id} only records events here. Per
+# enrollment the buffer keeps the latest state by event time, plus the
+# earliest completion seen, so a COMPLETED heartbeat followed by more
+# heartbeats in the same window still sets completed_at. Every
+# PROGRESS_FLUSH_SECONDS the pending states are written with one executemany
+# UPDATE per PROGRESS_FLUSH_BATCH_SIZE enrollments, and stop() writes
+# whatever is left on shutdown.
+#
+# The UPDATE only applies state newer than the row's last_accessed, so events
+# that arrive late (or through another worker's buffer) never move progress
+# backwards. Reads see buffered progress after the next flush. updated_at
+# (the export watermark) is set to the flush time by the column's onupdate,
+# whatever time the client put on its heartbeats.
+# ----------------------------------------------------------------------
+
+Enrollments = models.LessonEnrollment.__table__
+_at = bindparam("b_at", type_=DateTime())
+_is_newer = or_(Enrollments.c.last_accessed.is_(None), Enrollments.c.last_accessed <= _at)
+
+FLUSH_STATEMENT = (
+    update(Enrollments)
+    .where(Enrollments.c.id == bindparam("b_id"), Enrollments.c.user_id == bindparam("b_user_id"))
+    .values(
+        progress_percent=case((_is_newer, bindparam("b_progress")), else_=Enrollments.c.progress_percent),
+        status=case((_is_newer, bindparam("b_status")), else_=Enrollments.c.status),
+        last_accessed=case((_is_newer, _at), else_=Enrollments.c.last_accessed),
+        completed_at=func.coalesce(Enrollments.c.completed_at, bindparam("b_completed_at", type_=DateTime())),
+    )
+)
+
+def event_time(timestamp, now):
+    """Client timestamp -> naive UTC (as the models store it), never later than now."""
+    if timestamp is None:
+        return now
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return min(timestamp, now)
+
+class ProgressBuffer:
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self.lock = threading.Lock()
+        # (user_id, enrollment_id) -> [progress, status, at, completed_at]
+        self.pending = {}
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = None
+        self.written = 0
+        self.flushes = 0
+
+    # --- recording ---
+    def _merge(self, key, progress, status, at, completed_at):
+        """Folds one state into the pending entry. Caller holds self.lock. Returns True if an entry was replaced."""
+        entry = self.pending.get(key)
+        if entry is None:
+            self.pending[key] = [progress, status, at, completed_at]
+            return False
+        if at >= entry[2]:
+            entry[0], entry[1], entry[2] = progress, status, at
+        if completed_at is not None and (entry[3] is None or completed_at < entry[3]):
+            entry[3] = completed_at
+        return True
+
+    def record(self, user_id, events):
+        """
+        Buffers (enrollment_id, progress, status, timestamp) events for one user.
+        Returns the number of events accepted; nothing is written until the next flush.
+        """
+        now = datetime.utcnow()
+        coalesced = 0
+        with self.lock:
+            for enrollment_id, progress, status, timestamp in events:
+                at = event_time(timestamp, now)
+                completed_at = at if status == "COMPLETED" else None
+                coalesced += self._merge((user_id, enrollment_id), progress, status, at, completed_at)
+            backlog = len(self.pending)
+        PROGRESS_EVENTS.inc(len(events), result="buffered")
+        PROGRESS_EVENTS.inc(coalesced, result="coalesced")
+        if backlog >= settings.PROGRESS_BUFFER_MAX_PENDING:
+            self.wakeup.set()
+        return len(events)
+
+    # --- writing ---
+    def flush(self):
+        """Writes every pending state. Returns the number of enrollments written."""
+        # One flush at a time, so an older snapshot never lands after a newer one
+        with self.flush_lock:
+            with self.lock:
+                snapshot, self.pending = self.pending, {}
+            if not snapshot:
+                return 0
+
+            items = list(snapshot.items())
+            written = 0
+            batch_size = settings.PROGRESS_FLUSH_BATCH_SIZE
+            with PROGRESS_FLUSH_LATENCY.time(), span("progress.flush", enrollments=len(items)):
+                for start in range(0, len(items), batch_size):
+                    batch = items[start:start + batch_size]
+                    params = [
+                        {"b_user_id": user_id, "b_id": enrollment_id, "b_progress": progress,
+                         "b_status": status, "b_at": at, "b_completed_at": completed_at}
+                        for (user_id, enrollment_id), (progress, status, at, completed_at) in batch
+                    ]
+                    db = self.session_factory()
+                    try:
+                        db.execute(FLUSH_STATEMENT, params)
+                        db.commit()
+                        written += len(batch)
+                    except Exception:
+                        db.rollback()
+                        logger.exception("Progress flush failed; keeping events for the next flush",
+                                         extra={"enrollments": len(items) - written})
+                        # Put the unwritten states back; newer events recorded meanwhile still win
+                        with self.lock:
+                            for key, entry in items[start:]:
+                                self._merge(key, *entry)
+                        PROGRESS_EVENTS.inc(len(items) - written, result="failed")
+                        break
+                    finally:
+                        db.close()
+
+            self.written += written
+            self.flushes += 1
+            PROGRESS_EVENTS.inc(written, result="written")
+            return written
+
+    # --- lifecycle ---
+    def _loop(self):
+        while not self.stopping.is_set():
+            self.wakeup.wait(settings.PROGRESS_FLUSH_SECONDS)
+            self.wakeup.clear()
+            if self.stopping.is_set():
+                break
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Progress flush loop failed")
+
+    def start(self):
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._loop, name="progress-flusher", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=10):
+        """Stops the timer and flushes what is still buffered (called on shutdown)."""
+        self.stopping.set()
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+        written = self.flush()
+        if written:
+            logger.info("Flushed buffered progress on shutdown", extra={"enrollments": written})
+        return written
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def stats(self):
+        with self.lock:
+            pending = len(self.pending)
+        return {"running": self.running, "pending": pending, "written": self.written, "flushes": self.flushes}
+
+progress_buffer = ProgressBuffer()
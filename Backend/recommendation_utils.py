@@ -0,0 +1,264 @@
+import re
+import math
+import json
+import time
+import heapq
+import threading
+from collections import Counter, namedtuple
+from config import settings
+from database import SessionLocal
+from metrics_utils import RECOMMENDATION_INDEX_BUILD_LATENCY, RECOMMENDATION_INDEX_LESSONS
+from tracing_utils import get_logger, span
+import models
+
+logger = get_logger("recommendations")
+
+# ----------------------------------------------------------------------
+# Lesson recommendations for /skills/recommended.
+#
+# Every worker keeps a TF-IDF index of the lesson catalog in memory: one
+# sparse vector per lesson (term -> weight, title terms counted twice) and an
+# inverted index (term -> lessons containing it), so a query only touches the
+# lessons sharing at least one term with it. The user's query is their
+# profession plus the gaps named in the feedback of their recent credentials
+# (limiting_factors / improvement_tips); lessons are ranked by cosine
+# similarity and the top k are returned.
+#
+# The index is rebuilt from the database every RECOMMENDATION_REBUILD_SECONDS.
+# Lessons created in between are added incrementally by add_lesson(); their
+# terms shift the IDF of other lessons slightly, which the next rebuild
+# evens out.
+# ----------------------------------------------------------------------
+
+LessonDoc = namedtuple("LessonDoc", ["id", "title", "type", "price", "duration_minutes", "difficulty", "language", "terms"])
+Match = namedtuple("Match", ["lesson", "score", "gap_score"])
+
+# Profession terms weigh more than any single feedback phrase
+PROFESSION_WEIGHT = 2.0
+TITLE_WEIGHT = 2
+
+STOPWORDS = frozenset("""
+a an and are as at be but by can do for from has have how in into is it its more of on or so than that the
+their them then there these this to too use used using very was were when which while will with work your you
+""".split())
+SUFFIXES = ("ing", "ers", "er", "es", "ed", "s")
+TOKEN = re.compile(r"[a-z0-9]+")
+
+def stem(word):
+    # Just enough folding that "painter", "painting" and "paints" meet at "paint"
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+def tokenize(text):
+    return [stem(word) for word in TOKEN.findall((text or "").lower()) if word not in STOPWORDS and len(word) > 1]
+
+def lesson_terms(title, description):
+    terms = Counter(tokenize(description))
+    for term in tokenize(title):
+        terms[term] += TITLE_WEIGHT
+    return terms
+
+def lesson_doc(lesson_id, title, description, type=None, price=0, duration_minutes=None, difficulty=None, language=None):
+    return LessonDoc(lesson_id, title, type, price or 0, duration_minutes, difficulty, language, lesson_terms(title, description))
+
+def feedback_gaps(evaluation_feedback):
+    """The limiting factors and improvement tips of one credential's feedback JSON, as text."""
+    try:
+        feedback = json.loads(evaluation_feedback) if evaluation_feedback else {}
+    except ValueError:
+        return ""
+    if not isinstance(feedback, dict):
+        return ""
+    parts = []
+    for key in ("limiting_factors", "improvement_tips"):
+        values = feedback.get(key) or []
+        parts.extend(str(value) for value in (values if isinstance(values, list) else [values]))
+    return " ".join(parts)
+
+# ----------------------------------------------------------------------
+# 1. TF-IDF CATALOG
+# ----------------------------------------------------------------------
+def tf_weight(count):
+    return 1.0 + math.log(count)
+
+class Catalog:
+    """Sparse TF-IDF vectors with an inverted index. Not thread-safe; RecommendationIndex guards it."""
+
+    def __init__(self, docs=()):
+        self.docs = {}
+        self.df = Counter()
+        self.postings = {} # term -> {lesson_id: tf weight}
+        self.norms = {}
+        for doc in docs:
+            self._insert(doc)
+        self.norms = {doc_id: self._norm(doc) for doc_id, doc in self.docs.items()}
+
+    def idf(self, term):
+        return math.log((1 + len(self.docs)) / (1 + self.df[term])) + 1.0
+
+    def _norm(self, doc):
+        return math.sqrt(sum((tf_weight(count) * self.idf(term)) ** 2 for term, count in doc.terms.items())) or 1.0
+
+    def _insert(self, doc):
+        self.docs[doc.id] = doc
+        for term, count in doc.terms.items():
+            self.df[term] += 1
+            self.postings.setdefault(term, {})[doc.id] = tf_weight(count)
+
+    def remove(self, lesson_id):
+        doc = self.docs.pop(lesson_id, None)
+        if doc is None:
+            return
+        self.norms.pop(lesson_id, None)
+        for term in doc.terms:
+            self.df[term] -= 1
+            if self.df[term] <= 0:
+                del self.df[term]
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(lesson_id, None)
+                if not postings:
+                    del self.postings[term]
+
+    def add(self, doc):
+        """Adds or replaces one lesson. Only its own norm is computed; others wait for the next rebuild."""
+        self.remove(doc.id)
+        self._insert(doc)
+        self.norms[doc.id] = self._norm(doc)
+
+    def score(self, weighted_terms, exclude=()):
+        """Cosine similarity of every lesson sharing a term with the query: {lesson_id: score}."""
+        query = {term: tf_weight(weight) * self.idf(term) for term, weight in weighted_terms.items() if term in self.postings}
+        query_norm = math.sqrt(sum(w * w for w in query.values()))
+        if not query_norm:
+            return {}
+        scores = {}
+        for term, query_weight in query.items():
+            idf = self.idf(term)
+            for lesson_id, doc_weight in self.postings[term].items():
+                if lesson_id not in exclude:
+                    scores[lesson_id] = scores.get(lesson_id, 0.0) + query_weight * doc_weight * idf
+        return {lesson_id: score / (self.norms[lesson_id] * query_norm) for lesson_id, score in scores.items()}
+
+# ----------------------------------------------------------------------
+# 2. PER-WORKER INDEX
+# ----------------------------------------------------------------------
+class RecommendationIndex:
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self.lock = threading.Lock()
+        self.catalog = Catalog()
+        self.built_at = None
+        self.build_lock = threading.Lock()
+        self.added_during_build = None
+        self.stopping = threading.Event()
+        self.thread = None
+        self.builds = 0
+
+    # --- building ---
+    def build(self, db=None):
+        """Reloads the whole catalog from the database and swaps it in. Returns the number of lessons."""
+        with self.build_lock:
+            with self.lock:
+                self.added_during_build = {}
+            own_session = db is None
+            db = self.session_factory() if own_session else db
+            started = time.perf_counter()
+            try:
+                with span("recommendations.build"):
+                    Lesson = models.SkillLesson
+                    rows = db.query(Lesson.id, Lesson.title, Lesson.description, Lesson.type, Lesson.price,
+                                    Lesson.duration_minutes, Lesson.difficulty, Lesson.language).all()
+                    catalog = Catalog(lesson_doc(*row) for row in rows)
+            except Exception:
+                with self.lock:
+                    self.added_during_build = None
+                raise
+            finally:
+                if own_session:
+                    db.close()
+
+            with self.lock:
+                # Lessons created while the rows were loading may be missing from them
+                for doc in self.added_during_build.values():
+                    catalog.add(doc)
+                self.added_during_build = None
+                self.catalog = catalog
+                self.built_at = time.time()
+                self.builds += 1
+                size = len(catalog.docs)
+            RECOMMENDATION_INDEX_BUILD_LATENCY.observe(time.perf_counter() - started)
+            RECOMMENDATION_INDEX_LESSONS.set(size)
+            return size
+
+    def ensure_built(self):
+        """Builds the index on first use (scripts and tests that skip the app lifespan)."""
+        if self.built_at is None:
+            try:
+                self.build()
+            except Exception:
+                logger.exception("Recommendation index build failed; serving an empty index")
+
+    def add_lesson(self, doc):
+        with self.lock:
+            self.catalog.add(doc)
+            if self.added_during_build is not None:
+                self.added_during_build[doc.id] = doc
+            size = len(self.catalog.docs)
+        RECOMMENDATION_INDEX_LESSONS.set(size)
+
+    # --- querying ---
+    def top_k(self, profession, gaps, k=None, exclude=()):
+        """
+        Ranks lessons against a profession and a list of feedback gap texts.
+        Returns up to k Matches, best first; gap_score is the part of the score the gaps earned.
+        """
+        k = k or settings.RECOMMENDATION_TOP_K
+        profession_terms = Counter({term: PROFESSION_WEIGHT for term in tokenize(profession)})
+        gap_terms = Counter()
+        for gap in gaps:
+            gap_terms.update(tokenize(gap))
+        with self.lock:
+            catalog = self.catalog
+            scores = catalog.score(profession_terms + gap_terms, exclude)
+            best = heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
+            gap_scores = catalog.score(gap_terms, exclude) if gap_terms and best else {}
+            return [Match(catalog.docs[lesson_id], score, gap_scores.get(lesson_id, 0.0)) for lesson_id, score in best]
+
+    # --- lifecycle ---
+    def _loop(self):
+        while not self.stopping.wait(settings.RECOMMENDATION_REBUILD_SECONDS):
+            try:
+                self.build()
+            except Exception:
+                logger.exception("Recommendation index rebuild failed; serving the previous index")
+
+    def start(self):
+        try:
+            self.build()
+        except Exception:
+            logger.exception("Recommendation index build failed; retrying on first request")
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._loop, name="recommendation-index", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def stats(self):
+        with self.lock:
+            lessons, terms = len(self.catalog.docs), len(self.catalog.postings)
+        age = None if self.built_at is None else round(time.time() - self.built_at, 1)
+        return {"running": self.running, "lessons": lessons, "terms": terms, "builds": self.builds, "age_seconds": age}
+
+recommendation_index = RecommendationIndex()
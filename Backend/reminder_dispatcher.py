@@ -0,0 +1,268 @@
+# Backend/reminder_dispatcher.py
+#
+# Sends live session reminders when they fall due.
+#
+#   python reminder_dispatcher.py            # run as its own service
+#   REMINDER_DISPATCHER_IN_APP=true          # or inside each API worker
+#
+# Pending reminders due within REMINDER_LOOKAHEAD_SECONDS are kept in an
+# in-memory heap ordered by remind_at. The database is only asked for that
+# window (index ix_reminder_due), never for sent history, so a restart costs
+# one small query. Reminders are claimed with a conditional UPDATE before
+# sending, so several dispatchers (one per worker) never send one twice;
+# a claim left behind by a crash is released after REMINDER_CLAIM_TIMEOUT_SECONDS.
+
+import sys
+import time
+import heapq
+import uuid
+import signal
+import threading
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from sqlalchemy import update
+from config import settings
+from database import SessionLocal
+from notification_utils import Message, get_sender
+from metrics_utils import REMINDERS_SENT
+from tracing_utils import get_logger, span
+import models
+
+logger = get_logger("reminders")
+
+TIME_FORMATS = ("%I:%M %p", "%I:%M%p", "%H:%M")
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+def as_utc(value):
+    # SQLite hands back naive datetimes; everything stored is UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+def parse_reminder_time(date_str, time_str, tz_name=None):
+    """
+    "2030-01-01" + "03:00 PM" in the user's timezone (default REMINDER_TIMEZONE) -> aware UTC datetime.
+    Raises ValueError if either part cannot be parsed.
+    """
+    try:
+        tz = ZoneInfo(tz_name or settings.REMINDER_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone {tz_name}")
+    day = datetime.strptime((date_str or "").strip(), "%Y-%m-%d").date()
+    for fmt in TIME_FORMATS:
+        try:
+            clock = datetime.strptime((time_str or "").strip().upper(), fmt).time()
+            break
+        except ValueError:
+            continue
+    else:
+        raise ValueError(f"Unrecognised time {time_str!r}")
+    return datetime.combine(day, clock, tzinfo=tz).astimezone(timezone.utc)
+
+def reminder_text(session):
+    title = session.title if session else "your live class"
+    return f"Skill Wallet reminder: \"{title}\" is starting soon."
+
+class ReminderDispatcher:
+    def __init__(self, session_factory=SessionLocal, sender=None):
+        self.session_factory = session_factory
+        self.sender = sender
+        self.heap = [] # (remind_at, reminder_id)
+        self.scheduled = set()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = None
+        self.next_refill = 0.0
+        self.sent = 0
+        self.failed = 0
+
+    # --- scheduling ---
+    def schedule(self, reminder_id, remind_at):
+        """Adds a reminder to the heap if it is due within the lookahead window (called on create)."""
+        remind_at = as_utc(remind_at)
+        if remind_at > utcnow() + timedelta(seconds=settings.REMINDER_LOOKAHEAD_SECONDS):
+            return # The next refill picks it up when it comes into the window
+        with self.lock:
+            if reminder_id not in self.scheduled:
+                self.scheduled.add(reminder_id)
+                heapq.heappush(self.heap, (remind_at, reminder_id))
+        self.wakeup.set()
+
+    def refill(self):
+        """Loads pending reminders due within the lookahead window, and releases stale claims."""
+        now = utcnow()
+        horizon = now + timedelta(seconds=settings.REMINDER_LOOKAHEAD_SECONDS)
+        stale = now - timedelta(seconds=settings.REMINDER_CLAIM_TIMEOUT_SECONDS)
+        Reminder = models.LiveSessionReminder
+        db = self.session_factory()
+        try:
+            released = db.execute(
+                update(Reminder)
+                .where(Reminder.status == "SENDING", Reminder.claimed_at < stale)
+                .values(status="PENDING", claim_token=None, claimed_at=None)
+            ).rowcount
+            db.commit()
+            if released:
+                logger.warning("Released stale reminder claims", extra={"count": released})
+            rows = db.query(Reminder.id, Reminder.remind_at).filter(
+                Reminder.status == "PENDING",
+                Reminder.remind_at <= horizon
+            ).all()
+        finally:
+            db.close()
+
+        with self.lock:
+            for reminder_id, remind_at in rows:
+                if reminder_id not in self.scheduled:
+                    self.scheduled.add(reminder_id)
+                    heapq.heappush(self.heap, (as_utc(remind_at), reminder_id))
+        self.next_refill = time.monotonic() + settings.REMINDER_REFILL_SECONDS
+        return len(rows)
+
+    def _pop_due(self):
+        now = utcnow()
+        due = []
+        with self.lock:
+            while self.heap and self.heap[0][0] <= now and len(due) < settings.REMINDER_BATCH_SIZE:
+                _, reminder_id = heapq.heappop(self.heap)
+                self.scheduled.discard(reminder_id)
+                due.append(reminder_id)
+        return due
+
+    def _seconds_until_next(self):
+        with self.lock:
+            next_due = (self.heap[0][0] - utcnow()).total_seconds() if self.heap else float("inf")
+        return max(0.0, min(next_due, self.next_refill - time.monotonic()))
+
+    # --- sending ---
+    def dispatch(self, reminder_ids):
+        """Claims, sends and records one batch. Returns the number sent."""
+        Reminder = models.LiveSessionReminder
+        token = uuid.uuid4().hex
+        now = utcnow()
+        db = self.session_factory()
+        try:
+            # Only rows still PENDING are claimed; another dispatcher may have taken some already
+            db.execute(
+                update(Reminder)
+                .where(Reminder.id.in_(reminder_ids), Reminder.status == "PENDING")
+                .values(status="SENDING", claim_token=token, claimed_at=now)
+            )
+            db.commit()
+            claimed = db.query(Reminder).filter(Reminder.claim_token == token).all()
+            if not claimed:
+                return 0
+
+            sessions = {s.id: s for s in db.query(models.LiveSession).filter(
+                models.LiveSession.id.in_({r.session_id for r in claimed})).all()}
+            late_cutoff = now - timedelta(seconds=settings.REMINDER_MAX_LATENESS_SECONDS)
+            messages = []
+            for reminder in claimed:
+                if as_utc(reminder.remind_at) < late_cutoff:
+                    # The dispatcher was down past the point where a reminder is useful
+                    reminder.status = "EXPIRED"
+                else:
+                    messages.append(Message(reminder.id, reminder.phone_number, reminder_text(sessions.get(reminder.session_id))))
+
+            with span("reminders.send_batch", size=len(messages), backend=self.sender.name) as send_span:
+                try:
+                    results = self.sender.send_batch(messages) if messages else {}
+                except Exception as e:
+                    # The whole batch failed (provider down, timeout): one failed attempt per message, so
+                    # retries back off and end in FAILED instead of being released and retried forever
+                    logger.warning("Reminder batch send failed", extra={"size": len(messages), "error": str(e)})
+                    send_span.set("error", type(e).__name__)
+                    results = {message.key: f"{type(e).__name__}: {e}" for message in messages}
+
+            sent = 0
+            for reminder in claimed:
+                if reminder.status == "EXPIRED":
+                    continue
+                error = results.get(reminder.id, "no result from sender")
+                reminder.attempts = (reminder.attempts or 0) + 1
+                reminder.claim_token = None
+                if error is None:
+                    reminder.status = "SENT"
+                    reminder.sent_at = utcnow()
+                    sent += 1
+                elif reminder.attempts >= settings.REMINDER_MAX_ATTEMPTS:
+                    reminder.status = "FAILED"
+                    logger.error("Reminder failed", extra={"reminder_id": reminder.id, "error": error})
+                else:
+                    # Retry later; the refill loads it again when it is due
+                    reminder.status = "PENDING"
+                    reminder.remind_at = utcnow() + timedelta(seconds=settings.REMINDER_RETRY_SECONDS * reminder.attempts)
+            db.commit()
+            self.sent += sent
+            self.failed += len(messages) - sent
+            REMINDERS_SENT.inc(sent, result="sent")
+            REMINDERS_SENT.inc(len(messages) - sent, result="failed")
+            REMINDERS_SENT.inc(len(claimed) - len(messages), result="expired")
+            return sent
+        finally:
+            db.close()
+
+    def run_once(self):
+        """One loop iteration: refill if due, then send every batch that is due now."""
+        if time.monotonic() >= self.next_refill:
+            self.refill()
+        while True:
+            due = self._pop_due()
+            if not due:
+                break
+            self.dispatch(due)
+
+    # --- lifecycle ---
+    def _loop(self):
+        if self.sender is None:
+            self.sender = get_sender()
+        while not self.stopping.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Reminder dispatch failed")
+                # Unsent reminders stay PENDING (or are released as stale) and are loaded again
+                with self.lock:
+                    self.heap.clear()
+                    self.scheduled.clear()
+                self.next_refill = time.monotonic() + settings.REMINDER_REFILL_SECONDS
+            self.wakeup.wait(self._seconds_until_next())
+            self.wakeup.clear()
+
+    def start(self):
+        self.stopping.clear()
+        self.next_refill = 0.0
+        self.thread = threading.Thread(target=self._loop, name="reminder-dispatcher", daemon=True)
+        self.thread.start()
+        logger.info("Reminder dispatcher started", extra={"lookahead_seconds": settings.REMINDER_LOOKAHEAD_SECONDS})
+        return self
+
+    def stop(self, timeout=10):
+        self.stopping.set()
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def stats(self):
+        with self.lock:
+            scheduled = len(self.heap)
+        return {"running": self.running, "scheduled": scheduled, "sent": self.sent, "failed": self.failed}
+
+dispatcher = ReminderDispatcher()
+
+if __name__ == "__main__":
+    from tracing_utils import setup_logging
+    setup_logging()
+    dispatcher.start()
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    stop.wait()
+    dispatcher.stop()
+    sys.exit(0)
@@ -0,0 +1,26 @@
+from typing import Optional
+from pydantic import BaseModel
+
+# ----------------------------------------------------------------------
+# Request schemas shared by the API (main.py) and the bulk importer
+# (import_utils.py), which validates spreadsheet rows with them in worker
+# processes that should not have to import the whole app.
+# ----------------------------------------------------------------------
+
+class CoreProfileUpdate(BaseModel):
+    name: str
+    profession: str
+    age: Optional[int] = None
+    date_of_birth: Optional[str] = None
+    state: Optional[str] = None
+    district: Optional[str] = None
+    local_area: str
+    profile_photo_file_path: Optional[str] = None
+
+class CreateLessonRequest(BaseModel):
+    title: str
+    description: str
+    type: str # 'video' or 'document'
+    price: int
+    language: str = "English"
+    difficulty: str = "Beginner"
@@ -1,9 +1,12 @@
 import json
 import hashlib
 from datetime import datetime, timedelta
-from duckduckgo_search import DDGS
 from sqlalchemy.orm import Session
 import models
+from metrics_utils import CACHE_REQUESTS
+from tracing_utils import get_logger, span
+
+logger = get_logger("search")
 
 # Allowed Domains Whitelist
 TRUSTED_DOMAINS = [
@@ -42,18 +45,21 @@ def search_opportunities(db: Session, profession: str, state: str, district: str
     if cached:
         # Check freshness (24h)
         if cached.created_at > datetime.utcnow() - timedelta(hours=24):
-            print(f"✅ Serving cached opportunities for {combined_key}")
+            CACHE_REQUESTS.inc(cache="opportunities", result="hit")
+            logger.debug("Serving cached opportunities", extra={"cache_key": combined_key})
             return json.loads(cached.data_json)
         else:
-            print(f"⚠️ Cache expired for {combined_key}, refetching...")
+            CACHE_REQUESTS.inc(cache="opportunities", result="stale")
+            logger.debug("Opportunity cache expired, refetching", extra={"cache_key": combined_key})
             db.delete(cached)
             db.commit()
+    else:
+        CACHE_REQUESTS.inc(cache="opportunities", result="miss")
 
     # 3. Fetch from DuckDuckGo
-    print(f"🔎 Fetching live from DDG for {combined_key}...")
-    
-    schemes = fetch_ddg_results(scheme_query, category="Scheme")
-    trainings = fetch_ddg_results(training_query, category="Training")
+    with span("search.ddg_fetch", cache_key=combined_key):
+        schemes = fetch_ddg_results(scheme_query, category="Scheme")
+        trainings = fetch_ddg_results(training_query, category="Training")
     
     # 4. Format Result
     final_result = {
@@ -75,6 +81,8 @@ def search_opportunities(db: Session, profession: str, state: str, district: str
 def fetch_ddg_results(query, category):
     results = []
     try:
+        # Imported on first search; the package pulls in a large HTTP stack
+        from duckduckgo_search import DDGS
         with DDGS() as ddgs:
             # Fetch 10 results
             ddg_gen = ddgs.text(query, max_results=10)
@@ -90,6 +98,6 @@ def fetch_ddg_results(query, category):
                             "category": category
                         })
     except Exception as e:
-        print(f"❌ DDG Error: {e}")
+        logger.warning("DDG search failed", extra={"category": category, "error": str(e)})
         
     return results
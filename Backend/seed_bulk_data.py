@@ -0,0 +1,289 @@
+# Backend/seed_bulk_data.py
+#
+# Bulk synthetic data seeder for load testing.
+# Uses Core bulk inserts (executemany) in batches, so a million users take
+# minutes rather than hours. Writes a manifest describing the seeded id
+# ranges, which load_test.py reads to pick realistic targets.
+#
+#   python seed_bulk_data.py --users 1000000 --lessons 100000 --sessions 20000
+#   python seed_bulk_data.py --preset small
+
+import sys
+import json
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+sys.path.append('.')
+import models
+from database import engine
+from sqlalchemy import func, select, text
+
+PRESETS = {
+    "small": {"users": 10_000, "lessons": 1_000, "sessions": 500},
+    "medium": {"users": 100_000, "lessons": 10_000, "sessions": 2_000},
+    "large": {"users": 1_000_000, "lessons": 100_000, "sessions": 20_000},
+}
+
+PROFESSIONS = ["Painter", "Electrician", "Plumber", "Carpenter", "Mason", "Tailor", "Welder", "Beautician", "Driver", "Mechanic"]
+LOCATIONS = [
+    ("Karnataka", "Bengaluru"), ("Maharashtra", "Pune"), ("Uttar Pradesh", "Lucknow"), ("Tamil Nadu", "Chennai"),
+    ("West Bengal", "Kolkata"), ("Bihar", "Patna"), ("Rajasthan", "Jaipur"), ("Gujarat", "Ahmedabad")
+]
+LANGUAGES = ["English", "Hindi", "Tamil", "Bengali", "Marathi", "Kannada"]
+DIFFICULTIES = ["Beginner", "Intermediate", "Advanced"]
+LESSON_TYPES = ["video", "document"]
+ENROLLMENT_STATUSES = ["ENROLLED", "IN_PROGRESS", "COMPLETED"]
+
+PHONE_PREFIX = "+9170"
+WALLET_HASH_PREFIX = "seed"
+
+def seed_phone(user_id):
+    return f"{PHONE_PREFIX}{user_id:08d}"
+
+def seed_wallet_hash(user_id):
+    return f"{WALLET_HASH_PREFIX}{user_id:012d}"
+
+def next_id(conn, table):
+    return (conn.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+
+def insert_batches(conn, table, rows, batch_size, label):
+    """Consumes a row generator and inserts it batch_size rows per statement."""
+    started = time.perf_counter()
+    batch = []
+    total = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            conn.execute(table.insert(), batch)
+            total += len(batch)
+            batch = []
+            if total % (batch_size * 10) == 0:
+                conn.commit()
+                print(f"  {label}: {total:,} rows ({total / (time.perf_counter() - started):,.0f}/s)")
+    if batch:
+        conn.execute(table.insert(), batch)
+        total += len(batch)
+    conn.commit()
+    print(f"  {label}: {total:,} rows in {time.perf_counter() - started:.1f}s")
+    return total
+
+def sync_sequences(conn, tables):
+    # Explicit ids bypass Postgres sequences; move them past the seeded range
+    if conn.dialect.name != "postgresql":
+        return
+    for table in tables:
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), (SELECT COALESCE(MAX(id), 1) FROM {table.name}))"
+        ))
+    conn.commit()
+
+def seed(args):
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    users_t = models.User.__table__
+    wallets_t = models.SkillWallet.__table__
+    creds_t = models.SkillCredential.__table__
+    lessons_t = models.SkillLesson.__table__
+    sessions_t = models.LiveSession.__table__
+    lesson_enr_t = models.LessonEnrollment.__table__
+    session_enr_t = models.SessionEnrollment.__table__
+
+    models.Base.metadata.create_all(bind=engine)
+
+    with engine.connect() as conn:
+        first_user = next_id(conn, users_t)
+        first_wallet = next_id(conn, wallets_t)
+        first_cred = next_id(conn, creds_t)
+        first_lesson = next_id(conn, lessons_t)
+        first_session = next_id(conn, sessions_t)
+        first_lesson_enr = next_id(conn, lesson_enr_t)
+        first_session_enr = next_id(conn, session_enr_t)
+
+        user_ids = range(first_user, first_user + args.users)
+        teacher_count = max(1, int(args.users * args.teacher_ratio))
+        teacher_ids = range(first_user, first_user + teacher_count)
+
+        print(f"--- SEEDING {args.users:,} users, {args.lessons:,} lessons, {args.sessions:,} sessions ---")
+
+        def user_rows():
+            for uid in user_ids:
+                state, district = rng.choice(LOCATIONS)
+                yield {
+                    "id": uid,
+                    "phone_number": seed_phone(uid),
+                    "is_verified": True,
+                    "verification_status": "VERIFIED",
+                    "tier_level": rng.randint(1, 3),
+                    "kyc_data": "{}",
+                    "name": f"Worker {uid}",
+                    "profession": rng.choice(PROFESSIONS),
+                    "age": rng.randint(18, 60),
+                    "state": state,
+                    "district": district,
+                    "local_area": f"Ward {rng.randint(1, 200)}",
+                    "tier3_cibil_score": 0,
+                    "last_login_at": now - timedelta(days=rng.randint(0, 90))
+                }
+        insert_batches(conn, users_t, user_rows(), args.batch_size, "users")
+
+        def wallet_rows():
+            for offset, uid in enumerate(user_ids):
+                created = now - timedelta(days=rng.randint(0, 365))
+                yield {
+                    "id": first_wallet + offset,
+                    "user_id": uid,
+                    "wallet_hash": seed_wallet_hash(uid),
+                    "is_verified_government": rng.random() < 0.6,
+                    "is_verified_work": rng.random() < 0.4,
+                    "created_at": created,
+                    "updated_at": created
+                }
+        insert_batches(conn, wallets_t, wallet_rows(), args.batch_size, "skill_wallets")
+
+        def credential_rows():
+            cred_id = first_cred
+            for offset in range(args.users):
+                for _ in range(rng.randint(0, args.max_credentials_per_user)):
+                    score = rng.randint(300, 900)
+                    yield {
+                        "id": cred_id,
+                        "skill_wallet_id": first_wallet + offset,
+                        "skill_name": rng.choice(PROFESSIONS) + " Work",
+                        "token_id": f"SEED_{cred_id}",
+                        "proof_url": f"uploads/seed/{cred_id}.jpg",
+                        "audio_description_url": "",
+                        "language_code": "hi",
+                        "grade_score": 0,
+                        "skill_trust_score": score,
+                        "transcription": "Seeded work description.",
+                        "evaluation_feedback": json.dumps({"improvement_tips": ["Focus on final polish"]}),
+                        "verification_status": "VERIFIED" if score >= 500 else "PENDING",
+                        "is_verified": score >= 500,
+                        "proof_hash": f"seed-proof-{cred_id}",
+                        "audio_hash": "",
+                        "issued_date": now - timedelta(days=rng.randint(0, 365))
+                    }
+                    cred_id += 1
+        credentials = insert_batches(conn, creds_t, credential_rows(), args.batch_size, "skill_credentials")
+
+        def lesson_rows():
+            for offset in range(args.lessons):
+                yield {
+                    "id": first_lesson + offset,
+                    "teacher_id": rng.choice(teacher_ids),
+                    "title": f"{rng.choice(PROFESSIONS)} Lesson {offset}",
+                    "description": "Seeded lesson for load testing.",
+                    "type": rng.choice(LESSON_TYPES),
+                    "file_path": "placeholder.mp4",
+                    "price": rng.choice([0, 0, 49, 99, 199]),
+                    "duration_minutes": rng.choice([10, 15, 30, 45]),
+                    "language": rng.choice(LANGUAGES),
+                    "difficulty": rng.choice(DIFFICULTIES),
+                    "created_at": now - timedelta(days=rng.randint(0, 365))
+                }
+        insert_batches(conn, lessons_t, lesson_rows(), args.batch_size, "skill_lessons")
+
+        def session_rows():
+            for offset in range(args.sessions):
+                sid = first_session + offset
+                yield {
+                    "id": sid,
+                    "teacher_id": rng.choice(teacher_ids),
+                    "title": f"Live {rng.choice(PROFESSIONS)} Class {offset}",
+                    "description": "Seeded live session for load testing.",
+                    # Mix of past and upcoming so the upcoming-session filter has work to do
+                    "scheduled_at": now + timedelta(hours=rng.randint(-24 * 60, 24 * 30)),
+                    "price": rng.choice([0, 0, 99]),
+                    "language": rng.choice(LANGUAGES),
+                    "difficulty": rng.choice(DIFFICULTIES),
+                    "is_active": False,
+                    "meeting_link": f"https://meet.skillwallet.com/{sid}",
+                    "created_at": now - timedelta(days=rng.randint(0, 60))
+                }
+        insert_batches(conn, sessions_t, session_rows(), args.batch_size, "live_sessions")
+
+        def lesson_enrollment_rows():
+            enr_id = first_lesson_enr
+            for uid in user_ids:
+                for lesson_offset in rng.sample(range(args.lessons), min(args.lessons, rng.randint(0, args.max_enrollments_per_user))):
+                    status = rng.choice(ENROLLMENT_STATUSES)
+                    enrolled = now - timedelta(days=rng.randint(0, 180))
+                    yield {
+                        "id": enr_id,
+                        "user_id": uid,
+                        "lesson_id": first_lesson + lesson_offset,
+                        "status": status,
+                        "progress_percent": 100 if status == "COMPLETED" else (0 if status == "ENROLLED" else rng.randint(1, 99)),
+                        "enrolled_at": enrolled,
+                        "last_accessed": enrolled + timedelta(days=rng.randint(0, 30)),
+                        "completed_at": enrolled + timedelta(days=rng.randint(1, 30)) if status == "COMPLETED" else None
+                    }
+                    enr_id += 1
+        lesson_enrollments = insert_batches(conn, lesson_enr_t, lesson_enrollment_rows(), args.batch_size, "lesson_enrollments")
+
+        def session_enrollment_rows():
+            enr_id = first_session_enr
+            for uid in user_ids:
+                if rng.random() >= args.session_enrollment_ratio:
+                    continue
+                yield {
+                    "id": enr_id,
+                    "user_id": uid,
+                    "session_id": first_session + rng.randrange(args.sessions),
+                    "status": "REGISTERED",
+                    "registered_at": now - timedelta(days=rng.randint(0, 30))
+                }
+                enr_id += 1
+        session_enrollments = insert_batches(conn, session_enr_t, session_enrollment_rows(), args.batch_size, "session_enrollments") if args.sessions else 0
+        if session_enrollments:
+            # Seat counters are normally kept by register_for_session; bulk rows bypass it
+            conn.execute(text(
+                "UPDATE live_sessions SET seats_taken = (SELECT COUNT(*) FROM session_enrollments e "
+                "WHERE e.session_id = live_sessions.id) WHERE id >= :first"
+            ), {"first": first_session})
+            conn.commit()
+
+        sync_sequences(conn, [users_t, wallets_t, creds_t, lessons_t, sessions_t, lesson_enr_t, session_enr_t])
+
+    manifest = {
+        "seeded_at": now.isoformat(),
+        "database": engine.url.render_as_string(hide_password=True),
+        "users": {"first_id": first_user, "count": args.users},
+        "teachers": {"first_id": first_user, "count": teacher_count},
+        "lessons": {"first_id": first_lesson, "count": args.lessons},
+        "sessions": {"first_id": first_session, "count": args.sessions},
+        "skill_credentials": credentials,
+        "lesson_enrollments": lesson_enrollments,
+        "session_enrollments": session_enrollments,
+        "phone_prefix": PHONE_PREFIX,
+        "wallet_hash_prefix": WALLET_HASH_PREFIX
+    }
+    with open(args.manifest, "w") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Manifest written to {args.manifest}")
+    return manifest
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Bulk-seed synthetic Skill Wallet data")
+    parser.add_argument("--preset", choices=sorted(PRESETS))
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--lessons", type=int, default=1_000)
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--teacher-ratio", type=float, default=0.02)
+    parser.add_argument("--max-credentials-per-user", type=int, default=3)
+    parser.add_argument("--max-enrollments-per-user", type=int, default=4)
+    parser.add_argument("--session-enrollment-ratio", type=float, default=0.3)
+    parser.add_argument("--batch-size", type=int, default=5_000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--manifest", default="seed_manifest.json")
+    args = parser.parse_args()
+
+    if args.preset:
+        for key, value in PRESETS[args.preset].items():
+            setattr(args, key, value)
+    seed(args)
+
+if __name__ == "__main__":
+    main_cli()
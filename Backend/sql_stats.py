@@ -0,0 +1,55 @@
+import time
+from contextvars import ContextVar
+from sqlalchemy import event
+
+# ----------------------------------------------------------------------
+# Per-request SQL statement counting.
+# The HTTP middleware in main.py opens a QueryStats for each request; the
+# engine events below add every statement executed while handling it.
+# Threadpool endpoints inherit the request's context, so they count too.
+# ----------------------------------------------------------------------
+
+class QueryStats:
+    __slots__ = ("statements", "db_time", "log")
+
+    def __init__(self, keep_log=False):
+        self.statements = 0
+        self.db_time = 0.0
+        self.log = [] if keep_log else None
+
+    def record(self, statement, elapsed):
+        self.statements += 1
+        self.db_time += elapsed
+        if self.log is not None:
+            self.log.append(statement)
+
+current_stats: ContextVar = ContextVar("current_sql_stats", default=None)
+
+def start_request(keep_log=False):
+    """Starts counting for the current context. Returns (stats, token) - pass the token to end_request."""
+    stats = QueryStats(keep_log)
+    return stats, current_stats.set(stats)
+
+def end_request(token):
+    current_stats.reset(token)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+    stats = current_stats.get()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+def _handle_error(exception_context):
+    # after_cursor_execute is skipped for failed statements; drop their start time
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
+
+def instrument_engine(engine):
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
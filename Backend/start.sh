@@ -1,8 +1,29 @@
 #!/bin/bash
-# Initialize database tables before starting Uvicorn server
+# Bring the schema up to date before starting the server (see migrate_db.py)
+python migrate_db.py upgrade || exit 1
 
-# Run the Python script to ensure database tables are created
-python db_init.py
+# Schema is current now, so workers can skip the schema check on boot
+export AUTO_CREATE_SCHEMA=false
 
-# Start the application server
-uvicorn main:app --host 0.0.0.0 --port $PORT
\ No newline at end of file
+# Live session reminders are sent by a separate process: `python reminder_dispatcher.py`
+# (or set REMINDER_DISPATCHER_IN_APP=true to run the dispatcher inside each worker).
+# Cohort ranks on the dashboard / public profile are refreshed by `python cohort_stats.py --loop`
+# (or the same command without --loop from cron); one instance is enough.
+
+# Start the application server.
+# multi: gunicorn with one preloaded Uvicorn worker per core (see gunicorn_conf.py).
+# single: one Uvicorn process, e.g. for local debugging.
+# Default: multi once the shared backends are configured (OTP_STORE_BACKEND / EVENTS_BACKEND=redis), single until then.
+# exec so SIGTERM reaches the server directly and triggers a graceful drain.
+if [ -z "$SERVE_MODE" ]; then
+    if python -c "import sys; from config import per_worker_backends; sys.exit(1 if per_worker_backends() else 0)"; then
+        SERVE_MODE=multi
+    else
+        SERVE_MODE=single
+    fi
+fi
+if [ "$SERVE_MODE" = "single" ]; then
+    exec uvicorn main:app --host 0.0.0.0 --port $PORT
+else
+    exec gunicorn -c gunicorn_conf.py main:app
+fi
@@ -0,0 +1,354 @@
+import os
+import re
+import hmac
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import urlencode
+from config import settings
+from enrollment_utils import INSERT_CONSTRUCTS
+import models
+
+# All stored objects are addressed by a key such as "12/aadhaar_front.jpg".
+# The public path we hand back to the frontend is always "uploads/<key>", so
+# existing links keep working whichever backend is active.
+UPLOAD_PREFIX = "uploads"
+HASH_CHUNK_SIZE = 1024 * 1024
+FILE_TYPE_PATTERN = re.compile(r"[a-z_]+")
+
+def build_key(user_id, file_type, filename):
+    """
+    Key of a new upload under the user's own prefix.
+    Raises ValueError for a file_type that is not a plain name (e.g. "../2/aadhaar").
+    """
+    if not FILE_TYPE_PATTERN.fullmatch(file_type or ""):
+        raise ValueError(f"Invalid file_type: {file_type}")
+    safe_name = filename.replace(" ", "_").replace("/", "_").replace("\\", "_")
+    key = safe_key(f"{user_id}/{file_type}_{safe_name}")
+    if not key.startswith(f"{user_id}/"):
+        raise ValueError(f"Key outside the user's prefix: {key}")
+    return key
+
+def path_for(key):
+    return f"{UPLOAD_PREFIX}/{key}"
+
+def key_from_path(file_path):
+    """Inverse of path_for(). Accepts "uploads/<key>" or "/uploads/<key>"."""
+    file_path = file_path.lstrip("/")
+    if file_path.startswith(UPLOAD_PREFIX + "/"):
+        return file_path[len(UPLOAD_PREFIX) + 1:]
+    return file_path
+
+def canonical_path(file_path):
+    """path_for(key) for paths in our storage ("/uploads/x" -> "uploads/x"); None for anything else."""
+    if file_path and file_path.lstrip("/").startswith(UPLOAD_PREFIX + "/"):
+        return path_for(key_from_path(file_path))
+    return None
+
+def safe_key(key):
+    """
+    Normalised form of a client-supplied key ("12/./x.jpg" -> "12/x.jpg").
+    Raises ValueError for "..", absolute or backslash paths, so a prefix check on the result holds.
+    """
+    if not key or key.startswith("/") or "\\" in key:
+        raise ValueError(f"Invalid storage key: {key}")
+    parts = [part for part in key.split("/") if part not in ("", ".")]
+    if not parts or ".." in parts:
+        raise ValueError(f"Invalid storage key: {key}")
+    return "/".join(parts)
+
+# ----------------------------------------------------------------------
+# 1. BASE INTERFACE
+# ----------------------------------------------------------------------
+class StorageBackend:
+    """
+    Minimal object-storage interface used by the upload endpoints.
+    """
+    name = "base"
+
+    def save(self, key, fileobj, content_type=None):
+        raise NotImplementedError
+
+    def exists(self, key):
+        raise NotImplementedError
+
+    def read_bytes(self, key):
+        """Returns the object body, or None if it does not exist."""
+        raise NotImplementedError
+
+    def hash_object(self, key):
+        """Returns the SHA-256 hex digest of the object body, or None if it does not exist."""
+        raise NotImplementedError
+
+    def presign_put(self, key, content_type=None, expires_in=None):
+        """Returns a URL the client can PUT the raw file body to."""
+        raise NotImplementedError
+
+    def presign_get(self, key, expires_in=None):
+        raise NotImplementedError
+
+    def local_copy(self, key):
+        """Context manager yielding a local path for tools (e.g. Gemini upload) that need one."""
+        raise NotImplementedError
+
+class HashingReader:
+    """Wraps an upload stream and hashes it while the storage backend reads it."""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.digest.update(data)
+        self.size += len(data)
+        return data
+
+    def hexdigest(self):
+        return self.digest.hexdigest()
+
+# ----------------------------------------------------------------------
+# 2. LOCAL DISK (Development / single host)
+# ----------------------------------------------------------------------
+def sign_local_upload(key, expires):
+    data = f"{key}:{expires}".encode("utf-8")
+    return hmac.new(settings.SECRET_KEY.encode("utf-8"), data, hashlib.sha256).hexdigest()
+
+def verify_local_upload(key, expires, signature):
+    try:
+        if int(expires) < int(time.time()):
+            return False
+    except (TypeError, ValueError):
+        return False
+    return hmac.compare_digest(sign_local_upload(key, expires).encode(), (signature or "").encode())
+
+class LocalStorage(StorageBackend):
+    name = "local"
+
+    def __init__(self, root=UPLOAD_PREFIX, public_base_url=""):
+        self.root = root
+        self.public_base_url = public_base_url.rstrip("/")
+
+    def _full_path(self, key):
+        full = os.path.normpath(os.path.join(self.root, key))
+        if not full.startswith(os.path.normpath(self.root) + os.sep):
+            raise ValueError(f"Invalid storage key: {key}")
+        return full
+
+    def save(self, key, fileobj, content_type=None):
+        full = self._full_path(key)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, "wb") as buffer:
+            shutil.copyfileobj(fileobj, buffer)
+        return path_for(key)
+
+    def open_for_write(self, key):
+        full = self._full_path(key)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        return open(full, "wb")
+
+    def exists(self, key):
+        return os.path.exists(self._full_path(key))
+
+    def read_bytes(self, key):
+        full = self._full_path(key)
+        if not os.path.exists(full):
+            return None
+        with open(full, "rb") as f:
+            return f.read()
+
+    def hash_object(self, key):
+        try:
+            full = self._full_path(key)
+        except ValueError:
+            return None
+        if not os.path.isfile(full):
+            return None
+        digest = hashlib.sha256()
+        with open(full, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def presign_put(self, key, content_type=None, expires_in=None):
+        # Local disk has no separate object store, so the "presigned" URL points
+        # back at our own signed PUT endpoint (see main.put_signed_upload).
+        expires = int(time.time()) + (expires_in or settings.STORAGE_PRESIGN_EXPIRY_SECONDS)
+        query = urlencode({"key": key, "expires": expires, "signature": sign_local_upload(key, expires)})
+        return f"{self.public_base_url}/api/v1/storage/upload?{query}"
+
+    def presign_get(self, key, expires_in=None):
+        return f"{self.public_base_url}/{path_for(key)}"
+
+    @contextmanager
+    def local_copy(self, key):
+        yield self._full_path(key)
+
+# ----------------------------------------------------------------------
+# 3. S3-COMPATIBLE (AWS S3 / MinIO / R2)
+# ----------------------------------------------------------------------
+class S3Storage(StorageBackend):
+    """
+    S3-compatible backend. Point S3_ENDPOINT_URL at a local MinIO container
+    (e.g. http://127.0.0.1:9000) to run it without AWS.
+    """
+    name = "s3"
+
+    def __init__(self, bucket, endpoint_url=None, access_key=None, secret_key=None, region=None):
+        self.bucket = bucket
+        self.client_options = {
+            "endpoint_url": endpoint_url or None,
+            "aws_access_key_id": access_key or None,
+            "aws_secret_access_key": secret_key or None,
+            "region_name": region or None,
+        }
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        # boto3 is slow to import, so it is loaded on first use rather than at app import
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    try:
+                        import boto3
+                        from botocore.config import Config
+                    except ImportError:
+                        raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)")
+                    self._client = boto3.client(
+                        "s3",
+                        # Path-style addressing is what MinIO expects by default
+                        config=Config(signature_version="s3v4", s3={"addressing_style": "path"}),
+                        **self.client_options
+                    )
+        return self._client
+
+    def save(self, key, fileobj, content_type=None):
+        extra = {"ContentType": content_type} if content_type else {}
+        self.client.upload_fileobj(fileobj, self.bucket, key, ExtraArgs=extra)
+        return path_for(key)
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except Exception:
+            return False
+
+    def read_bytes(self, key):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+        except self.client.exceptions.NoSuchKey:
+            return None
+
+    def hash_object(self, key):
+        try:
+            body = self.client.get_object(Bucket=self.bucket, Key=key)["Body"]
+        except self.client.exceptions.NoSuchKey:
+            return None
+        digest = hashlib.sha256()
+        for chunk in body.iter_chunks(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    def presign_put(self, key, content_type=None, expires_in=None):
+        params = {"Bucket": self.bucket, "Key": key}
+        if content_type:
+            params["ContentType"] = content_type
+        return self.client.generate_presigned_url(
+            "put_object", Params=params,
+            ExpiresIn=expires_in or settings.STORAGE_PRESIGN_EXPIRY_SECONDS
+        )
+
+    def presign_get(self, key, expires_in=None):
+        return self.client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": key},
+            ExpiresIn=expires_in or settings.STORAGE_PRESIGN_EXPIRY_SECONDS
+        )
+
+    @contextmanager
+    def local_copy(self, key):
+        suffix = os.path.splitext(key)[1]
+        fd, tmp_path = tempfile.mkstemp(suffix=suffix)
+        os.close(fd)
+        try:
+            self.client.download_file(self.bucket, key, tmp_path)
+            yield tmp_path
+        finally:
+            os.remove(tmp_path)
+
+# ----------------------------------------------------------------------
+# 4. FACTORY
+# ----------------------------------------------------------------------
+_storage = None
+
+def get_storage():
+    global _storage
+    if _storage is None:
+        if settings.STORAGE_BACKEND == "s3":
+            _storage = S3Storage(
+                bucket=settings.S3_BUCKET,
+                endpoint_url=settings.S3_ENDPOINT_URL,
+                access_key=settings.S3_ACCESS_KEY,
+                secret_key=settings.S3_SECRET_KEY,
+                region=settings.S3_REGION,
+            )
+        else:
+            _storage = LocalStorage(root=UPLOAD_PREFIX, public_base_url=settings.PUBLIC_BASE_URL)
+    return _storage
+
+def content_hash(file_path):
+    """
+    SHA-256 identifying a submitted file by content. Used for submission dedupe.
+    Files outside our storage (external links) are identified by their URL.
+    """
+    if not file_path:
+        return ""
+    digest = get_storage().hash_object(key_from_path(file_path))
+    return digest or hashlib.sha256(file_path.encode("utf-8")).hexdigest()
+
+# ----------------------------------------------------------------------
+# 5. CONTENT HASHES (stored_files)
+# ----------------------------------------------------------------------
+def record_file_hash(db, file_path, digest, size=None, user_id=None):
+    """Remembers the content hash of a stored file, replacing it if the key was uploaded again. Not committed."""
+    values = {"path": file_path, "user_id": user_id, "hash": digest, "size": size, "created_at": datetime.utcnow()}
+    insert = INSERT_CONSTRUCTS.get(db.get_bind().dialect.name)
+    if insert is not None:
+        statement = insert(models.StoredFile).values(**values)
+        db.execute(statement.on_conflict_do_update(index_elements=["path"], set_={
+            "hash": statement.excluded.hash, "size": statement.excluded.size, "created_at": statement.excluded.created_at}))
+    else:
+        db.merge(models.StoredFile(**values))
+
+def file_hashes(db, file_paths):
+    """
+    {file_path: content hash} for submitted files, looked up in stored_files with one query.
+    Files uploaded before hashes were recorded are hashed once here and remembered (not committed).
+    External links are identified by their URL; empty paths map to "".
+    """
+    canonical = {file_path: canonical_path(file_path) for file_path in file_paths if file_path}
+    stored = {path for path in canonical.values() if path}
+    known = dict(db.query(models.StoredFile.path, models.StoredFile.hash).filter(models.StoredFile.path.in_(stored)).all()) if stored else {}
+    hashes = {}
+    for file_path in file_paths:
+        path = canonical.get(file_path)
+        if not file_path:
+            hashes[file_path] = ""
+        elif path is None:
+            hashes[file_path] = hashlib.sha256(file_path.encode("utf-8")).hexdigest()
+        else:
+            if path not in known:
+                digest = get_storage().hash_object(key_from_path(path))
+                if digest:
+                    record_file_hash(db, path, digest)
+                # A missing object is identified by its path, like an external link (as in content_hash)
+                known[path] = digest or hashlib.sha256(file_path.encode("utf-8")).hexdigest()
+            hashes[file_path] = known[path]
+    return hashes
@@ -0,0 +1,170 @@
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import logging.handlers
+from contextvars import ContextVar
+from contextlib import contextmanager
+from config import settings
+
+# ----------------------------------------------------------------------
+# 1. TRACE CONTEXT
+# ----------------------------------------------------------------------
+# The active trace/span ids live in ContextVars, so they follow a request
+# into threadpool endpoints and (via job_queue) into background jobs.
+current_trace_id: ContextVar = ContextVar("trace_id", default=None)
+current_span_id: ContextVar = ContextVar("span_id", default=None)
+
+def new_id(nbytes=8):
+    return os.urandom(nbytes).hex()
+
+def trace_id_from_headers(headers):
+    """Reuses an incoming X-Trace-Id or W3C traceparent so traces join up with the caller's."""
+    trace_id = headers.get("x-trace-id")
+    if trace_id:
+        return trace_id[:64]
+    traceparent = headers.get("traceparent", "")
+    parts = traceparent.split("-")
+    if len(parts) >= 2 and len(parts[1]) == 32:
+        return parts[1]
+    return new_id(16)
+
+def start_trace(trace_id=None):
+    """Starts a trace for the current context. Returns a token for end_trace."""
+    return current_trace_id.set(trace_id or new_id(16)), current_span_id.set(None)
+
+def end_trace(tokens):
+    trace_token, span_token = tokens
+    current_span_id.reset(span_token)
+    current_trace_id.reset(trace_token)
+
+# ----------------------------------------------------------------------
+# 2. STRUCTURED LOGGER
+# ----------------------------------------------------------------------
+# Records are formatted as one JSON object per line. Handlers run on a
+# background QueueListener thread, so request threads only pay for an
+# in-memory enqueue rather than a synchronous stdout write.
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            entry["trace_id"] = trace_id
+            entry["span_id"] = getattr(record, "span_id", None)
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and key not in entry and key not in ("trace_id", "span_id"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class TraceContextFilter(logging.Filter):
+    def filter(self, record):
+        # Captured on the calling thread, before the record crosses to the listener thread.
+        # Span records carry their own ids and are left as they are.
+        if not hasattr(record, "span_id"):
+            record.trace_id = current_trace_id.get()
+            record.span_id = current_span_id.get()
+        return True
+
+_listener = None
+
+def setup_logging():
+    global _listener
+    if _listener is not None:
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(TraceContextFilter())
+
+    root = logging.getLogger("skillwallet")
+    root.setLevel(settings.LOG_LEVEL.upper())
+    root.addHandler(queue_handler)
+    root.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+def _reset_logging_after_fork():
+    # The listener thread does not survive fork; give the child its own queue and listener
+    global _listener
+    if _listener is None:
+        return
+    atexit.unregister(_listener.stop)
+    root = logging.getLogger("skillwallet")
+    for handler in list(root.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            root.removeHandler(handler)
+    _listener = None
+    setup_logging()
+
+os.register_at_fork(after_in_child=_reset_logging_after_fork)
+
+def get_logger(name):
+    setup_logging()
+    return logging.getLogger(f"skillwallet.{name}")
+
+# ----------------------------------------------------------------------
+# 3. SPANS
+# ----------------------------------------------------------------------
+_span_logger = get_logger("trace")
+
+class Span:
+    __slots__ = ("name", "attrs")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, key, value):
+        self.attrs[key] = value
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Times a block and emits it as a structured "span" log record with its parent span id.
+    Starts a new trace if none is active (e.g. scripts or startup code).
+    """
+    trace_token = None
+    if current_trace_id.get() is None:
+        trace_token = current_trace_id.set(new_id(16))
+    parent_id = current_span_id.get()
+    span_id = new_id()
+    span_token = current_span_id.set(span_id)
+    current = Span(name, attrs)
+    started = time.perf_counter()
+    error = None
+    try:
+        yield current
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        duration_ms = round((time.perf_counter() - started) * 1000, 3)
+        current_span_id.reset(span_token)
+        if settings.TRACE_SPANS_ENABLED:
+            _span_logger.info("span", extra={
+                "span": name,
+                "trace_id": current_trace_id.get(),
+                "span_id": span_id,
+                "parent_id": parent_id,
+                "duration_ms": duration_ms,
+                "error": error,
+                **current.attrs
+            })
+        if trace_token is not None:
+            current_trace_id.reset(trace_token)
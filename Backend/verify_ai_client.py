@@ -0,0 +1,148 @@
+# Backend/verify_ai_client.py
+#
+# Checks the Gemini call guard (ai_client.ModelClient) without calling Gemini:
+# the circuit breaker must recover after a half-open probe is rejected by the
+# rate limiter or the concurrency cap, and bad requests must not open it.
+# Calls without an SDK timeout (run_with_timeout) must give up at the deadline.
+#
+#   python verify_ai_client.py        # exits 1 on any failure
+
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ai_client import ModelClient, ModelUnavailableError, run_with_timeout
+
+class ServiceUnavailable(Exception):
+    """Stands in for a retryable SDK error."""
+
+def make_client(**overrides):
+    options = dict(rate_per_second=100, burst=10, max_in_flight=4, timeout_seconds=0.05, max_retries=0,
+                   failure_threshold=1, reset_seconds=0.1)
+    options.update(overrides)
+    return ModelClient(**options)
+
+def fail(_remaining):
+    raise ServiceUnavailable("upstream down")
+
+def succeed(_remaining):
+    return "ok"
+
+def open_breaker(client):
+    try:
+        client.call(fail)
+    except ServiceUnavailable:
+        pass
+    assert client.breaker.snapshot()["state"] == "OPEN", client.breaker.snapshot()
+    time.sleep(client.breaker.reset_seconds + 0.05)
+
+def rejected(client):
+    try:
+        client.call(succeed)
+    except ModelUnavailableError as e:
+        return str(e)
+    return None
+
+# ----------------------------------------------------------------------
+# CHECKS
+# ----------------------------------------------------------------------
+def check_probe_released_when_rate_limited():
+    client = make_client(rate_per_second=0.01, burst=1)
+    open_breaker(client) # uses the only token
+    assert "rate limit" in (rejected(client) or ""), "probe should be rejected by the rate limiter"
+    client.limiter.tokens = 1.0 # tokens refilled
+    assert rejected(client) is None, f"breaker stuck after a rate limited probe: {client.breaker.snapshot()}"
+    assert client.breaker.snapshot()["state"] == "CLOSED"
+
+def check_probe_released_when_saturated():
+    client = make_client(max_in_flight=1)
+    open_breaker(client)
+    client.semaphore.acquire() # another call holds the only slot
+    try:
+        assert "in flight" in (rejected(client) or ""), "probe should be rejected as saturated"
+    finally:
+        client.semaphore.release()
+    assert rejected(client) is None, f"breaker stuck after a saturated probe: {client.breaker.snapshot()}"
+
+def check_non_retryable_errors_keep_breaker_closed():
+    client = make_client()
+    def bad_request(_remaining):
+        raise ValueError("bad prompt")
+    for _ in range(3):
+        try:
+            client.call(bad_request)
+        except (ValueError, ModelUnavailableError):
+            pass
+    assert client.breaker.snapshot()["state"] == "CLOSED", client.breaker.snapshot()
+
+def check_non_retryable_probe_released():
+    client = make_client()
+    open_breaker(client)
+    def bad_request(_remaining):
+        raise ValueError("bad prompt")
+    try:
+        client.call(bad_request)
+    except ValueError:
+        pass
+    assert rejected(client) is None, f"breaker stuck after a bad-request probe: {client.breaker.snapshot()}"
+
+def check_single_probe():
+    client = make_client(timeout_seconds=1.0)
+    open_breaker(client)
+    started, release = threading.Event(), threading.Event()
+    def slow(_remaining):
+        started.set()
+        release.wait(1)
+        return "ok"
+    probe = threading.Thread(target=client.call, args=(slow,))
+    probe.start()
+    started.wait(1)
+    try:
+        assert "breaker" in (rejected(client) or ""), "only one probe may run while half open"
+    finally:
+        release.set()
+        probe.join()
+    assert client.breaker.snapshot()["state"] == "CLOSED"
+
+def check_stalled_call_frees_slot():
+    client = make_client(max_in_flight=1, timeout_seconds=0.2)
+    release = threading.Event()
+    started = time.monotonic()
+    try:
+        client.call(lambda remaining: run_with_timeout(lambda: release.wait(5), remaining))
+        raise AssertionError("stalled call should time out")
+    except (TimeoutError, ModelUnavailableError):
+        pass
+    finally:
+        release.set()
+    assert time.monotonic() - started < 1.0, "stalled call was not bounded by the deadline"
+    assert client.semaphore.acquire(timeout=0), "stalled call kept its semaphore slot"
+
+CHECKS = [
+    check_probe_released_when_rate_limited,
+    check_probe_released_when_saturated,
+    check_non_retryable_errors_keep_breaker_closed,
+    check_non_retryable_probe_released,
+    check_single_probe,
+    check_stalled_call_frees_slot,
+]
+
+def main_cli():
+    failures = []
+    for check in CHECKS:
+        try:
+            check()
+            print(f"  ok    {check.__name__}")
+        except AssertionError as e:
+            failures.append(check.__name__)
+            print(f"  FAIL  {check.__name__}: {e}")
+    if failures:
+        print(f"\n❌ {len(failures)} of {len(CHECKS)} checks failed.")
+        sys.exit(1)
+    print(f"\n✅ All {len(CHECKS)} model client checks passed.")
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,295 @@
+# Backend/verify_query_budget.py
+#
+# SQL statement budget check for every API route.
+# Seeds a throwaway SQLite DB at several data sizes, calls each route and
+# reads the X-DB-Statements debug header. A route fails if it exceeds its
+# budget or if its statement count grows with the data (an N+1 pattern).
+#
+#   python verify_query_budget.py            # exits 1 on any failure
+#   python verify_query_budget.py --verbose  # also print the SQL of failing routes
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+WORK_DIR = tempfile.mkdtemp(prefix="skillwallet_budget_")
+
+# Must be set before database.py is imported; uploads land in WORK_DIR too.
+# QUERY_CHECK_DATABASE_URL may point at a disposable PostgreSQL database instead (it is dropped and reseeded).
+os.environ["DATABASE_URL"] = os.getenv("QUERY_CHECK_DATABASE_URL") or f"sqlite:///{os.path.join(WORK_DIR, 'budget.db')}"
+os.environ["DEBUG_SQL_HEADERS"] = "true"
+os.environ["METRICS_ALLOW_REMOTE"] = "true" # TestClient requests come from "testclient"
+sys.path.insert(0, BACKEND_DIR)
+os.chdir(WORK_DIR)
+
+import models
+import main
+from database import engine, SessionLocal
+from auth_utils import issue_tokens, hash_otp
+from cohort_utils import refresh_cohorts
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+# SQL text of the current call, for --verbose
+statement_log = []
+
+@event.listens_for(engine, "after_cursor_execute")
+def log_statement(conn, cursor, statement, parameters, context, executemany):
+    statement_log.append(statement)
+
+DATA_SIZES = [1, 10, 40]
+
+# Maximum statements per route. Budgets must not depend on data size.
+ROUTE_BUDGETS = {
+    "GET /": 0,
+    "GET /api/v1/system/ai_client": 0,
+    "GET /metrics": 0,
+    "GET /api/v1/skillbank/opportunities/{user_id}": 2,
+    "POST /api/v1/auth/otp/send": 0,
+    "POST /api/v1/auth/otp/verify": 1,
+    "POST /api/v1/auth/token/refresh": 0,
+    "GET /api/v1/user/profile/{user_id}": 2,
+    "POST /api/v1/user/update_core_profile/{user_id}": 2,
+    "POST /api/v1/identity/tier2/upload/{user_id}": 3,
+    "POST /api/v1/identity/tier2/presign/{user_id}": 1,
+    "POST /api/v1/identity/tier2/complete/{user_id}": 3,
+    "POST /api/v1/work/submit/{user_id}": 8,
+    "POST /api/v1/work/submit_batch/{user_id}": 13,
+    "POST /api/v1/work/submit_grade/{credential_id}": 2,
+    "GET /api/v1/user/proofs/{user_id}": 2,
+    "GET /api/v1/skills/recommended/{user_id}": 3,
+    "GET /api/v1/public/profile/{wallet_hash}": 2,
+    "GET /api/v1/skillbank/lessons": 1,
+    "GET /api/v1/skillbank/sessions": 2,
+    "GET /api/v1/skillbank/catalog/{kind}": 2,
+    "POST /api/v1/skillbank/reminders/{user_id}": 3,
+    "POST /api/v1/skillbank/create_lesson/{user_id}": 3,
+    "POST /api/v1/skillbank/create_session/{user_id}": 3,
+    "GET /api/v1/teaching/dashboard/{user_id}": 7,
+    "POST /api/v1/skillbank/enroll/lesson/{user_id}/{lesson_id}": 2,
+    "POST /api/v1/skillbank/enroll/session/{user_id}/{session_id}": 2,
+    "POST /api/v1/skillbank/progress/{enrollment_id}": 2,
+    "POST /api/v1/skillbank/progress/batch/{user_id}": 0,
+    "POST /api/v1/skillbank/session/{user_id}/{session_id}/start": 2,
+    "POST /api/v1/skillbank/session/{user_id}/{session_id}/end": 2,
+    "GET /api/v1/skillbank/enrollments/{user_id}": 1,
+    "GET /api/v1/dashboard/stats/{user_id}": 3,
+    "GET /api/v1/user/learning_dashboard/{user_id}": 2,
+}
+
+# Routes that only move bytes and never touch the DB
+NO_DB_ROUTES = {"PUT /api/v1/storage/upload"}
+# Long-lived streams never finish a response; they run one wallet lookup when they connect.
+# Bulk exports run a single streamed SELECT after the response has started.
+STREAMING_ROUTES = {"GET /api/v1/events/stream/{user_id}", "GET /api/v1/export/{dataset}"}
+
+def seed(n):
+    """
+    Resets the DB and creates one focus user whose related rows all scale with n.
+    """
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    shutil.rmtree(os.path.join(WORK_DIR, "uploads"), ignore_errors=True)
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        teachers = [models.User(phone_number=f"+9100{i:06d}", name=f"Teacher {i}", profession="Trainer") for i in range(n)]
+        focus = models.User(phone_number="+919999999999", name="Focus Worker", profession="Painter",
+                            state="Karnataka", district="Bengaluru", local_area="Jayanagar", age=30)
+        db.add_all(teachers + [focus])
+        db.flush()
+        db.add(models.UserDocument(user_id=focus.id, doc_type="community_recording",
+                                   path="uploads/1/community_recording_story.txt"))
+
+        wallet = models.SkillWallet(user_id=focus.id, wallet_hash="budget-wallet", created_at=now)
+        db.add(wallet)
+        db.flush()
+
+        for i in range(n):
+            db.add(models.SkillCredential(skill_wallet_id=wallet.id, skill_name=f"Skill {i % 3}", token_id=f"BUDGET_{i}",
+                                          skill_trust_score=600 + i, is_verified=True, proof_hash=f"p{i}", audio_hash="",
+                                          evaluation_feedback="{}", issued_date=now - timedelta(days=i)))
+
+        lessons = [models.SkillLesson(teacher_id=t.id, title=f"Lesson {i}", description="", type="video" if i % 2 else "document",
+                                      file_path="placeholder.mp4", price=10) for i, t in enumerate(teachers)]
+        # The focus user also teaches n lessons and n sessions
+        lessons += [models.SkillLesson(teacher_id=focus.id, title=f"My Lesson {i}", description="", type="video" if i % 2 else "document",
+                                       file_path="placeholder.mp4", price=20) for i in range(n)]
+        sessions = [models.LiveSession(teacher_id=t.id, title=f"Session {i}", description="", price=5,
+                                       scheduled_at=now + timedelta(days=1 + i)) for i, t in enumerate(teachers)]
+        sessions += [models.LiveSession(teacher_id=focus.id, title=f"My Session {i}", description="", price=5,
+                                        scheduled_at=now + timedelta(days=1 + i)) for i in range(n)]
+        db.add_all(lessons + sessions)
+        db.flush()
+
+        for i, lesson in enumerate(lessons):
+            db.add(models.LessonEnrollment(user_id=focus.id, lesson_id=lesson.id, status="IN_PROGRESS" if i % 2 else "COMPLETED",
+                                           progress_percent=50))
+            db.add(models.LessonEnrollment(user_id=teachers[i % n].id, lesson_id=lesson.id))
+        for session in sessions:
+            db.add(models.SessionEnrollment(user_id=focus.id, session_id=session.id))
+            db.add(models.LiveSessionReminder(user_id=focus.id, session_id=session.id, phone_number=focus.phone_number,
+                                              reminder_date="2030-01-01", reminder_time="10:00 AM",
+                                              remind_at=datetime(2030, 1, 1, 4, 30, tzinfo=timezone.utc)))
+
+        # Opportunities are served from cache so the check never goes to the network
+        from search_utils import get_query_hash
+        db.add(models.OpportunityCache(query_hash=get_query_hash("Painter_Karnataka_Bengaluru"),
+                                       data_json=json.dumps({"schemes": [], "trainings": []})))
+        db.commit()
+        return {"user_id": focus.id, "wallet_hash": wallet.wallet_hash, "lesson_id": lessons[0].id, "session_id": sessions[0].id, "own_session_id": sessions[-1].id,
+                "phone": focus.phone_number}
+    finally:
+        db.close()
+
+def route_calls(ids):
+    """
+    (route key, method, url, kwargs) for every route, in an order where later calls can use earlier results.
+    """
+    uid = ids["user_id"]
+    work = {"wallet_hash": ids["wallet_hash"], "skill_name": "Painting", "image_url": "uploads/x/new.png",
+            "audio_file_url": "", "language_code": "en"}
+    return [
+        ("GET /", "GET", "/", {}),
+        ("GET /api/v1/system/ai_client", "GET", "/api/v1/system/ai_client", {}),
+        ("GET /metrics", "GET", "/metrics", {}),
+        ("GET /api/v1/skillbank/opportunities/{user_id}", "GET", f"/api/v1/skillbank/opportunities/{uid}", {}),
+        ("POST /api/v1/auth/otp/send", "POST", "/api/v1/auth/otp/send", {"json": {"phone_number": ids["phone"]}}),
+        ("POST /api/v1/auth/otp/verify", "POST", "/api/v1/auth/otp/verify", {"json": {"phone_number": ids["phone"], "otp_code": "000000"}}),
+        ("POST /api/v1/auth/token/refresh", "POST", "/api/v1/auth/token/refresh", {"json": {"refresh_token": issue_tokens(uid)["refresh_token"]}}),
+        ("GET /api/v1/user/profile/{user_id}", "GET", f"/api/v1/user/profile/{uid}", {}),
+        ("POST /api/v1/user/update_core_profile/{user_id}", "POST", f"/api/v1/user/update_core_profile/{uid}",
+         {"json": {"name": "Focus Worker", "profession": "Painter", "state": "Karnataka", "district": "Bengaluru", "local_area": "Jayanagar"}}),
+        ("POST /api/v1/identity/tier2/upload/{user_id}", "POST", f"/api/v1/identity/tier2/upload/{uid}",
+         {"params": {"file_type": "aadhaar"}, "files": {"file": ("id.jpg", b"jpeg", "image/jpeg")}}),
+        ("POST /api/v1/identity/tier2/presign/{user_id}", "POST", f"/api/v1/identity/tier2/presign/{uid}",
+         {"json": {"filename": "video.mp4", "file_type": "work_video"}}),
+        ("PUT /api/v1/storage/upload", "PUT", None, {"content": b"video"}),
+        ("POST /api/v1/identity/tier2/complete/{user_id}", "POST", f"/api/v1/identity/tier2/complete/{uid}",
+         {"json": {"file_path": f"uploads/{uid}/work_video_video.mp4", "file_type": "work_video"}}),
+        ("POST /api/v1/work/submit/{user_id}", "POST", f"/api/v1/work/submit/{uid}", {"json": work}),
+        ("POST /api/v1/work/submit_batch/{user_id}", "POST", f"/api/v1/work/submit_batch/{uid}",
+         {"json": {"submissions": [dict(work, image_url=f"uploads/x/batch{i}.png") for i in range(3)]}}),
+        ("POST /api/v1/work/submit_grade/{credential_id}", "POST", "/api/v1/work/submit_grade/1", {"json": {"score": 700}}),
+        ("GET /api/v1/user/proofs/{user_id}", "GET", f"/api/v1/user/proofs/{uid}", {}),
+        ("GET /api/v1/skills/recommended/{user_id}", "GET", f"/api/v1/skills/recommended/{uid}", {}),
+        ("GET /api/v1/public/profile/{wallet_hash}", "GET", f"/api/v1/public/profile/{ids['wallet_hash']}", {}),
+        ("GET /api/v1/skillbank/lessons", "GET", "/api/v1/skillbank/lessons", {}),
+        ("GET /api/v1/skillbank/sessions", "GET", "/api/v1/skillbank/sessions", {"params": {"user_id": uid}}),
+        ("GET /api/v1/skillbank/catalog/{kind}", "GET", "/api/v1/skillbank/catalog/sessions",
+         {"params": {"user_id": uid, "language": "English,Hindi"}}),
+        ("POST /api/v1/skillbank/reminders/{user_id}", "POST", f"/api/v1/skillbank/reminders/{uid}",
+         {"json": {"session_id": ids["session_id"], "phone_number": ids["phone"], "date": "2030-01-01", "time": "10:00 AM"}}),
+        ("POST /api/v1/skillbank/create_lesson/{user_id}", "POST", f"/api/v1/skillbank/create_lesson/{uid}",
+         {"json": {"title": "New", "description": "", "type": "video", "price": 0}}),
+        ("POST /api/v1/skillbank/create_session/{user_id}", "POST", f"/api/v1/skillbank/create_session/{uid}",
+         {"json": {"title": "New", "description": "", "scheduled_at": "2030-01-01T10:00:00", "price": 0}}),
+        ("GET /api/v1/teaching/dashboard/{user_id}", "GET", f"/api/v1/teaching/dashboard/{uid}", {}),
+        ("POST /api/v1/skillbank/enroll/lesson/{user_id}/{lesson_id}", "POST", f"/api/v1/skillbank/enroll/lesson/{uid}/{ids['lesson_id']}", {}),
+        ("POST /api/v1/skillbank/enroll/session/{user_id}/{session_id}", "POST", f"/api/v1/skillbank/enroll/session/{uid}/{ids['session_id']}", {}),
+        ("POST /api/v1/skillbank/progress/{enrollment_id}", "POST", "/api/v1/skillbank/progress/1", {"json": {"progress": 100, "status": "COMPLETED"}}),
+        ("POST /api/v1/skillbank/session/{user_id}/{session_id}/start", "POST", f"/api/v1/skillbank/session/{uid}/{ids['own_session_id']}/start", {}),
+        ("POST /api/v1/skillbank/session/{user_id}/{session_id}/end", "POST", f"/api/v1/skillbank/session/{uid}/{ids['own_session_id']}/end", {}),
+        ("POST /api/v1/skillbank/progress/batch/{user_id}", "POST", f"/api/v1/skillbank/progress/batch/{uid}",
+         {"json": {"events": [{"enrollment_id": 1, "progress": 40, "status": "IN_PROGRESS"}]}}),
+        ("GET /api/v1/skillbank/enrollments/{user_id}", "GET", f"/api/v1/skillbank/enrollments/{uid}", {}),
+        ("GET /api/v1/dashboard/stats/{user_id}", "GET", f"/api/v1/dashboard/stats/{uid}", {}),
+        ("GET /api/v1/user/learning_dashboard/{user_id}", "GET", f"/api/v1/user/learning_dashboard/{uid}", {}),
+    ]
+
+def prepare_call(key, ids):
+    """Setup a call needs beyond the static route list."""
+    if key == "POST /api/v1/auth/otp/verify":
+        # The sent code is random; replace the challenge with one for the code route_calls submits
+        main.get_otp_store().save_challenge(ids["phone"], hash_otp("000000"), main.settings.OTP_TTL_SECONDS)
+
+def measure(client, n):
+    ids = seed(n)
+    # The in-memory indexes were built at startup; pick up the freshly seeded rows
+    main.recommendation_index.build()
+    main.facet_catalog.build()
+    # Rank lookups on the dashboard / public profile need the cohort tables
+    refresh_cohorts(main.SessionLocal)
+    counts = {}
+    logs = {}
+    presigned_url = None
+    for key, method, url, kwargs in route_calls(ids):
+        if url is None:
+            url = presigned_url
+        prepare_call(key, ids)
+        # Calls run one at a time, so everything the engine executes meanwhile belongs to this request
+        statement_log.clear()
+        response = client.request(method, url, **kwargs)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{key} returned {response.status_code}: {response.text[:200]}")
+        if key.startswith("POST /api/v1/identity/tier2/presign"):
+            presigned_url = response.json()["upload_url"]
+        counts[key] = int(response.headers.get("X-DB-Statements", -1))
+        logs[key] = list(statement_log)
+    return counts, logs
+
+def check_coverage():
+    """Every API route must have a budget, so new endpoints can't skip the check."""
+    missing = []
+    for route in main.app.routes:
+        methods = getattr(route, "methods", None) or []
+        for method in methods:
+            key = f"{method} {route.path}"
+            if method in ("HEAD", "OPTIONS") or key in ROUTE_BUDGETS or key in NO_DB_ROUTES or key in STREAMING_ROUTES:
+                continue
+            if route.path.startswith(("/docs", "/redoc", "/openapi", "/uploads", "/proofs")):
+                continue
+            missing.append(key)
+    return missing
+
+def run(verbose=False):
+    print("--- SQL STATEMENT BUDGET CHECK ---")
+    failures = []
+
+    missing = check_coverage()
+    for key in missing:
+        failures.append(f"{key}: no budget defined in ROUTE_BUDGETS")
+
+    results = {}
+    with TestClient(main.app) as client:
+        for n in DATA_SIZES:
+            counts, logs = measure(client, n)
+            for key, count in counts.items():
+                results.setdefault(key, []).append((count, logs[key]))
+
+    print(f"{'route':<66}" + "".join(f"{'n=' + str(n):>7}" for n in DATA_SIZES) + f"{'budget':>8}")
+    for key, measurements in results.items():
+        counts = [c for c, _ in measurements]
+        budget = ROUTE_BUDGETS.get(key)
+        status = ""
+        if budget is not None and max(counts) > budget:
+            status = "  OVER BUDGET"
+            failures.append(f"{key}: {max(counts)} statements > budget {budget}")
+        elif len(set(counts)) > 1:
+            status = "  GROWS WITH DATA"
+            failures.append(f"{key}: statement count varies with data size {counts}")
+        print(f"{key:<66}" + "".join(f"{c:>7}" for c in counts) + f"{'' if budget is None else budget:>8}{status}")
+        if status and verbose:
+            for statement in measurements[-1][1]:
+                print(f"      {' '.join(statement.split())[:160]}")
+
+    if failures:
+        print(f"\n❌ {len(failures)} budget failures:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return False
+    print("\n✅ All routes within their SQL statement budget.")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check per-route SQL statement budgets")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    ok = run(verbose=args.verbose)
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,178 @@
+# Backend/verify_query_plans.py
+#
+# Query-plan regression check for every API route.
+# Seeds a throwaway database (same fixtures as verify_query_budget.py),
+# calls each route, and runs EXPLAIN QUERY PLAN (SQLite) or EXPLAIN (PostgreSQL)
+# on every SELECT / UPDATE / DELETE the route issued. A route fails if any
+# statement does a full scan of a table larger than --min-rows, unless the
+# scan is listed in ALLOWED_SCANS with a reason.
+#
+#   python verify_query_plans.py                 # exits 1 on any failure
+#   python verify_query_plans.py --verbose       # print every plan
+#   QUERY_CHECK_DATABASE_URL=postgresql://... python verify_query_plans.py   # disposable Postgres DB
+
+import re
+import sys
+import json
+import shutil
+import argparse
+from datetime import datetime, timedelta
+
+import verify_query_budget as budget
+from verify_query_budget import main, models, engine, WORK_DIR
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text, inspect
+
+# Scans that are intended, keyed by (route, table)
+ALLOWED_SCANS = {
+    ("GET /api/v1/skillbank/lessons", "skill_lessons"): "unfiltered catalog listing returns every lesson",
+}
+
+EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "WITH")
+ALIAS_PATTERN = re.compile(r"\b(\w+) AS (\w+)\b")
+
+captured = []
+
+@event.listens_for(engine, "after_cursor_execute")
+def capture_statement(conn, cursor, statement, parameters, context, executemany):
+    if not executemany and statement.lstrip().upper().startswith(EXPLAINABLE):
+        captured.append((statement, parameters))
+
+def add_background_rows(scale, multiplier=5):
+    """
+    The budget fixtures revolve around one focus user. Add other users' rows (and past
+    sessions) so column selectivity, and hence the chosen plans, look like production.
+    """
+    now = datetime.utcnow()
+    count = scale * multiplier
+    with engine.begin() as conn:
+        first_user = conn.execute(text("SELECT COALESCE(MAX(id), 0) + 1 FROM users")).scalar()
+        conn.execute(models.User.__table__.insert(), [
+            {"id": first_user + i, "phone_number": f"+9177{i:08d}", "name": f"Background {i}"} for i in range(count)])
+        # Other teachers' lessons, so the focus teacher owns a realistic share of the catalog
+        first_lesson = conn.execute(text("SELECT COALESCE(MAX(id), 0) + 1 FROM skill_lessons")).scalar()
+        conn.execute(models.SkillLesson.__table__.insert(), [
+            {"id": first_lesson + i, "teacher_id": first_user + i, "title": f"Background lesson {i}", "type": "video"}
+            for i in range(count)])
+        first_wallet = conn.execute(text("SELECT COALESCE(MAX(id), 0) + 1 FROM skill_wallets")).scalar()
+        conn.execute(models.SkillWallet.__table__.insert(), [
+            {"id": first_wallet + i, "user_id": first_user + i, "wallet_hash": f"bg{i:012d}"} for i in range(count)])
+        conn.execute(models.SkillCredential.__table__.insert(), [
+            {"skill_wallet_id": first_wallet + i, "skill_name": "Background", "token_id": f"BG_{i}", "issued_date": now - timedelta(days=i % 365)}
+            for i in range(count)])
+        first_session = conn.execute(text("SELECT COALESCE(MAX(id), 0) + 1 FROM live_sessions")).scalar()
+        conn.execute(models.LiveSession.__table__.insert(), [
+            {"id": first_session + i, "teacher_id": first_user + i, "title": f"Past {i}", "scheduled_at": now - timedelta(days=1 + i % 365)}
+            for i in range(count)])
+        conn.execute(models.LessonEnrollment.__table__.insert(), [
+            {"user_id": first_user + i, "lesson_id": first_lesson + (i + offset) % count, "status": "ENROLLED", "progress_percent": 0}
+            for offset in range(3) for i in range(count)])
+        conn.execute(models.SessionEnrollment.__table__.insert(), [
+            {"user_id": first_user + i, "session_id": first_session + (i + offset) % count, "status": "REGISTERED"}
+            for offset in range(3) for i in range(count)])
+        conn.execute(models.LiveSessionReminder.__table__.insert(), [
+            {"user_id": first_user + i, "session_id": first_session + i, "phone_number": f"+9177{i:08d}"} for i in range(count)])
+
+def table_sizes():
+    sizes = {}
+    with engine.connect() as conn:
+        for table in inspect(engine).get_table_names():
+            sizes[table] = conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+    return sizes
+
+def full_scans(statement, parameters):
+    """Returns (tables fully scanned, plan lines) for one statement."""
+    aliases = {alias: table for table, alias in ALIAS_PATTERN.findall(statement)}
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            scans, lines = [], []
+
+            def walk(node, depth=0):
+                relation = node.get("Relation Name")
+                lines.append("  " * depth + node["Node Type"] + (f" on {relation}" if relation else ""))
+                if node["Node Type"] == "Seq Scan":
+                    scans.append(relation)
+                for child in node.get("Plans", []):
+                    walk(child, depth + 1)
+
+            walk(plan[0]["Plan"])
+            return scans, lines
+
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+        lines = [row[-1] for row in rows]
+        scans = []
+        for detail in lines:
+            # "SCAN t" and "SCAN t USING [COVERING] INDEX ix" both read every row; "SEARCH t ..." does not
+            match = re.match(r"SCAN (\w+)", detail)
+            if match:
+                name = match.group(1)
+                scans.append(aliases.get(name, name))
+        return scans, lines
+
+def run(scale, min_rows, verbose=False):
+    print(f"--- QUERY PLAN CHECK ({engine.dialect.name}, scale {scale}, tables >= {min_rows} rows) ---")
+    ids = budget.seed(scale)
+    add_background_rows(scale)
+    with engine.begin() as conn:
+        # Give the planner real statistics, as production would have
+        conn.execute(text("ANALYZE"))
+    sizes = table_sizes()
+
+    failures = []
+    checked = 0
+    with TestClient(main.app) as client:
+        presigned_url = None
+        for key, method, url, kwargs in budget.route_calls(ids):
+            if url is None:
+                url = presigned_url
+            budget.prepare_call(key, ids)
+            captured.clear()
+            response = client.request(method, url, **kwargs)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{key} returned {response.status_code}: {response.text[:200]}")
+            if key.startswith("POST /api/v1/identity/tier2/presign"):
+                presigned_url = response.json()["upload_url"]
+
+            problems = []
+            seen = set()
+            for statement, parameters in list(captured):
+                if statement in seen:
+                    continue
+                seen.add(statement)
+                checked += 1
+                scans, lines = full_scans(statement, parameters)
+                for table in scans:
+                    if sizes.get(table, 0) >= min_rows and (key, table) not in ALLOWED_SCANS:
+                        problems.append((table, statement, lines))
+                if verbose:
+                    print(f"  {key}: {' '.join(statement.split())[:120]}")
+                    for line in lines:
+                        print(f"      {line}")
+
+            status = "FULL SCAN" if problems else "ok"
+            print(f"{key:<66}{len(seen):>4} stmts  {status}")
+            for table, statement, lines in problems:
+                failures.append(f"{key}: full scan of {table} ({sizes[table]} rows)")
+                print(f"      scan of {table} ({sizes[table]} rows): {' '.join(statement.split())[:160]}")
+                for line in lines:
+                    print(f"        {line}")
+
+    if failures:
+        print(f"\n❌ {len(failures)} full table scans over {min_rows} rows ({checked} statements checked):")
+        for failure in failures:
+            print(f"  - {failure}")
+        return False
+    print(f"\n✅ No unexpected full scans ({checked} statements checked).")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail on full table scans in API queries")
+    parser.add_argument("--scale", type=int, default=300, help="Rows per related table for the focus user")
+    parser.add_argument("--min-rows", type=int, default=250, help="Only scans of tables at least this big fail")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    ok = run(args.scale, args.min_rows, verbose=args.verbose)
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+    sys.exit(0 if ok else 1)